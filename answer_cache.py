@@ -0,0 +1,208 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from telemetry import fields
+
+log = logging.getLogger(__name__)
+
+# Words that change the wording of a question but not what is being asked
+# Only words that never change what is being asked: tense and intent verbs stay,
+# so "how would you design X" and "how did you design X" remain different keys
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "to", "of", "in", "on", "at", "for", "with",
+    "is", "are", "be", "please", "me", "my", "i", "you", "your", "us", "we", "it", "that",
+    "this", "just", "um", "uh", "okay", "ok", "well", "yeah", "through"
+}
+
+# Words that point back into the conversation ("what did you learn from it", "tell me more")
+_REFERRING = {"it", "its", "this", "these", "those", "they", "them", "their", "he", "she", "him", "her",
+              "more", "else", "again", "instead", "also", "why"}
+_FOLLOW_UP_OPENERS = {"and", "but", "so", "then", "or", "because"}
+
+# Common interview paraphrases mapped onto one term
+_SYNONYMS = {
+    "yourself": "background", "introduce": "background", "resume": "background", "cv": "background",
+    "weaknesses": "weakness", "strengths": "strength", "hire": "choose", "pick": "choose"
+}
+
+
+def normalize(text):
+    """Lowercases, strips punctuation and filler so rewordings collapse to one key."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    words = [_SYNONYMS.get(w, w) for w in words if w not in _STOPWORDS]
+    return " ".join(w[:-1] if len(w) > 4 and w.endswith("s") and not w.endswith("ss") else w for w in words)
+
+
+def standalone(question):
+    """Whether question means the same in any conversation, so a cached answer fits it:
+    it has content words and nothing that refers back to what was said before."""
+    words = re.findall(r"[a-z0-9']+", question.lower())
+    if not words or words[0] in _FOLLOW_UP_OPENERS or words[:2] in (["what", "about"], ["how", "about"]):
+        return False
+    if words[-1] == "that" or any(w in _REFERRING for w in words):
+        return False
+    return bool(normalize(question))
+
+
+def lexical_embedding(text):
+    """Sparse bag of words, word bigrams and character trigrams, L2-normalized."""
+    norm = normalize(text)
+    words = norm.split()
+    features = {}
+    for w in words:
+        features["w:" + w] = features.get("w:" + w, 0.0) + 1.0
+    for a, b in zip(words, words[1:]):
+        features["b:" + a + " " + b] = features.get("b:" + a + " " + b, 0.0) + 1.0
+    padded = f" {norm} "
+    for i in range(len(padded) - 2):
+        gram = "c:" + padded[i:i + 3]
+        features[gram] = features.get(gram, 0.0) + 0.5
+    return _unit(features)
+
+
+def _unit(vector):
+    length = math.sqrt(sum(v * v for v in vector.values()))
+    if not length:
+        return {}
+    return {k: v / length for k, v in vector.items()}
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class SemanticAnswerCache:
+    """Answers keyed on an embedded form of the question plus its source.
+
+    A lookup returns the stored answer whose question is most similar, provided
+    the cosine similarity clears the threshold. Entries expire after a TTL, the
+    least recently used ones are evicted past max_entries, and the cache is
+    persisted as JSON so warm entries survive restarts.
+    """
+
+    def __init__(self, path=None, threshold=None, max_entries=None, ttl=None, embed_fn=None, embedder_name="lexical"):
+        self.path = path or os.getenv("ANSWER_CACHE_PATH", "answer_cache.json")
+        self.threshold = threshold if threshold is not None else float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.85))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("ANSWER_CACHE_SIZE", 256))
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))
+        self.embed_fn = embed_fn or lexical_embedding
+        self.embedder_name = embedder_name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.last_miss_similarity = None
+        self._load()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _key(self, question, source):
+        return f"{source}|{normalize(question)}"
+
+    def lookup(self, question, source):
+        """Returns a cached answer for a similar enough question, or None."""
+        if not self.enabled or not normalize(question):
+            return None
+        key = self._key(question, source)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            best_key, best_score = (key, 1.0) if entry and entry["expires"] > now else (None, 0.0)
+        if best_key is None:
+            vector = self.embed_fn(question)
+            with self._lock:
+                for k, e in list(self._entries.items()):
+                    if e["expires"] <= now:
+                        del self._entries[k]
+                        continue
+                    if e["source"] != source:
+                        continue
+                    score = cosine(vector, e["vector"])
+                    if score > best_score:
+                        best_key, best_score = k, score
+        with self._lock:
+            if best_key is not None and best_score >= self.threshold and best_key in self._entries:
+                self._entries.move_to_end(best_key)
+                self.hits += 1
+                return dict(self._entries[best_key]["answer"])
+            self.misses += 1
+            self.last_miss_similarity = round(best_score, 3)
+            return None
+
+    def put(self, question, source, answer):
+        if not self.enabled or not normalize(question):
+            return
+        entry = {
+            "source": source,
+            "question": question,
+            "vector": self.embed_fn(question),
+            "answer": answer,
+            "expires": time.time() + self.ttl
+        }
+        with self._lock:
+            key = self._key(question, source)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._save()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "last_miss_similarity": self.last_miss_similarity,
+                "embedder": self.embedder_name
+            }
+
+    def _load(self):
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("embedder") != self.embedder_name:
+                log.warning("answer cache built with another embedder, starting empty", extra=fields(path=self.path))
+                return
+            now = time.time()
+            for key, entry in data.get("entries", []):
+                if entry["expires"] > now:
+                    self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            log.info("answer cache loaded", extra=fields(entries=len(self._entries)))
+        except Exception as e:
+            log.warning("answer cache load failed", extra=fields(error=str(e)))
+
+    def _save(self):
+        with self._lock:
+            data = {"embedder": self.embedder_name, "entries": list(self._entries.items())}
+        tmp_path = self.path + ".tmp"
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                log.warning("answer cache save failed", extra=fields(error=str(e)))
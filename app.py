@@ -1,63 +1,234 @@
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
 import asyncio
+import hmac
 import json
+import logging
 import os
+import tempfile
+import threading
+from contextlib import asynccontextmanager
 from speech_processor import SpeechProcessor
-from chat_gpt import ChatGPTAssistant
+from chat_gpt import ChatGPTAssistant, ProviderSettings
+from audio_segmenter import StreamingPCMDecoder, VADSegmenter
+from audio_buffer import AudioRingBuffer, AudioPayload, wav_payload
+from audio_framing import framer_for, starts_stream
+from session import Session, SessionManager
+from dispatcher import AnswerDispatcher, AnswerRequest
+from conversation_memory import ConversationMemory
+from intent_gate import IntentGate, CONTINUATION_SECONDS
+from transcript_store import TranscriptStore, TRANSCRIPT_DB, answer_text
+from offline_batch import BatchJob, run_batch
+from sliding_stt import SlidingWindowTranscriber
+from telemetry import configure_logging, metrics, fields, RequestTrace
 
-app = FastAPI()
+configure_logging()
+log = logging.getLogger("app")
 
 # Initialize AI and Speech Processor
 processor = SpeechProcessor()
 ai = ChatGPTAssistant()
+sessions = SessionManager()
+# Everything said and answered, for review after the session (only when TRANSCRIPT_DB names a file)
+transcripts = TranscriptStore() if TRANSCRIPT_DB.lower() not in ("", "off") else None
+# /transcripts answers loopback clients only, unless callers send "Authorization: Bearer <TRANSCRIPT_TOKEN>"
+TRANSCRIPT_TOKEN = os.getenv("TRANSCRIPT_TOKEN", "")
 
-# Serve static files
-app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
+# "segment": one STT call per VAD segment. "sliding": overlapping windows stitched into one utterance
+STT_MODE = os.getenv("STT_MODE", "segment")
+# Recorded sessions processed at once via POST /batch; more wait their turn
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", 1))
+# Largest recording POST /batch accepts (an hour of 16 kHz WAV is ~115 MB, of WebM/Opus far less)
+BATCH_MAX_MB = int(os.getenv("BATCH_MAX_MB", 512))
+# Finished jobs (and their reports) are forgotten this long after they end
+BATCH_JOB_TTL = float(os.getenv("BATCH_JOB_TTL", 3600))
+batch_jobs = {}
+batch_slots = None
+SLIDING_MAX_UTTERANCE_MS = int(os.getenv("SLIDING_MAX_UTTERANCE_MS", 45000))
+
+# Gauges are read from the live objects when /metrics is scraped
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+metrics.gauge("sessions_active", "Open /ws sessions", lambda: len(sessions))
+metrics.gauge("outbox_frames_queued", "Frames waiting in session outboxes", lambda: sessions.stats()["queued_frames"])
+metrics.gauge("answers_in_flight", "Answer calls running across sessions", lambda: sessions.stats()["answers_in_flight"])
+metrics.gauge("provider_in_flight", "Provider calls in flight", lambda: {
+    provider: sum(pool[provider]["in_flight"] for pool in ai.provider_stats()["pools"])
+    for provider in ("openai", "gemini", "ollama", "stt")}, ("provider",))
+metrics.gauge("provider_circuit_state", "Provider circuit: 0 closed, 1 half-open, 2 open",
+              lambda: {name: CIRCUIT_STATES[h.state] for name, h in ai.router.health.items()}, ("provider",))
+metrics.gauge("stt_local_queue_depth", "Segments waiting for the local Whisper pool",
+              lambda: ai.local_stt.queue_depth() if ai.local_stt else 0)
+metrics.gauge("speech_processor_queue_depth", "Backend phrases not yet taken by a session", lambda: processor.result_queue.qsize())
+metrics.gauge("speech_recognition_queue_depth", "Captured segments waiting for a recognition worker", lambda: processor.queue_depth())
+metrics.gauge("ollama_queue_depth", "Local model calls waiting for a generation slot",
+              lambda: sum(pool["ollama"]["waiting"] for pool in ai.provider_stats()["pools"]))
+metrics.gauge("ollama_tokens_per_second", "Recent local model generation speed",
+              lambda: ai.local_llm.tokens_per_second or 0)
+metrics.gauge("transcript_queue_depth", "Transcript events waiting for the store's writer",
+              lambda: transcripts.queue_depth() if transcripts else 0)
+metrics.gauge("answer_cache_entries", "Entries in the semantic answer cache", lambda: ai.answer_cache.stats()["entries"])
 
-# Lock for concurrent websocket writes
-ws_lock = asyncio.Lock()
+# Slow first-use work runs after the port is open; /ready reports on it
+readiness = {"ready": False, "import_s": round(time.perf_counter() - IMPORT_STARTED, 3), "warmup_s": None, "components": {}}
+metrics.gauge("app_ready", "1 once the startup warm-up has finished", lambda: int(readiness["ready"]))
+WARMUP_STEPS = {
+    "providers": lambda: ai.warm_up(),
+    "audio_devices": lambda: processor.warm_up(),
+    "stt_engine": lambda: ai.start_stt_engine(),
+    "local_model": lambda: ai.warm_up_local_model(),
+    "transcripts": lambda: transcripts.start() if transcripts else None
+}
 
-async def safe_send(websocket: WebSocket, data: dict):
-    async with ws_lock:
+def run_in_daemon_thread(name, step):
+    """Like asyncio.to_thread, but a call stuck on the network cannot hold up process exit."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def report(setter, value):
+        if not done.done():
+            setter(value)
+
+    def run():
         try:
-            await websocket.send_json(data)
+            result = step()
         except Exception as e:
-            print(f"Send Error: {e}")
+            loop.call_soon_threadsafe(report, done.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(report, done.set_result, result)
+    threading.Thread(target=run, name=f"warm-up-{name}", daemon=True).start()
+    return done
+
+async def warm_up_component(name, step):
+    started = time.monotonic()
+    readiness["components"][name] = {"status": "warming"}
+    try:
+        await run_in_daemon_thread(name, step)
+        readiness["components"][name] = {"status": "ok"}
+    except Exception as e:
+        log.warning("warm-up step failed", extra=fields(component=name, error=str(e)))
+        readiness["components"][name] = {"status": "failed", "error": str(e)}
+    readiness["components"][name]["seconds"] = round(time.monotonic() - started, 3)
+
+async def warm_up():
+    started = time.monotonic()
+    # Yield once so uvicorn binds before any of this starts
+    await asyncio.sleep(0)
+    await asyncio.gather(*(warm_up_component(name, step) for name, step in WARMUP_STEPS.items()))
+    readiness["warmup_s"] = round(time.monotonic() - started, 3)
+    readiness["ready"] = True
+    log.info("warm-up finished", extra=fields(seconds=readiness["warmup_s"],
+                                             failed=[n for n, c in readiness["components"].items() if c["status"] == "failed"]))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs as a task so the port opens right away
+    app.state.warmup = asyncio.create_task(warm_up())
+    yield
+    ai.stop_stt_engine()
+    await ai.aclose()
+    if transcripts:
+        await asyncio.to_thread(transcripts.close)
+
+app = FastAPI(lifespan=lifespan)
+
+# Serve static files
+app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
+
+async def safe_send(session: Session, data: dict):
+    # Frames are queued for the session's sender task, so callers never wait on the socket
+    session.send(data)
 
-async def process_text_task(websocket: WebSocket, text: str, source: str):
+def record(session: Session, kind: str, text: str, **details):
+    # Queued for the store's writer thread: never waits on disk
+    if transcripts:
+        transcripts.record(session.id, kind, text, **details)
+
+async def backend_results_loop(session: Session, results: asyncio.Queue):
+    """Answers phrases pushed by the backend SpeechProcessor as soon as they arrive."""
+    while True:
+        backend_text = await results.get()
+        dispatch_text(session, backend_text, "Interviewer")
+
+def dispatch_text(session: Session, text: str, source: str, trace: RequestTrace = None, gated: bool = True):
+    """Answers text; spoken text first passes the session's intent gate (typed text is always answered)."""
     if not text or len(text.strip()) < 3:
         return
+    if gated and session.gate:
+        decision = session.gate.classify(text, source)
+        record(session, "utterance", text, source=source, data={"decision": decision.action, "reason": decision.reason})
+        if not decision.answered:
+            if trace:
+                trace.mark("gated")
+            if decision.action == "hold":
+                session.spawn(settle_held(session, source))
+            session.send({"type": "status", "content": f"Listening... (not answered: {decision.reason})"})
+            return
+        # A merge answers the fragment together with the utterance before it
+        text = decision.text
+    else:
+        record(session, "utterance", text, source=source, data={"decision": "typed"})
+    # Merged with an identical text in flight, or started (cancelling older ones from this source)
+    session.dispatcher.submit(text, source, trace)
 
-    print(f"Processing ({source}): {text[:50]}...")
+async def settle_held(session: Session, source: str):
+    """Answers a held prompt once nothing has followed it (IntentGate.expire)."""
+    await asyncio.sleep(CONTINUATION_SECONDS + 0.1)
+    decision = session.gate.expire(source)
+    if decision and decision.answered:
+        session.dispatcher.submit(decision.text, source)
+
+async def stream_answer(session: Session, request: AnswerRequest):
+    """Awaits the provider directly, forwarding partial fields as answer_delta frames."""
+    def on_delta(event):
+        request.streamed = True
+        if "tier" in event:
+            # ANSWER_MODE=tiered: main_answer and keywords are complete, the expansion is still coming
+            request.trace.mark("fast_answer_done")
+        else:
+            request.trace.mark("llm_first_token")
+        session.dispatcher.send(request, {"type": "answer_delta", **event})
+
+    answer = await ai.aget_answer(request.text, request.source, on_delta, session.settings, session.memory)
+    request.trace.mark("llm_done")
+    return answer
+
+async def answer_request(session: Session, request: AnswerRequest):
+    text, source = request.text, request.source
+    send = session.dispatcher.send
+    log.info("answering", extra=fields(session=session.id, request=request.id, source=source, text=text[:50]))
+    record(session, "question", text, source=source, request=request.id)
 
     # Send the detected speech to frontend (feedback)
-    await safe_send(websocket, {
+    send(request, {
         "type": "question",
         "content": text,
         "source": source
     })
     
     # Show "Thinking" status
-    await safe_send(websocket, {
+    send(request, {
         "type": "status",
         "content": f"Thinking ({source})..."
     })
     
-    # Get answer from AI (offload to thread to keep websocket responsive)
-    loop = asyncio.get_event_loop()
+    # Get answer from AI (async provider clients, the websocket stays responsive)
     try:
-        answer = await loop.run_in_executor(None, ai.get_answer, text, source)
+        answer = await stream_answer(session, request)
         
         # Check for error in structured response
-        if "Error" in answer.get("main_answer", ""):
-            await safe_send(websocket, {
+        if answer.get("error"):
+            record(session, "error", str(answer.get("main_answer")), source=source, request=request.id)
+            send(request, {
                 "type": "status",
                 "content": f"⚠️ AI Error: {answer.get('main_answer')}"
             })
             # Also send as an AI message so it's visible in chat
-            await safe_send(websocket, {
+            send(request, {
                 "type": "answer",
                 "content": {
                     "main_answer": f"Bot Error: {answer.get('main_answer')}",
@@ -67,94 +238,221 @@ async def process_text_task(websocket: WebSocket, text: str, source: str):
                 }
             })
         else:
-            await safe_send(websocket, {
+            record(session, "answer", answer_text(answer), source=source, request=request.id, data=answer)
+            send(request, {
                 "type": "answer",
                 "content": answer
             })
-    except Exception as e:
-        print(f"Task Error: {e}")
+    except Exception:
+        log.exception("answer task failed", extra=fields(session=session.id, request=request.id))
     
-    await safe_send(websocket, {
+    send(request, {
         "type": "status",
         "content": "Listening..."
     })
 
-async def run_transcription_task(websocket: WebSocket, audio_data: bytes):
-    loop = asyncio.get_event_loop()
-    text = await loop.run_in_executor(None, ai.transcribe_audio, audio_data)
-    if text and len(text.strip()) > 5: 
-        await process_text_task(websocket, text, "Interviewer")
+async def run_transcription_task(session: Session, audio: AudioPayload, mime_type: str = "audio/webm", trace: RequestTrace = None):
+    try:
+        text = await ai.atranscribe_audio(audio, mime_type, session.settings)
+    finally:
+        # Hand the ring buffer region back to the connection
+        audio.release()
+    if trace:
+        trace.mark("stt_done")
+    if text and text.strip():
+        dispatch_text(session, text, "Interviewer", trace)
     else:
         # Send a silent signal to frontend that processing finished with no text
-        await safe_send(websocket, {"type": "status", "content": "Listening... (No speech detected)"})
+        await safe_send(session, {"type": "status", "content": "Listening... (No speech detected)"})
+
+async def finish_utterance(session: Session, utterance: SlidingWindowTranscriber, end: int, utterance_id: str, trace: RequestTrace):
+    text = await utterance.finish(end)
+    trace.mark("stt_done")
+    session.send({"type": "transcript", "id": utterance_id, "stable": text, "tentative": "", "final": True})
+    if text and text.strip():
+        dispatch_text(session, text, "Interviewer", trace)
+    else:
+        await safe_send(session, {"type": "status", "content": "Listening... (No speech detected)"})
+
+async def segment_audio_task(session: Session, decoder: StreamingPCMDecoder):
+    """Reads decoded PCM and sends each closed speech segment to STT.
+
+    With STT_MODE=sliding, an utterance is instead transcribed in overlapping
+    windows while it is spoken; the page sees the stitched transcript grow and
+    only the final utterance is answered.
+    """
+    sliding = STT_MODE == "sliding"
+    segmenter = VADSegmenter(max_segment_ms=SLIDING_MAX_UTTERANCE_MS if sliding else None)
+    ring = AudioRingBuffer.for_pcm(segmenter.sample_rate)
+    utterance = None
+    utterance_id = None
+    heard_at = None  # when the open segment's first audio arrived
+
+    def transcribe_segment(start, end, trace):
+        log.info("speech segment closed", extra=fields(session=session.id, seconds=round((end - start) / (2 * segmenter.sample_rate), 1)))
+        audio = wav_payload(ring.slice(start, end), segmenter.sample_rate)
+        session.spawn(run_transcription_task(session, audio, "audio/wav", trace))
+
+    def transcribe_window(start, end):
+        # Sliced now, while the ring still holds the window
+        audio = wav_payload(ring.slice(start, end), segmenter.sample_rate)
+
+        async def run():
+            try:
+                return await ai.atranscribe_audio(audio, "audio/wav", session.settings)
+            finally:
+                audio.release()
+        return run()
+
+    def start_utterance(start):
+        nonlocal utterance, utterance_id
+        utterance_id = f"u{start}"
+        current_id = utterance_id
+
+        def on_update(stable, tentative):
+            session.send({"type": "transcript", "id": current_id, "stable": stable, "tentative": tentative, "final": False})
+        utterance = SlidingWindowTranscriber(start, transcribe_window, session.spawn, on_update,
+                                             bytes_per_ms=2 * segmenter.sample_rate // 1000)
+
+    def close_segment(start, end, received_at):
+        nonlocal utterance
+        trace = RequestTrace(session.id, "audio_received", at=received_at)
+        trace.mark("segment_closed")
+        if not sliding:
+            transcribe_segment(start, end, trace)
+            return
+        if utterance is None or utterance.start != start:
+            start_utterance(start)
+        log.info("utterance closed", extra=fields(session=session.id, seconds=round((end - start) / (2 * segmenter.sample_rate), 1)))
+        session.spawn(finish_utterance(session, utterance, end, utterance_id, trace))
+        utterance = None
+
+    while True:
+        pcm = await decoder.read()
+        if not pcm:
+            break
+        received = time.monotonic()
+        ring.write(pcm)
+        for start, end in segmenter.feed(pcm):
+            close_segment(start, end, heard_at or received)
+            heard_at = None
+        if segmenter.speech_start is None:
+            heard_at = None
+        elif heard_at is None:
+            heard_at = received
+        if sliding:
+            if utterance is not None and utterance.start != segmenter.speech_start:
+                # The VAD dropped that segment as noise
+                utterance.cancel()
+                utterance = None
+            if segmenter.speech_start is not None:
+                if utterance is None:
+                    start_utterance(segmenter.speech_start)
+                utterance.advance(segmenter.position)
+    # Stream ended (recorder restarted): don't lose the utterance in progress
+    segment = segmenter.flush()
+    if segment:
+        close_segment(*segment, heard_at or time.monotonic())
+    elif utterance is not None:
+        utterance.cancel()
+    if segmenter.dropped_segments:
+        log.info("VAD dropped noise segments", extra=fields(session=session.id, dropped=segmenter.dropped_segments))
 
 @app.get("/")
 async def get():
     with open("frontend/index_v2.html", "r", encoding="utf-8") as f:
         return HTMLResponse(content=f.read())
 
+async def handle_audio_chunk(session: Session, chunk: bytes):
+    # Stream audio through ffmpeg + VAD when available, else fixed-size container slices
+    if StreamingPCMDecoder.available():
+        # A new container header means the browser restarted its recorder
+        if session.decoder is None or starts_stream(chunk):
+            if session.decoder is not None:
+                await session.decoder.close()
+            session.decoder = StreamingPCMDecoder()
+            await session.decoder.start()
+            session.spawn(segment_audio_task(session, session.decoder))
+        await session.decoder.write(chunk)
+        return
+
+    if session.framer is None or starts_stream(chunk):
+        session.framer = framer_for(chunk)
+    if session.framer is None:
+        return
+
+    framer = session.framer
+    framer.feed(chunk)
+    if session.segment_heard_at is None:
+        session.segment_heard_at = time.monotonic()
+
+    # Accumulate a decent slice for transcription (~2-3 seconds)
+    if framer.pending > 24000:
+        # Container init data + whole blocks/pages: a file that decodes on its own
+        to_process = AudioPayload(framer.take())
+        trace = RequestTrace(session.id, "audio_received", at=session.segment_heard_at)
+        trace.mark("segment_closed")
+        session.segment_heard_at = None
+
+        log.info("audio slice ready", extra=fields(session=session.id, bytes=len(to_process)))
+
+        # Process in background task
+        session.spawn(run_transcription_task(session, to_process, framer.mime_type, trace=trace))
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    print("Websocket connected")
-    audio_buffer = bytearray()
-    header_chunk = None
+    session = sessions.create(websocket)
+    session.dispatcher = AnswerDispatcher(session, lambda request: answer_request(session, request))
+    session.gate = IntentGate()
+    session.memory = ConversationMemory(lambda prompt: ai.acomplete(prompt, session.settings), session.spawn)
+    log.info("websocket connected", extra=fields(session=session.id, active=len(sessions)))
+
+    # Receiving happens here; sending and backend detection run as the session's own tasks
+    backend_results = asyncio.Queue()
+    session.subscription = processor.subscribe(asyncio.get_running_loop(), backend_results)
+    session.spawn(session.send_loop())
+    session.spawn(backend_results_loop(session, backend_results))
+    await safe_send(session, {"type": "session", "id": session.id})
 
     try:
         while True:
-            # 1. Check for incoming messages
-            try:
-                # Wait for message (either JSON or Binary)
-                msg_raw = await asyncio.wait_for(websocket.receive(), timeout=0.05)
-                
-                if "text" in msg_raw:
-                    msg = json.loads(msg_raw["text"])
-                    if msg.get("type") == "transcription":
-                        frontend_text = msg.get("content")
-                        print(f"Frontend Text: {frontend_text}")
-                        asyncio.create_task(process_text_task(websocket, frontend_text, "Candidate"))
-                
-                elif "bytes" in msg_raw:
-                    # Received raw audio chunk
-                    chunk = msg_raw["bytes"]
-                    
-                    if header_chunk is None:
-                        header_chunk = chunk
-                        print("Captured Audio Header")
-                        # First chunk is special, don't process it yet, just store as header
-                        continue 
-                    
-                    audio_buffer.extend(chunk)
-                    
-                    # Accumulate a decent slice for transcription (~2-3 seconds)
-                    if len(audio_buffer) > 24000: 
-                        # Combine header + current buffer to make a valid standalone file
-                        to_process = header_chunk + bytes(audio_buffer)
-                        audio_buffer = bytearray() # Clear buffer for next segment
-                        
-                        print(f"Processing Valid Audio Segment ({len(to_process)} bytes)...")
-                        
-                        # Process in background task
-                        asyncio.create_task(run_transcription_task(websocket, to_process))
-
-            except asyncio.TimeoutError:
-                pass
-            
-            # 2. Check for backend-only detection (legacy/fallback)
-            backend_text = processor.get_latest_text()
-            if backend_text:
-                asyncio.create_task(process_text_task(websocket, backend_text, "Interviewer"))
-
-            await asyncio.sleep(0.01) 
-            
+            # Wait for message (either JSON or Binary)
+            msg_raw = await websocket.receive()
+            if msg_raw["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(msg_raw.get("code", 1000))
+
+            if msg_raw.get("text") is not None:
+                msg = json.loads(msg_raw["text"])
+                if msg.get("type") == "transcription":
+                    frontend_text = msg.get("content")
+                    log.debug("frontend text", extra=fields(session=session.id, text=frontend_text))
+                    dispatch_text(session, frontend_text, "Candidate", gated=bool(msg.get("spoken")))
+
+            elif msg_raw.get("bytes") is not None:
+                # Received raw audio chunk
+                await handle_audio_chunk(session, msg_raw["bytes"])
+
     except WebSocketDisconnect:
-        print("Websocket disconnected")
+        log.info("websocket disconnected", extra=fields(session=session.id))
     except Exception as e:
-        print(f"Websocket error: {e}")
+        log.warning("websocket error", extra=fields(session=session.id, error=str(e)))
+    finally:
+        processor.unsubscribe(session.subscription)
+        await sessions.remove(session)
 
 @app.post("/toggle-listening")
-async def toggle_listening():
+async def toggle_listening(request: Request):
+    body = await request.body()
+    data = json.loads(body) if body else {}
+    session = None
+    if data.get("session_id"):
+        session = sessions.get(data["session_id"])
+        if session is None:
+            return JSONResponse({"status": "error", "error": "no such session"}, status_code=404)
     if not processor.is_listening:
+        # The session that starts capture answers what it hears; without one, the newest session does
+        processor.set_owner(session.subscription if session else None)
         processor.start_listening()
         return {"status": "listening"}
     else:
@@ -163,7 +461,151 @@ async def toggle_listening():
 
 @app.get("/status")
 async def get_status():
-    return {"is_listening": processor.is_listening}
+    return {"is_listening": processor.is_listening, "capture": processor.capture_stats()}
+
+@app.get("/ready")
+async def get_ready():
+    # 503 until the warm-up is done; a failed step is reported but does not block readiness
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/model-registry")
+async def get_model_registry():
+    return ai.gemini_registry.stats()
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    return ai.answer_cache.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/provider-health")
+async def get_provider_health():
+    return ai.router.stats()
+
+@app.get("/providers")
+async def get_providers():
+    return ai.provider_stats()
+
+@app.get("/local-model")
+async def get_local_model():
+    stats = ai.local_llm.stats()
+    stats["queue_depth"] = sum(pool["ollama"]["waiting"] for pool in ai.provider_stats()["pools"])
+    stats["in_flight"] = sum(pool["ollama"]["in_flight"] for pool in ai.provider_stats()["pools"])
+    return stats
+
+@app.get("/sessions")
+async def get_sessions():
+    return sessions.stats()
+
+def transcripts_denied(request: Request):
+    """A 403 response unless the caller may read transcripts (see TRANSCRIPT_TOKEN), else None."""
+    if TRANSCRIPT_TOKEN:
+        sent = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if hmac.compare_digest(sent.encode(), TRANSCRIPT_TOKEN.encode()):
+            return None
+    elif request.client and request.client.host in ("127.0.0.1", "::1", "localhost"):
+        return None
+    return JSONResponse({"error": "not allowed"}, status_code=403)
+
+@app.get("/transcripts")
+async def get_transcripts(request: Request, q: str = "", session: str = None, kind: str = None, limit: int = 50):
+    """Full-text search over past sessions (q), or the most recent sessions without it."""
+    denied = transcripts_denied(request)
+    if denied:
+        return denied
+    if not transcripts:
+        return JSONResponse({"error": "transcript store is off"}, status_code=404)
+    if not q:
+        return {"sessions": await asyncio.to_thread(transcripts.sessions, limit)}
+    kinds = kind.split(",") if kind else None
+    return {"results": await asyncio.to_thread(transcripts.search, q, session, kinds, limit)}
+
+@app.get("/transcripts/{session_id}")
+async def export_transcript(request: Request, session_id: str, format: str = "json"):
+    """One session's utterances, questions and answers in order, as JSON or plain text."""
+    denied = transcripts_denied(request)
+    if denied:
+        return denied
+    if not transcripts:
+        return JSONResponse({"error": "transcript store is off"}, status_code=404)
+    # Include what the writer has not committed yet
+    await asyncio.to_thread(transcripts.flush, 2)
+    events = await asyncio.to_thread(transcripts.export, session_id)
+    if not events:
+        return JSONResponse({"error": "no such session"}, status_code=404)
+    if format == "text":
+        lines = [f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e['at']))}] {e['source'] or ''} {e['kind']}: {e['text']}"
+                 for e in events if e["kind"] != "utterance"]
+        return PlainTextResponse("\n\n".join(lines))
+    return {"session": session_id, "events": events}
+
+@app.post("/batch")
+async def create_batch(request: Request, name: str = "recording", provider: str = None):
+    """Takes a recorded session as the raw request body and processes it in the background (see offline_batch.py)."""
+    global batch_slots
+    if batch_slots is None:
+        batch_slots = asyncio.Semaphore(BATCH_MAX_JOBS)
+    prune_batch_jobs()
+    limit = BATCH_MAX_MB * 1024 * 1024
+    too_large = JSONResponse({"error": f"recordings are limited to {BATCH_MAX_MB} MB"}, status_code=413)
+    if int(request.headers.get("content-length") or 0) > limit:
+        return too_large
+    fd, path = tempfile.mkstemp(prefix="batch-", suffix=os.path.splitext(name)[1])
+    try:
+        received = 0
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > limit:
+                    break
+                # Disk writes off the event loop: live sessions keep being served during an upload
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    if received > limit:
+        os.remove(path)
+        return too_large
+    job = BatchJob(os.path.basename(name))
+    batch_jobs[job.id] = job
+    settings = ProviderSettings(provider=provider) if provider else None
+
+    def record_event(kind, text, **details):
+        if transcripts:
+            transcripts.record(f"batch-{job.id}", kind, text, **details)
+
+    async def run():
+        try:
+            async with batch_slots:
+                await run_batch(ai, path, job, settings=settings, record=record_event)
+        except Exception:
+            pass  # reported on the job
+        finally:
+            os.remove(path)
+    job.task = asyncio.create_task(run())
+    return JSONResponse(job.stats(), status_code=202)
+
+def prune_batch_jobs():
+    now = time.time()
+    for job_id, job in list(batch_jobs.items()):
+        if job.finished is not None and now - job.finished > BATCH_JOB_TTL:
+            del batch_jobs[job_id]
+
+@app.get("/batch")
+async def list_batches():
+    prune_batch_jobs()
+    return {"jobs": [job.stats() for job in batch_jobs.values()]}
+
+@app.get("/batch/{job_id}")
+async def get_batch(job_id: str):
+    """Progress while the job runs; the full report once it is done (kept for BATCH_JOB_TTL)."""
+    prune_batch_jobs()
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "no such job"}, status_code=404)
+    return dict(job.stats(), report=job.report)
 
 @app.get("/devices")
 async def get_devices():
@@ -181,9 +623,16 @@ async def update_key(request: Request):
     data = await request.json()
     new_key = data.get("key")
     provider = data.get("provider", "openai")
+    # With a session id only that connection switches; without one the server default changes
+    session = None
+    if data.get("session_id"):
+        session = sessions.get(data["session_id"])
+        if session is None:
+            # A stale id (the socket reconnected) must not fall through to every session's settings
+            return JSONResponse({"status": "error", "error": "no such session"}, status_code=404)
     if new_key:
-        ai.update_key(new_key, provider)
-        return {"status": "success", "provider": provider}
+        ai.update_key(new_key, provider, session.settings if session else None)
+        return {"status": "success", "provider": provider, "session_id": session.id if session else None}
     return {"status": "error"}
 
 if __name__ == "__main__":
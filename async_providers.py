@@ -0,0 +1,123 @@
+import asyncio
+import heapq
+import itertools
+import os
+import httpx
+
+
+class PrioritySlots:
+    """A semaphore whose waiters are served lowest priority number first, FIFO within a priority."""
+
+    def __init__(self, capacity):
+        self.free = capacity
+        self._waiters = []
+        self._order = itertools.count()
+
+    async def acquire(self, priority=1):
+        if self.free > 0 and not self._waiters:
+            self.free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._order), waiter)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as it was cancelled: pass it on
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            # else release() already popped it and passed the slot to the next waiter
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.free += 1
+
+
+class AsyncProviderPool:
+    """Async provider clients for one event loop.
+
+    OpenAI clients (one per API key) share a single keep-alive httpx pool and
+    the Ollama client keeps its own. Every call goes through `call`, which caps
+    in-flight requests per provider (<PROVIDER>_MAX_CONCURRENCY), letting
+    higher-priority calls (the fast tier of tiered answers) wait less, and
+    applies a per-call timeout (<PROVIDER>_TIMEOUT). SDKs are imported on
+    first use.
+    """
+
+    DEFAULTS = {
+        "openai": (8, 20.0),
+        "gemini": (8, 12.0),
+        # Local generation on CPU: parallel calls only slow each other down
+        "ollama": (1, 45.0),
+        "stt": (8, 30.0)
+    }
+
+    def __init__(self):
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", 100)),
+                max_keepalive_connections=int(os.getenv("PROVIDER_MAX_KEEPALIVE", 20))
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        self.capacity = {}
+        self.limits = {}
+        self.timeouts = {}
+        for provider, (concurrency, timeout) in self.DEFAULTS.items():
+            prefix = provider.upper()
+            self.capacity[provider] = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", concurrency))
+            self.limits[provider] = PrioritySlots(self.capacity[provider])
+            self.timeouts[provider] = float(os.getenv(f"{prefix}_TIMEOUT", timeout))
+        self._in_flight = {provider: 0 for provider in self.DEFAULTS}
+        self._openai_clients = {}
+        self._ollama = None
+
+    def openai(self, api_key):
+        client = self._openai_clients.get(api_key)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=api_key, http_client=self.http)
+            self._openai_clients[api_key] = client
+        return client
+
+    def ollama(self):
+        if self._ollama is None:
+            import ollama
+            self._ollama = ollama.AsyncClient(host=os.getenv("OLLAMA_HOST") or None)
+        return self._ollama
+
+    async def call(self, provider, make_call, priority=1):
+        """Runs make_call() (a coroutine factory) within the provider's concurrency and time budget.
+        While the provider is at capacity, lower priority numbers get the next free slot."""
+        await self.limits[provider].acquire(priority)
+        self._in_flight[provider] += 1
+        try:
+            return await asyncio.wait_for(make_call(), timeout=self.timeouts[provider])
+        finally:
+            self._in_flight[provider] -= 1
+            self.limits[provider].release()
+
+    def spare(self, provider):
+        """Slots free right now for provider (0 while anyone is waiting)."""
+        slots = self.limits[provider]
+        return 0 if slots._waiters else slots.free
+
+    def waiting(self, provider):
+        """Calls queued for a free slot."""
+        return len(self.limits[provider]._waiters)
+
+    def stats(self):
+        return {p: {"in_flight": self._in_flight[p], "waiting": self.waiting(p), "limit": self.capacity[p],
+                    "timeout": self.timeouts[p]}
+                for p in self.DEFAULTS}
+
+    async def aclose(self):
+        await self.http.aclose()
@@ -0,0 +1,167 @@
+import io
+import os
+import struct
+import threading
+
+
+class AudioRingBuffer:
+    """Preallocated per-connection audio buffer addressed by absolute stream offsets.
+
+    Incoming chunks are copied in once; segments are handed out as AudioSlice
+    leases that view the buffer directly. If the writer is about to overwrite a
+    region that is still leased (STT slower than a full lap of the ring), that
+    one lease is copied out first, so readers never see overwritten audio.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self.write_pos = 0
+        self._leases = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_pcm(cls, sample_rate=16000, seconds=None):
+        seconds = seconds or float(os.getenv("AUDIO_RING_SECONDS", 60))
+        return cls(int(sample_rate * 2 * seconds))
+
+    @property
+    def oldest(self):
+        """Oldest offset still held by the ring."""
+        return max(0, self.write_pos - self.capacity)
+
+    def write(self, data):
+        data = memoryview(data)
+        if len(data) > self.capacity:
+            self.write_pos += len(data) - self.capacity
+            data = data[-self.capacity:]
+        n = len(data)
+        with self._lock:
+            low = self.write_pos + n - self.capacity
+            for lease in [l for l in self._leases if l.start < low]:
+                lease._detach()
+            pos = self.write_pos % self.capacity
+            first = min(n, self.capacity - pos)
+            self._view[pos:pos + first] = data[:first]
+            self._view[:n - first] = data[first:]
+            self.write_pos += n
+
+    def slice(self, start, end):
+        """Leases [start, end) without copying, unless the range wraps around the end of the ring.
+        A start that has already been overwritten is clamped to the oldest byte held."""
+        start = max(start, self.oldest)
+        if end > self.write_pos or start > end:
+            raise ValueError(f"Range {start}-{end} is not in the buffer ({self.oldest}-{self.write_pos})")
+        s = start % self.capacity
+        with self._lock:
+            if s + (end - start) <= self.capacity:
+                data = self._view[s:s + (end - start)]
+            else:
+                data = bytes(self._view[s:]) + bytes(self._view[:end % self.capacity])
+            lease = AudioSlice(self, start, end, data)
+            if isinstance(data, memoryview):
+                self._leases.add(lease)
+        return lease
+
+    def _release(self, lease):
+        with self._lock:
+            self._leases.discard(lease)
+
+
+class AudioSlice:
+    """A leased range of an AudioRingBuffer. Release it once the consumer is done."""
+
+    def __init__(self, ring, start, end, data):
+        self.ring = ring
+        self.start = start
+        self.end = end
+        self.data = data
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _detach(self):
+        # Called by the ring with its lock held
+        self.data = bytes(self.data)
+        self.ring._leases.discard(self)
+
+    def copy_into(self, offset, dest):
+        with self.ring._lock:
+            n = min(len(dest), len(self) - offset)
+            dest[:n] = self.data[offset:offset + n]
+            return n
+
+    def tobytes(self):
+        with self.ring._lock:
+            return bytes(self.data)
+
+    def release(self):
+        self.ring._release(self)
+
+
+class AudioPayload:
+    """Audio for STT built from parts (container header, payload slice) that are never joined
+    unless a consumer needs contiguous bytes."""
+
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def __len__(self):
+        return sum(len(p) for p in self.parts)
+
+    def __bytes__(self):
+        return self.tobytes()
+
+    def tobytes(self):
+        return b"".join(p.tobytes() if isinstance(p, AudioSlice) else bytes(p) for p in self.parts)
+
+    def open(self):
+        """Returns an in-memory file object reading across the parts."""
+        return io.BufferedReader(_PayloadReader(self.parts))
+
+    def release(self):
+        for p in self.parts:
+            if isinstance(p, AudioSlice):
+                p.release()
+
+
+class _PayloadReader(io.RawIOBase):
+    def __init__(self, parts):
+        self._parts = parts
+        self._index = 0
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, dest):
+        dest = memoryview(dest).cast("B")
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            if self._offset < len(part):
+                if isinstance(part, AudioSlice):
+                    n = part.copy_into(self._offset, dest)
+                else:
+                    n = min(len(dest), len(part) - self._offset)
+                    dest[:n] = memoryview(part)[self._offset:self._offset + n]
+                self._offset += n
+                return n
+            self._index += 1
+            self._offset = 0
+        return 0
+
+
+def wav_header(num_bytes, sample_rate=16000, channels=1, sample_width=2):
+    """44-byte PCM WAV header for a payload of num_bytes."""
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + num_bytes, b"WAVE", b"fmt ", 16, 1, channels,
+        sample_rate, byte_rate, channels * sample_width, sample_width * 8, b"data", num_bytes
+    )
+
+
+def wav_payload(pcm, sample_rate=16000):
+    """WAV for a PCM slice: the header is a separate part, the payload is not copied."""
+    return AudioPayload(wav_header(len(pcm), sample_rate), pcm)
@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import logging
+import os
+import shutil
+import subprocess
+import time
+from audio_buffer import AudioPayload
+from telemetry import metrics, fields
+
+# Upload format for PCM segments: "opus" (Ogg/Opus), "flac" or "wav"; per backend with <BACKEND>_STT_FORMAT
+STT_UPLOAD_FORMAT = os.getenv("STT_UPLOAD_FORMAT", "opus")
+STT_OPUS_BITRATE = os.getenv("STT_OPUS_BITRATE", "24k")
+
+log = logging.getLogger(__name__)
+upload_bytes = metrics.counter("stt_upload_bytes_total", "Audio bytes prepared for upload per STT backend and format", ("backend", "format"))
+encode_seconds = metrics.histogram("stt_encode_seconds", "Re-encoding a PCM segment for upload", ("format",))
+
+# Every remote backend (Whisper API, Gemini) accepts all of these: (ffmpeg encoder, output args, MIME type)
+FORMATS = {
+    "opus": ("libopus", ["-c:a", "libopus", "-b:a", STT_OPUS_BITRATE, "-application", "voip", "-compression_level", "5", "-f", "ogg"], "audio/ogg"),
+    "flac": ("flac", ["-c:a", "flac", "-compression_level", "8", "-f", "flac"], "audio/flac"),
+}
+
+
+@functools.lru_cache(maxsize=1)
+def ffmpeg_encoders():
+    """Names of the audio encoders the local ffmpeg has (empty without ffmpeg)."""
+    if not shutil.which("ffmpeg"):
+        return frozenset()
+    try:
+        listing = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return frozenset()
+    return frozenset(line.split()[1] for line in listing.splitlines() if line.startswith(" A") and len(line.split()) > 1)
+
+
+def upload_format(backend):
+    """The smallest format this backend should get that the local ffmpeg can produce; "wav" needs none."""
+    preferred = os.getenv(f"{backend.upper()}_STT_FORMAT", STT_UPLOAD_FORMAT)
+    if preferred == "wav":
+        return "wav"
+    for fmt in (preferred, "opus", "flac"):
+        if fmt in FORMATS and FORMATS[fmt][0] in ffmpeg_encoders():
+            return fmt
+    return "wav"
+
+
+async def encode_wav(wav, fmt):
+    """Re-encodes a WAV payload with ffmpeg; returns the encoded bytes."""
+    _, args, _ = FORMATS[fmt]
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-loglevel", "error", "-f", "wav", "-i", "pipe:0", *args, "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    out, err = await process.communicate(wav.tobytes())
+    if process.returncode:
+        raise RuntimeError(f"ffmpeg {fmt} encode failed: {err.decode(errors='replace')[:200]}")
+    return out
+
+
+class STTUpload:
+    """One segment as each STT backend should receive it.
+
+    PCM segments (WAV from the server-side decoder) are re-encoded to the
+    backend's upload format, once per format however many backends are
+    tried. Anything else (container audio cut by audio_framing) is already
+    compressed and goes out as is.
+    """
+
+    def __init__(self, audio, mime_type):
+        self.audio = audio
+        self.mime_type = mime_type
+        self._encoded = {}
+
+    async def for_backend(self, backend):
+        """(AudioPayload, MIME type) to send to backend."""
+        fmt = upload_format(backend) if self.mime_type == "audio/wav" else None
+        if fmt in FORMATS:
+            if fmt not in self._encoded:
+                started = time.monotonic()
+                try:
+                    self._encoded[fmt] = AudioPayload(await encode_wav(self.audio, fmt))
+                    encode_seconds.observe(time.monotonic() - started, fmt)
+                    log.debug("segment re-encoded", extra=fields(format=fmt, wav_bytes=len(self.audio),
+                                                                  bytes=len(self._encoded[fmt]), ms=round((time.monotonic() - started) * 1000, 1)))
+                except Exception as e:
+                    log.warning("segment re-encode failed, sending WAV", extra=fields(format=fmt, error=str(e)))
+                    self._encoded[fmt] = None
+            if self._encoded[fmt] is not None:
+                upload_bytes.inc(backend, fmt, amount=len(self._encoded[fmt]))
+                return self._encoded[fmt], FORMATS[fmt][2]
+        upload_bytes.inc(backend, fmt or self.mime_type.split("/")[-1].split(";")[0], amount=len(self.audio))
+        return self.audio, self.mime_type
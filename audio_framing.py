@@ -0,0 +1,214 @@
+import logging
+import struct
+from audio_buffer import wav_header
+from telemetry import fields
+
+log = logging.getLogger(__name__)
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+SEGMENT = 0x18538067
+CLUSTER = 0x1F43B675
+TIMECODE = 0xE7
+# Segment children: one of these ends a Cluster written with unknown size
+LEVEL1 = {0x114D9B74, 0x1549A966, 0x1654AE6B, 0x1F43B675, 0x1C53BB6B, 0x1941A469, 0x1043A770, 0x1254C367, 0xEC}
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+MAX_ELEMENT_BYTES = 1 << 20
+
+
+def _vint(buf, pos, keep_marker):
+    """EBML variable-length integer at pos: (value, length, all data bits set), or None if incomplete."""
+    if pos >= len(buf):
+        return None
+    first = buf[pos]
+    length = 9 - first.bit_length() if first else 9
+    if length > 8 or pos + length > len(buf):
+        return None
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+    return value, length, value == (1 << (7 * length)) - 1
+
+
+def _element(buf, pos):
+    """(id, header length, size or None when unknown), or None if the header is not complete yet."""
+    parsed_id = _vint(buf, pos, True)
+    if not parsed_id:
+        return None
+    parsed_size = _vint(buf, pos + parsed_id[1], False)
+    if not parsed_size:
+        return None
+    size, size_len, unknown = parsed_size
+    return parsed_id[0], parsed_id[1] + size_len, None if unknown else size
+
+
+class WebMFramer:
+    """Cuts a live WebM stream from MediaRecorder into standalone files.
+
+    The init data (EBML header, Segment info, Tracks) is kept once; every
+    complete SimpleBlock/BlockGroup after it is queued with the timecode of
+    its cluster. `take()` returns init + the queued blocks, regrouped under
+    fresh clusters, which decodes on its own whatever chunk boundaries the
+    browser picked.
+    """
+
+    mime_type = "audio/webm"
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._init = bytearray()
+        self._in_init = True
+        self._cluster_timecode = None
+        self._cluster_end = None   # stream offset where a sized cluster ends
+        self._offset = 0           # stream offset of _buf[0]
+        self._blocks = []          # (cluster timecode element, block element)
+        self.pending = 0
+
+    def feed(self, chunk):
+        self._buf += chunk
+        pos = 0
+        while True:
+            element = _element(self._buf, pos)
+            if not element:
+                break
+            element_id, header_len, size = element
+            at = self._offset + pos
+            if self._cluster_end is not None and at >= self._cluster_end:
+                self._cluster_end = None
+                self._cluster_timecode = None
+            if element_id == SEGMENT:
+                self._init += self._buf[pos:pos + 4] + UNKNOWN_SIZE
+                pos += header_len
+                continue
+            if element_id == CLUSTER:
+                # Descend: the blocks are what gets queued
+                self._in_init = False
+                self._cluster_end = at + header_len + size if size is not None else None
+                self._cluster_timecode = None
+                pos += header_len
+                continue
+            if size is None or pos + header_len + size > len(self._buf):
+                break
+            data = bytes(self._buf[pos:pos + header_len + size])
+            pos += header_len + size
+            if self._in_init:
+                if element_id == 0xEC:
+                    continue  # Void padding
+                self._init += data
+            elif element_id == TIMECODE:
+                self._cluster_timecode = data
+            elif element_id in (0xA3, 0xA0) and self._cluster_timecode is not None:
+                self._blocks.append((self._cluster_timecode, data))
+                self.pending += len(data)
+            elif element_id in LEVEL1:
+                # Cues/Tags after the clusters: not needed for decoding
+                self._cluster_timecode = None
+        if len(self._buf) - pos > MAX_ELEMENT_BYTES:
+            # No element that large in a live audio stream: the parser lost sync, start over at the next chunk
+            log.warning("WebM stream out of sync, dropping buffered bytes", extra=fields(bytes=len(self._buf) - pos))
+            pos = len(self._buf)
+        del self._buf[:pos]
+        self._offset += pos
+
+    def take(self):
+        out = bytearray(self._init)
+        timecode = None
+        for cluster_timecode, block in self._blocks:
+            if cluster_timecode is not timecode:
+                out += struct.pack(">I", CLUSTER) + UNKNOWN_SIZE + cluster_timecode
+                timecode = cluster_timecode
+            out += block
+        self._blocks = []
+        self.pending = 0
+        return bytes(out)
+
+
+class OggFramer:
+    """Cuts a live Ogg stream into standalone files: the header pages, then whole audio pages."""
+
+    mime_type = "audio/ogg"
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._headers = bytearray()
+        self._pages = []
+        self.pending = 0
+
+    def feed(self, chunk):
+        self._buf += chunk
+        pos = 0
+        while len(self._buf) - pos >= 27:
+            if self._buf[pos:pos + 4] != b"OggS":
+                # Lost sync: skip to the next capture pattern
+                found = self._buf.find(b"OggS", pos + 1)
+                pos = found if found >= 0 else len(self._buf) - 3
+                continue
+            segments = self._buf[pos + 26]
+            if len(self._buf) - pos < 27 + segments:
+                break
+            size = 27 + segments + sum(self._buf[pos + 27:pos + 27 + segments])
+            if len(self._buf) - pos < size:
+                break
+            page = bytes(self._buf[pos:pos + size])
+            pos += size
+            granule = struct.unpack_from("<q", page, 6)[0]
+            if granule == 0 and not self._pages:
+                self._headers += page  # identification and comment headers carry granule 0
+            else:
+                self._pages.append(page)
+                self.pending += len(page)
+        del self._buf[:pos]
+
+    def take(self):
+        out = bytes(self._headers) + b"".join(self._pages)
+        self._pages = []
+        self.pending = 0
+        return out
+
+
+class WavFramer:
+    """Streams of raw PCM behind one WAV header: each take() gets its own header."""
+
+    mime_type = "audio/wav"
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._format = None
+        self.pending = 0
+
+    def feed(self, chunk):
+        self._buf += chunk
+        if self._format is None:
+            data = self._buf.find(b"data")
+            fmt = self._buf.find(b"fmt ")
+            if data < 0 or fmt < 0 or len(self._buf) < data + 8:
+                return
+            channels, rate = struct.unpack_from("<HI", self._buf, fmt + 10)
+            width = struct.unpack_from("<H", self._buf, fmt + 22)[0] // 8
+            self._format = (rate, channels, width)
+            del self._buf[:data + 8]
+        block = self._format[1] * self._format[2]
+        self.pending = len(self._buf) - len(self._buf) % block
+
+    def take(self):
+        pcm = bytes(self._buf[:self.pending])
+        del self._buf[:self.pending]
+        self.pending = 0
+        rate, channels, width = self._format
+        return wav_header(len(pcm), rate, channels, width) + pcm
+
+
+def starts_stream(chunk):
+    """True if a chunk begins a new recording (the browser restarted its recorder)."""
+    return chunk[:4] in (EBML_MAGIC, b"RIFF") or (chunk[:4] == b"OggS" and len(chunk) > 5 and chunk[5] & 0x02)
+
+
+def framer_for(chunk):
+    """The framer for the container a stream starts with, or None if it is not one we can cut."""
+    if chunk[:4] == EBML_MAGIC:
+        return WebMFramer()
+    if chunk[:4] == b"OggS":
+        return OggFramer()
+    if chunk[:4] == b"RIFF":
+        return WavFramer()
+    log.warning("unrecognised audio container", extra=fields(head=chunk[:8].hex()))
+    return None
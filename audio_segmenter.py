@@ -0,0 +1,156 @@
+import asyncio
+import os
+import shutil
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class StreamingPCMDecoder:
+    """Decodes the browser's WebM/Ogg audio stream to 16 kHz mono PCM with ffmpeg.
+
+    One ffmpeg process per connection receives every chunk in order, so only the
+    stream itself needs a header and each chunk is decoded as it arrives.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.process = None
+
+    @staticmethod
+    def available():
+        return shutil.which("ffmpeg") is not None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-loglevel", "error", "-analyzeduration", "0",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+
+    async def write(self, chunk):
+        self.process.stdin.write(chunk)
+        await self.process.stdin.drain()
+
+    async def read(self, size=3200):
+        """Returns the next block of PCM, or b"" once the stream has ended."""
+        return await self.process.stdout.read(size)
+
+    async def close(self):
+        if self.process is None:
+            return
+        try:
+            if not self.process.stdin.is_closing():
+                self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=2)
+        except (asyncio.TimeoutError, ProcessLookupError, BrokenPipeError, ConnectionResetError):
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+
+class VADSegmenter:
+    """Cuts a PCM stream into utterances on speech-end boundaries.
+
+    Frame energy is computed for a whole block at once with NumPy. A frame is
+    speech when its RMS clears both an absolute floor and a multiple of the
+    running noise estimate. A segment closes after `hangover_ms` of silence,
+    is forced closed at `max_segment_ms`, and is dropped if it holds less than
+    `min_segment_ms` of speech. Its end is pulled back to `trail_ms` after the
+    last speech frame, so the hangover silence is not sent to STT. Segments are
+    returned as (start, end) byte offsets into the stream, so the caller can
+    slice its own buffer.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=30, min_segment_ms=None, max_segment_ms=None,
+                 hangover_ms=None, preroll_ms=300, energy_ratio=None, min_rms=None, trail_ms=None):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.min_speech_frames = int(min_segment_ms or os.getenv("VAD_MIN_SEGMENT_MS", 400)) // frame_ms
+        self.max_bytes = int(max_segment_ms or os.getenv("VAD_MAX_SEGMENT_MS", 15000)) // frame_ms * self.frame_bytes
+        self.hangover_frames = int(hangover_ms or os.getenv("VAD_HANGOVER_MS", 700)) // frame_ms
+        self.preroll_bytes = preroll_ms // frame_ms * self.frame_bytes
+        self.trail_bytes = int(trail_ms or os.getenv("VAD_TRAIL_MS", 240)) // frame_ms * self.frame_bytes
+        self.energy_ratio = float(energy_ratio or os.getenv("VAD_ENERGY_RATIO", 3.0))
+        self.min_rms = float(min_rms or os.getenv("VAD_MIN_RMS", 300))
+        self.noise_floor = self.min_rms / self.energy_ratio
+        self.position = 0          # stream offset of the first byte not yet framed
+        self._pending = b""
+        self._start = None         # stream offset where the open segment starts
+        self._speech_end = None    # stream offset where its last speech frame ends
+        self._last_end = 0
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self.dropped_segments = 0
+
+    def _frame_rms(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        frames = samples.reshape(-1, self.frame_bytes // 2)
+        return np.sqrt(np.mean(frames * frames, axis=1))
+
+    def feed(self, pcm):
+        """Consumes PCM and returns the (start, end) offsets of segments it closed."""
+        # Only a partial frame left over from the previous block is ever copied
+        data = self._pending + bytes(pcm) if self._pending else memoryview(pcm)
+        base = self.position - len(self._pending)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = bytes(data[usable:])
+        self.position = base + len(data)
+        if not usable:
+            return []
+
+        rms = self._frame_rms(data[:usable])
+        segments = []
+        for i, level in enumerate(rms):
+            frame_start = base + i * self.frame_bytes
+            frame_end = frame_start + self.frame_bytes
+            is_speech = level > max(self.min_rms, self.noise_floor * self.energy_ratio)
+            if not is_speech:
+                # Track background noise only outside speech so it can't drift up mid-sentence
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * float(level)
+
+            if self._start is None:
+                if is_speech:
+                    self._start = max(frame_start - self.preroll_bytes, self._last_end)
+                    self._speech_end = frame_end
+                    self._speech_frames = 1
+                    self._silence_frames = 0
+                continue
+
+            if is_speech:
+                self._speech_frames += 1
+                self._silence_frames = 0
+                self._speech_end = frame_end
+            else:
+                self._silence_frames += 1
+
+            if self._silence_frames >= self.hangover_frames or frame_end - self._start >= self.max_bytes:
+                segment = self._close(frame_end)
+                if segment:
+                    segments.append(segment)
+        return segments
+
+    @property
+    def speech_start(self):
+        """Stream offset where the segment still open began, or None between segments."""
+        return self._start
+
+    def flush(self):
+        """Closes whatever segment is open, e.g. when the stream ends."""
+        return self._close(self.position - len(self._pending)) if self._start is not None else None
+
+    def _close(self, end):
+        start, speech = self._start, self._speech_frames
+        end = min(end, self._speech_end + self.trail_bytes)
+        self._start = None
+        self._last_end = end
+        self._speech_frames = 0
+        self._silence_frames = 0
+        if speech < self.min_speech_frames:
+            self.dropped_segments += 1
+            return None
+        return start, end
@@ -0,0 +1,626 @@
+"""
+Load benchmark for the /ws pipeline, runnable offline.
+
+Starts local fake OpenAI and Ollama servers with configurable latency, error
+and 429 profiles, runs the app against them in its own uvicorn process, and
+drives /ws with many concurrent simulated clients sending typed text and
+recorded (or synthesized) audio. Reports end-to-end p50/p95/p99 latency,
+time to first token, throughput and the server's CPU and RSS.
+
+    python benchmark.py --clients 50 --requests 10
+    python benchmark.py --provider ollama --ollama "latency=2,ttft=0.4,error=0.05"
+    python benchmark.py --openai "latency=0.8,quota=0.2" --audio-share 0.5 --audio meeting.wav
+    python benchmark.py --store 2000 --clients 50
+
+--store skips /ws and measures the transcript store alone: --clients threads
+record utterances, questions and answers at a combined rate of N events/s
+for --store-seconds, reporting the cost of record() on the caller, committed
+throughput, how far the writer lags, and search latency on the result.
+
+Profiles are comma-separated key=value pairs: latency (seconds to the last
+token), ttft (seconds to the first token), tokens (streamed pieces), error
+(share of calls answered with a 500), quota (share answered with a 429),
+stt (transcription latency, OpenAI only) and load (seconds Ollama takes to
+load a model that is not in memory yet; it stays loaded unless a call sends
+keep_alive=0). The fakes answer only the JSON
+fields the system prompt asks for, and latency and tokens are for the full
+answer: a shorter answer (the fast tier of --tiered) streams for
+proportionally less time.
+
+Gemini is not faked: its SDK's async client only speaks gRPC to Google's
+endpoint, so the app runs with GEMINI_API_KEY empty and the selected
+provider falls back to the other fake.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import httpx
+import numpy as np
+import websockets
+
+from audio_buffer import wav_header
+
+QUESTIONS = [
+    "Can you walk me through how you would design a rate limiter for a public API?",
+    "Tell me about a time you had to debug a production outage under pressure.",
+    "What is the difference between a process and a thread?",
+    "How would you scale a read-heavy service to millions of users?",
+    "Why do you want to leave your current role?",
+    "Explain how a hash map handles collisions.",
+    "What trade-offs did you make in your last system design?",
+    "How do you keep a team aligned when priorities change every week?",
+]
+SAMPLE_RATE = 16000
+CHUNK_MS = 250
+
+
+# ---- Fake providers -------------------------------------------------------
+
+def parse_profile(spec):
+    profile = {"latency": 0.6, "ttft": 0.2, "tokens": 20, "error": 0.0, "quota": 0.0, "stt": 0.3, "load": 0.0}
+    for item in filter(None, (spec or "").split(",")):
+        key, _, value = item.partition("=")
+        if key.strip() not in profile:
+            raise argparse.ArgumentTypeError(f"unknown profile key: {key}")
+        profile[key.strip()] = float(value)
+    profile["ttft"] = min(profile["ttft"], profile["latency"])
+    return profile
+
+
+def fake_answer(prompt, system=""):
+    question = prompt.rsplit("Content:", 1)[-1].strip()[:80]
+    answer = {
+        "main_answer": f"A concise answer to: {question}",
+        "star_expansion": "Situation, task, action and result, with the numbers that matter. " * 4,
+        "talking_points": ["Start from the requirements", "Name the trade-off"],
+        "keywords": ["Scalability", "Latency", "Ownership"],
+        "interviewer_question": "What would you measure first?",
+    }
+    # Only the fields the prompt's output format lists
+    return json.dumps({k: v for k, v in answer.items() if f'"{k}"' in system} or answer)
+
+
+FULL_ANSWER_CHARS = len(fake_answer("Content: " + "x" * 80))
+
+
+def pieces(text, count):
+    size = max(1, math.ceil(len(text) / max(1, int(count))))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def build_fake_app(profiles):
+    """One FastAPI app serving the OpenAI (/v1/...) and Ollama (/api/...) routes, each with its own profile."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    fake = FastAPI()
+    transcripts = iter(range(1, 1 << 62))
+    loading = {}  # Ollama model -> task loading it (done once in memory)
+
+    def failure(profile, provider):
+        roll = random.random()
+        if roll < profile["quota"]:
+            if provider == "openai":
+                body = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            else:
+                body = {"error": "too many requests"}
+            return JSONResponse(body, status_code=429)
+        if roll < profile["quota"] + profile["error"]:
+            body = {"error": {"message": "Internal error", "type": "server_error"}} if provider == "openai" else {"error": "internal error"}
+            return JSONResponse(body, status_code=500)
+        return None
+
+    def generation_seconds(profile, text):
+        return (profile["latency"] - profile["ttft"]) * min(1.0, len(text) / FULL_ANSWER_CHARS)
+
+    async def stream(profile, text, frame):
+        await asyncio.sleep(profile["ttft"])
+        share = min(1.0, len(text) / FULL_ANSWER_CHARS)
+        parts = pieces(text, max(1, round(profile["tokens"] * share)))
+        gap = generation_seconds(profile, text) / max(1, len(parts) - 1)
+        for i, part in enumerate(parts):
+            if i:
+                await asyncio.sleep(gap)
+            yield frame(part, False)
+        yield frame("", True)
+
+    @fake.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        profile = profiles["openai"]
+        body = await request.json()
+        error = failure(profile, "openai")
+        if error:
+            await asyncio.sleep(profile["ttft"])
+            return error
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        text = fake_answer(body["messages"][-1]["content"], body["messages"][0]["content"]) if json_mode else "Summary of the conversation so far."
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "gpt-4o-mini")}
+        if not body.get("stream"):
+            await asyncio.sleep(profile["ttft"] + generation_seconds(profile, text))
+            return dict(base, object="chat.completion", choices=[
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}])
+
+        def frame(part, done):
+            if done:
+                chunk = dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                return f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n"
+            chunk = dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": {"content": part}, "finish_reason": None}])
+            return f"data: {json.dumps(chunk)}\n\n"
+        return StreamingResponse(stream(profile, text, frame), media_type="text/event-stream")
+
+    @fake.post("/v1/audio/transcriptions")
+    async def openai_transcription(request: Request):
+        profile = profiles["openai"]
+        await request.body()
+        error = failure(profile, "openai")
+        await asyncio.sleep(profile["stt"])
+        if error:
+            return error
+        return {"text": f"{random.choice(QUESTIONS)} Take number {next(transcripts)}."}
+
+    @fake.post("/api/chat")
+    async def ollama_chat(request: Request):
+        profile = profiles["ollama"]
+        body = await request.json()
+        error = failure(profile, "ollama")
+        if error:
+            await asyncio.sleep(profile["ttft"])
+            return error
+        model = body.get("model")
+        if model not in loading:
+            loading[model] = asyncio.create_task(asyncio.sleep(profile["load"]))
+        await loading[model]
+        if body.get("keep_alive") == 0:
+            loading.pop(model, None)
+        text = fake_answer(body["messages"][-1]["content"], body["messages"][0]["content"]) if body.get("format") == "json" else "Summary of the conversation so far."
+        base = {"model": model, "created_at": "2024-01-01T00:00:00Z"}
+        # Generation counters as Ollama reports them on the last message
+        counts = {"eval_count": max(1, len(text) // 4), "eval_duration": int(max(generation_seconds(profile, text), 0.001) * 1e9)}
+        if not body.get("stream", True):
+            await asyncio.sleep(profile["ttft"] + generation_seconds(profile, text))
+            return dict(base, message={"role": "assistant", "content": text}, done=True, **counts)
+
+        def frame(part, done):
+            return json.dumps(dict(base, message={"role": "assistant", "content": part}, done=done, **(counts if done else {}))) + "\n"
+        return StreamingResponse(stream(profile, text, frame), media_type="application/x-ndjson")
+
+    return fake
+
+
+def serve_fakes(port, profiles):
+    import uvicorn
+    uvicorn.run(build_fake_app(profiles), host="127.0.0.1", port=port, log_level="warning")
+
+
+# ---- Audio fixtures -------------------------------------------------------
+
+def synth_utterance(seconds=1.6):
+    """16 kHz mono PCM: a voiced burst loud enough for the VAD, with a short quiet lead-in."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    voice = (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    speech = voice * 6000 + rng.normal(0, 300, t.size)
+    quiet = rng.normal(0, 40, SAMPLE_RATE // 4)
+    return np.concatenate([quiet, speech]).astype(np.int16).tobytes()
+
+
+class AudioFixture:
+    """An utterance streamed the way a live microphone would send it.
+
+    The connection gets one WAV header with an open-ended length, then raw
+    PCM: the utterance, followed by silence for as long as the client waits
+    for its answer (ffmpeg and the VAD only see speech end once silence
+    follows it).
+    """
+
+    def __init__(self, path=None):
+        if path:
+            with wave.open(path, "rb") as w:
+                if w.getsampwidth() != 2:
+                    raise SystemExit(f"{path}: only 16-bit PCM WAV fixtures are supported")
+                self.rate, self.channels = w.getframerate(), w.getnchannels()
+                self.pcm = w.readframes(w.getnframes())
+        else:
+            self.rate, self.channels, self.pcm = SAMPLE_RATE, 1, synth_utterance()
+        self.chunk_bytes = self.rate * self.channels * 2 * CHUNK_MS // 1000
+        self.header = wav_header(0x7FFFFFFF - 36, self.rate, self.channels)
+        self.silence = bytes(self.chunk_bytes)
+
+    def chunks(self):
+        return [self.pcm[i:i + self.chunk_bytes] for i in range(0, len(self.pcm), self.chunk_bytes)]
+
+
+# ---- Load -----------------------------------------------------------------
+
+class Results:
+    def __init__(self):
+        self.latencies = {"text": [], "audio": []}
+        self.ttft = {"text": [], "audio": []}
+        self.main = {"text": [], "audio": []}
+        self.errors = 0
+        self.fallbacks = 0
+        self.stt_misses = 0
+        self.gated = 0
+        self.timeouts = 0
+        self.connect_failures = 0
+
+
+async def send_silence(ws, fixture):
+    while True:
+        await ws.send(fixture.silence)
+        await asyncio.sleep(CHUNK_MS / 1000)
+
+
+async def await_answer(ws, question, deadline):
+    """Reads frames until the answer to this turn: returns (frame, first token time, main_answer complete time),
+    or (status frame, None, None) when the utterance was not transcribed or not let through the intent gate."""
+    request_id, first, main, streaming_main = None, None, None, False
+    while True:
+        frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=max(0.0, deadline - time.perf_counter())))
+        kind = frame["type"]
+        if kind == "question" and request_id is None and (question is None or frame["content"] == question):
+            request_id = frame.get("id")
+        elif kind == "status" and request_id is None and question is None and (
+                "No speech" in frame["content"] or "not answered" in frame["content"]):
+            return frame, None, None
+        elif frame.get("id") != request_id or request_id is None:
+            continue
+        elif kind == "answer_delta" and not frame.get("reset"):
+            first = first or time.perf_counter()
+            # main_answer is complete at the fast tier's result, or once another field starts after it
+            if main is None and (frame.get("tier") or (streaming_main and frame.get("field") != "main_answer")):
+                main = time.perf_counter()
+            streaming_main = streaming_main or frame.get("field") == "main_answer"
+        elif kind == "answer":
+            return frame, first, main or time.perf_counter()
+
+
+async def run_client(url, index, args, fixture, results):
+    rng = random.Random(index)
+    try:
+        ws = await websockets.connect(url, max_size=None, open_timeout=args.timeout)
+    except Exception:
+        results.connect_failures += 1
+        return
+    async with ws:
+        await ws.recv()  # session frame
+        streaming = False
+        for turn in range(args.requests):
+            kind = "audio" if rng.random() < args.audio_share else "text"
+            silence = None
+            if kind == "audio":
+                if not streaming:
+                    await ws.send(fixture.header)
+                    streaming = True
+                for chunk in fixture.chunks():
+                    await ws.send(chunk)
+                    if args.realtime:
+                        await asyncio.sleep(CHUNK_MS / 1000)
+                # Latency counts from the end of speech
+                question = None
+                silence = asyncio.create_task(send_silence(ws, fixture))
+            else:
+                question = f"{rng.choice(QUESTIONS)} (client {index}, question {turn})"
+                await ws.send(json.dumps({"type": "transcription", "content": question}))
+            sent = time.perf_counter()
+            try:
+                frame, first, main = await await_answer(ws, question, sent + args.timeout)
+            except asyncio.TimeoutError:
+                results.timeouts += 1
+                continue
+            finally:
+                if silence:
+                    silence.cancel()
+            done = time.perf_counter()
+            if frame["type"] == "status":
+                if "not answered" in frame["content"]:
+                    results.gated += 1
+                else:
+                    results.stt_misses += 1
+                continue
+            content = frame.get("content") or {}
+            if str(content.get("main_answer", "")).startswith("Bot Error"):
+                results.errors += 1
+                continue
+            if content.get("fallback_from"):
+                results.fallbacks += 1
+            results.latencies[kind].append(done - sent)
+            if first is not None:
+                results.ttft[kind].append(first - sent)
+            results.main[kind].append(main - sent)
+            if args.think:
+                await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+
+class ProcessSampler:
+    """Samples a process's CPU time and RSS from /proc."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.tick = os.sysconf("SC_CLK_TCK")
+        self.rss_peak = 0
+        self.rss_samples = []
+        self.cpu_start = None
+
+    def cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            stat = f.read().rsplit(")", 1)[1].split()
+        return (int(stat[11]) + int(stat[12])) / self.tick
+
+    def rss_mb(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def run(self, interval=0.5):
+        while True:
+            rss = self.rss_mb()
+            self.rss_samples.append(rss)
+            self.rss_peak = max(self.rss_peak, rss)
+            await asyncio.sleep(interval)
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"app exited with code {process.returncode} during startup")
+            try:
+                if (await client.get(f"{base_url}/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("app did not become ready in time")
+
+
+def start_app(args, port, fake_port, workdir):
+    env = dict(os.environ)
+    env.update({
+        # Set but empty, so a key in .env is not picked up either
+        "GEMINI_API_KEY": "",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "OLLAMA_HOST": f"http://127.0.0.1:{fake_port}",
+        "ANSWER_CACHE_PATH": os.path.join(workdir, "answer_cache.json"),
+        "TRANSCRIPT_DB": os.path.join(workdir, "transcripts.db"),
+        "LOG_LEVEL": args.log_level,
+    })
+    if args.tiered:
+        env["ANSWER_MODE"] = "tiered"
+    if not args.cache:
+        # No similarity reaches this, so every question goes to a provider
+        env["ANSWER_CACHE_THRESHOLD"] = "2"
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+
+
+def fmt(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+async def benchmark(args):
+    fixture = AudioFixture(args.audio)
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            QUESTIONS[:] = [line.strip() for line in f if line.strip()]
+
+    profiles = {"openai": args.openai, "ollama": args.ollama}
+    fake_port, app_port = free_port(), free_port()
+    fakes = multiprocessing.Process(target=serve_fakes, args=(fake_port, profiles), daemon=True)
+    fakes.start()
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    server = start_app(args, app_port, fake_port, workdir)
+    base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        await wait_ready(base_url, server)
+        async with httpx.AsyncClient() as client:
+            await client.post(f"{base_url}/update-key", json={"provider": args.provider, "key": "sk-benchmark"})
+
+        sampler = ProcessSampler(server.pid)
+        sampling = asyncio.create_task(sampler.run())
+        cpu_start, started = sampler.cpu_seconds(), time.perf_counter()
+        results = Results()
+        url = base_url.replace("http", "ws") + "/ws"
+        clients = []
+        for i in range(args.clients):
+            clients.append(asyncio.create_task(run_client(url, i, args, fixture, results)))
+            if args.ramp:
+                await asyncio.sleep(args.ramp / args.clients)
+        await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - started
+        cpu = sampler.cpu_seconds() - cpu_start
+        sampling.cancel()
+        async with httpx.AsyncClient() as client:
+            provider_health = (await client.get(f"{base_url}/provider-health")).json()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        fakes.terminate()
+
+    answered = sum(len(v) for v in results.latencies.values())
+    report = {
+        "clients": args.clients,
+        "requests_per_client": args.requests,
+        "provider": args.provider,
+        "profiles": profiles,
+        "elapsed_s": round(elapsed, 2),
+        "answers": answered,
+        "throughput_rps": round(answered / elapsed, 2) if elapsed else 0,
+        "errors": results.errors,
+        "fallbacks": results.fallbacks,
+        "stt_misses": results.stt_misses,
+        "gated": results.gated,
+        "timeouts": results.timeouts,
+        "connect_failures": results.connect_failures,
+        "server_cpu_percent": round(100 * cpu / elapsed, 1) if elapsed else 0,
+        "server_rss_mb": {"peak": round(sampler.rss_peak, 1),
+                          "mean": round(sum(sampler.rss_samples) / len(sampler.rss_samples), 1) if sampler.rss_samples else 0},
+        "provider_health": provider_health,
+    }
+    for kind in ("text", "audio"):
+        report[kind] = {
+            "count": len(results.latencies[kind]),
+            "latency_ms": {f"p{p}": fmt(percentile(results.latencies[kind], p)) for p in (50, 95, 99)},
+            "ttft_ms": {f"p{p}": fmt(percentile(results.ttft[kind], p)) for p in (50, 95, 99)},
+            "main_answer_ms": {f"p{p}": fmt(percentile(results.main[kind], p)) for p in (50, 95, 99)},
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['clients']} clients x {report['requests_per_client']} requests, provider {report['provider']}, {report['elapsed_s']}s")
+    print(f"{'input':<6} {'count':>6} {'p50':>7} {'p95':>7} {'p99':>7}   {'ttft p50':>8} {'p95':>7} {'p99':>7}"
+          f"   {'main p50':>8} {'p95':>7}  (ms)")
+    for kind in ("text", "audio"):
+        row = report[kind]
+        if not row["count"]:
+            continue
+        lat, ttft, main = row["latency_ms"], row["ttft_ms"], row["main_answer_ms"]
+        print(f"{kind:<6} {row['count']:>6} {lat['p50']:>7} {lat['p95']:>7} {lat['p99']:>7}   {ttft['p50']:>8} {ttft['p95']:>7} {ttft['p99']:>7}"
+              f"   {main['p50']:>8} {main['p95']:>7}")
+    print(f"throughput {report['throughput_rps']} answers/s | errors {report['errors']} | fallbacks {report['fallbacks']} "
+          f"| STT misses {report['stt_misses']} | gated {report['gated']} | timeouts {report['timeouts']} | connect failures {report['connect_failures']}")
+    print(f"server CPU {report['server_cpu_percent']}% | RSS peak {report['server_rss_mb']['peak']} MB, mean {report['server_rss_mb']['mean']} MB")
+
+
+def benchmark_store(args):
+    from transcript_store import TranscriptStore, answer_text
+    workdir = tempfile.mkdtemp(prefix="bench-store-")
+    store = TranscriptStore(os.path.join(workdir, "transcripts.db"))
+    store.start()
+    answer = json.loads(fake_answer("Content: " + QUESTIONS[0]))
+    interval = args.clients / args.store
+    started = time.perf_counter()
+    end = started + args.store_seconds
+    record_seconds = [[] for _ in range(args.clients)]
+
+    def produce(index):
+        rng, spent = random.Random(index), record_seconds[index]
+        session, due, turn = f"bench-{index}", started + rng.random() * interval, 0
+        while due < end:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            question = rng.choice(QUESTIONS)
+            # A turn: the utterance, the question it became and its answer
+            kind = ("utterance", "question", "answer")[turn % 3]
+            before = time.perf_counter()
+            if kind == "answer":
+                store.record(session, kind, answer_text(answer), "Interviewer", f"r{turn}", data=answer)
+            else:
+                store.record(session, kind, question, "Interviewer", f"r{turn}")
+            spent.append(time.perf_counter() - before)
+            turn += 1
+            due += interval
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    produced_s = time.perf_counter() - started
+    store.flush(timeout=120)
+    drained_s = time.perf_counter() - started
+
+    search_seconds = []
+    for question in QUESTIONS * 5:
+        before = time.perf_counter()
+        store.search(" ".join(question.split()[2:4]), limit=20)
+        search_seconds.append(time.perf_counter() - before)
+    store.close()
+    recorded = [s for spent in record_seconds for s in spent]
+
+    def us(values, p):
+        return round(percentile(values, p) * 1e6, 1) if values else None
+    return {
+        "target_events_per_s": args.store,
+        "producers": args.clients,
+        "seconds": args.store_seconds,
+        "recorded": len(recorded),
+        "written": store.written,
+        "dropped": store.dropped,
+        "committed_events_per_s": round(store.written / drained_s, 1),
+        "writer_lag_s": round(drained_s - produced_s, 3),
+        "record_us": {f"p{p}": us(recorded, p) for p in (50, 99, 99.9)},
+        "search_ms": {f"p{p}": round(percentile(search_seconds, p) * 1000, 2) for p in (50, 95)},
+        "db_mb": round(sum(os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir)) / 1e6, 1),
+    }
+
+
+def print_store_report(report):
+    rec, search = report["record_us"], report["search_ms"]
+    print(f"\ntranscript store: {report['producers']} producers, {report['target_events_per_s']} events/s for {report['seconds']}s")
+    print(f"recorded {report['recorded']} | written {report['written']} | dropped {report['dropped']} "
+          f"| committed {report['committed_events_per_s']} events/s | writer lag at end {report['writer_lag_s']}s")
+    print(f"record() on the caller: p50 {rec['p50']} us, p99 {rec['p99']} us, p99.9 {rec['p99.9']} us "
+          f"| search p50 {search['p50']} ms, p95 {search['p95']} ms | database {report['db_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20, help="concurrent /ws clients")
+    parser.add_argument("--requests", type=int, default=5, help="questions or utterances per client")
+    parser.add_argument("--provider", choices=["openai", "ollama"], default="openai")
+    parser.add_argument("--openai", type=parse_profile, default=parse_profile(""), help="fake OpenAI profile")
+    parser.add_argument("--ollama", type=parse_profile, default=parse_profile("latency=1.5,ttft=0.4"), help="fake Ollama profile")
+    parser.add_argument("--audio-share", type=float, default=0.0, help="share of turns sent as audio (0-1)")
+    parser.add_argument("--audio", help="16-bit WAV fixture instead of the synthesized utterance")
+    parser.add_argument("--questions", help="text fixture, one question per line")
+    parser.add_argument("--realtime", action="store_true", help="send audio at its real-time pace")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between a client's turns (s)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which clients connect")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for an answer")
+    parser.add_argument("--cache", action="store_true", help="leave the answer cache on")
+    parser.add_argument("--tiered", action="store_true", help="run the app with ANSWER_MODE=tiered")
+    parser.add_argument("--log-level", default="ERROR", help="app LOG_LEVEL")
+    parser.add_argument("--store", type=float, help="benchmark the transcript store at this many events/s instead")
+    parser.add_argument("--store-seconds", type=float, default=10.0, help="duration of the --store run")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.store:
+        report = benchmark_store(args)
+        print_store_report(report)
+    else:
+        report = asyncio.run(benchmark(args))
+        print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
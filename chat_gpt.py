@@ -1,19 +1,108 @@
 import os
 import json
-from openai import OpenAI
+import re
+import asyncio
+import threading
+import time
+import weakref
+import logging
 from dotenv import load_dotenv
+from json_stream import IncrementalJSONParser
+from model_registry import GeminiModelRegistry
+from answer_cache import SemanticAnswerCache, standalone
+from local_whisper import LocalWhisperEngine
+from audio_buffer import AudioPayload
+from audio_codec import STTUpload, ffmpeg_encoders
+from async_providers import AsyncProviderPool
+from local_llm import LocalModel, OLLAMA_MODEL
+from hedging import hedged_race
+from provider_router import ProviderRouter, ProviderError, QuotaExceeded, ProviderTimeout, ProviderUnavailable
+from telemetry import metrics, fields
 
 load_dotenv()
 
-import google.generativeai as genai_stable
-import ollama
+PROVIDER_NAMES = {"openai": "OpenAI", "gemini": "Gemini", "ollama": "Local AI"}
+
+# ANSWER_MODE=tiered asks for main_answer + keywords in a short call of its own, alongside the expansion
+ANSWER_MODE = os.getenv("ANSWER_MODE", "single")
+# The fast tier's provider (e.g. "ollama" for the local small model); unset, the session's provider
+FAST_ANSWER_PROVIDER = os.getenv("FAST_ANSWER_PROVIDER") or None
+FAST_ANSWER_MAX_TOKENS = int(os.getenv("FAST_ANSWER_MAX_TOKENS", 200))
+FAST_OPENAI_MODEL = os.getenv("FAST_OPENAI_MODEL", "gpt-4o-mini")
+FAST_OLLAMA_MODEL = os.getenv("FAST_OLLAMA_MODEL", OLLAMA_MODEL)
+# Provider slot priority of background completions: behind every answer tier (0-2)
+BACKGROUND_PRIORITY = 3
+
+FAST_FORMAT = """
+        Output JSON Format:
+        {
+            "main_answer": "Direct answer or strategic advice (2-3 sentences max).",
+            "keywords": ["Required Skill", "Industry Term", "Key Concept"]
+        }
+        """
+EXPANSION_FORMAT = """
+        Output JSON Format (the short direct answer is written separately, do not repeat it):
+        {
+            "star_expansion": "Detailed explanation or technical deep-dive if needed.",
+            "talking_points": ["Ongoing tip 1", "Key takeaway 1"],
+            "interviewer_question": "Anticipated next question or a clever follow-up the user should ask."
+        }
+        """
+
+log = logging.getLogger(__name__)
+
+provider_latency = metrics.histogram("provider_latency_seconds", "Successful answer calls per provider", ("provider",))
+provider_errors = metrics.counter("provider_errors_total", "Failed answer calls per provider and error kind", ("provider", "kind"))
+answer_fallbacks = metrics.counter("answer_fallbacks_total", "Answers served by another provider than the selected one", ("selected", "served_by"))
+answer_cache_lookups = metrics.counter("answer_cache_lookups_total", "Answer cache lookups", ("result",))
+stt_latency = metrics.histogram("stt_latency_seconds", "Successful transcriptions per backend", ("backend",))
+stt_errors = metrics.counter("stt_errors_total", "Failed transcription attempts per backend", ("backend",))
+tier_latency = metrics.histogram("answer_tier_seconds", "Time until each tier of a tiered answer is complete", ("tier",))
+
+
+class ProviderSettings:
+    """Provider choice and OpenAI key for one session; unset fields use the assistant's defaults."""
+    def __init__(self, provider=None, openai_key=None):
+        self.provider = provider
+        self.openai_key = openai_key
+
+
+class AnswerTier:
+    """One answer call: the JSON fields its prompt asks for, its output budget, the models it runs on
+    and its priority for a provider slot (lower goes first)."""
+    def __init__(self, name, prompt, fields, max_tokens, openai_model="gpt-4o-mini", ollama_model=OLLAMA_MODEL, priority=1):
+        self.name = name
+        self.prompt = prompt
+        self.fields = fields
+        self.max_tokens = max_tokens
+        self.openai_model = openai_model
+        self.ollama_model = ollama_model
+        self.priority = priority
+
 
 class ChatGPTAssistant:
     def __init__(self):
+        self.gemini_registry = GeminiModelRegistry()
+        # Async clients are bound to the loop that uses them: one pool per event loop
+        self._provider_pools = weakref.WeakKeyDictionary()
+        self._sync_loop = None
+        self._sync_lock = threading.Lock()
         self._init_openai(os.getenv("OPENAI_API_KEY"))
         self._init_gemini(os.getenv("GEMINI_API_KEY"))
+        self.answer_cache = self._build_answer_cache()
+        # STT_BACKEND=local transcribes on this machine first, remote APIs become the fallback
+        self.stt_backend = os.getenv("STT_BACKEND", "remote")
+        self.local_stt = LocalWhisperEngine() if self.stt_backend == "local" else None
+        # The local fallback model, loaded and pinned by warm_up_local_model()
+        self.local_llm = LocalModel()
         self.provider = "gemini" # Set Gemini as default
-        self.system_prompt = """
+        # ANSWER_HEDGING=1 races the fallback provider once the primary is slower than
+        # HEDGE_DELAY: a number of seconds, or "p95" of its recent latencies
+        self.hedging = os.getenv("ANSWER_HEDGING", "0").lower() in ("1", "true", "on")
+        self.hedge_delay = os.getenv("HEDGE_DELAY", "p95")
+        self.hedge_delay_default = float(os.getenv("HEDGE_DELAY_DEFAULT", 2.0))
+        self.router = ProviderRouter()
+        self.answer_role = """
         You are an Elite Real-Time Meeting & Interview Assistant. You are listening to a live conversation.
         
         Your Role:
@@ -24,7 +113,8 @@ class ChatGPTAssistant:
         - Keep responses concise, professional, and strategic.
         
         Input Format: Context from either 'Interviewer/Host' or 'Candidate/User'.
-
+"""
+        self.system_prompt = self.answer_role + """
         Output JSON Format:
         {
             "main_answer": "Direct answer or strategic advice (2-3 sentences max).",
@@ -34,207 +124,531 @@ class ChatGPTAssistant:
             "interviewer_question": "Anticipated next question or a clever follow-up the user should ask."
         }
         """
+        self.tiers = {
+            "full": AnswerTier("full", self.system_prompt,
+                               ("main_answer", "star_expansion", "talking_points", "keywords", "interviewer_question"), 800),
+            "fast": AnswerTier("fast", self.answer_role + FAST_FORMAT, ("main_answer", "keywords"),
+                               FAST_ANSWER_MAX_TOKENS, FAST_OPENAI_MODEL, FAST_OLLAMA_MODEL, priority=0),
+            "expansion": AnswerTier("expansion", self.answer_role + EXPANSION_FORMAT,
+                                    ("star_expansion", "talking_points", "interviewer_question"), 800, priority=2)
+        }
     def _init_openai(self, api_key):
-        self.openai_client = OpenAI(api_key=api_key)
+        self.openai_key = api_key
+        self._openai_client = None
+
+    @property
+    def openai_client(self):
+        # Sync client for the few non-hot-path calls (cache embeddings), built on first use
+        if self._openai_client is None:
+            from openai import OpenAI
+            self._openai_client = OpenAI(api_key=self.openai_key)
+        return self._openai_client
+
+    def warm_up(self):
+        """Blocking first-use work (SDK imports, ffmpeg encoder probe, Gemini model discovery), run in the background after startup."""
+        # Imported here so the first request does not pay for it
+        import openai  # noqa: F401
+        import ollama  # noqa: F401
+        ffmpeg_encoders()
+        if self.gemini_key:
+            self.gemini_registry.refresh()
+
+    def warm_up_local_model(self):
+        """Blocking: loads and pins the local Ollama models (the fast tier's too) so a fallback
+        to either starts generating at once."""
+        self.local_llm.warm_up(also=(FAST_OLLAMA_MODEL,))
+
+    def _providers(self):
+        loop = asyncio.get_running_loop()
+        pool = self._provider_pools.get(loop)
+        if pool is None:
+            pool = self._provider_pools[loop] = AsyncProviderPool()
+        return pool
+
+    def provider_stats(self):
+        return {"gemini_model": self.gemini_registry.model_name,
+                "hedging": self.hedging,
+                "pools": [pool.stats() for pool in list(self._provider_pools.values())]}
+
+    async def aclose(self):
+        pool = self._provider_pools.pop(asyncio.get_running_loop(), None)
+        if pool:
+            await pool.aclose()
+
+    def _submit(self, coro):
+        """Schedules a coroutine on the assistant's private loop, for callers without one (desktop UI)."""
+        with self._sync_lock:
+            if self._sync_loop is None:
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._sync_loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._sync_loop)
+
+    def _run_sync(self, coro):
+        return self._submit(coro).result()
+
+    def start_stt_engine(self):
+        """Loads the local Whisper workers ahead of the first segment (no-op for remote STT)."""
+        if self.local_stt:
+            self.local_stt.start()
+
+    def stop_stt_engine(self):
+        if self.local_stt:
+            self.local_stt.stop()
+
+    def _build_answer_cache(self):
+        # Provider embeddings catch rewordings the local lexical embedding misses,
+        # at the cost of one embeddings call per lookup
+        if os.getenv("ANSWER_CACHE_EMBEDDER", "lexical") == "openai" and self.openai_key:
+            def embed(text):
+                vector = self.openai_client.embeddings.create(model="text-embedding-3-small", input=text).data[0].embedding
+                return {str(i): v for i, v in enumerate(vector)}
+            return SemanticAnswerCache(embed_fn=embed, embedder_name="openai:text-embedding-3-small")
+        return SemanticAnswerCache()
 
     def _init_gemini(self, api_key):
-        if api_key and "your_gemini_api_key" not in api_key:
-            try:
-                genai_stable.configure(api_key=api_key)
-                
-                # Auto-detect available models
-                available_models = [m.name for m in genai_stable.list_models() if 'generateContent' in m.supported_generation_methods]
-                print(f"Available Gemini Models: {available_models}")
-                
-                # Priority list
-                priority = [
-                    'models/gemini-1.5-flash',
-                    'models/gemini-1.5-flash-latest',
-                    'models/gemini-2.0-flash-exp',
-                    'models/gemini-1.0-pro',
-                    'models/gemini-pro'
-                ]
-                
-                selected_model = None
-                for p in priority:
-                    if p in available_models:
-                        selected_model = p
-                        break
-                
-                if not selected_model and available_models:
-                    selected_model = available_models[0]
-                
-                if selected_model:
-                    print(f"Selected Gemini Model: {selected_model}")
-                    self.gemini_model = genai_stable.GenerativeModel(selected_model)
-                else:
-                    print("No suitable Gemini model found!")
-                    self.gemini_model = None
-            except Exception as e:
-                print(f"Gemini Init Error: {e}")
-                self.gemini_model = None
-        else:
-            self.gemini_model = None
+        # Only the key is kept here: discovery runs in warm_up() or on first use, never in the constructor
+        self.gemini_key = api_key if api_key and "your_gemini_api_key" not in api_key else None
+        self.gemini_registry.configure(self.gemini_key)
 
-    def update_key(self, new_key, provider="openai"):
+    def update_key(self, new_key, provider="openai", settings=None):
+        if settings is not None:
+            # Only this session switches. Gemini keys are process-wide in the SDK, so that one is shared.
+            if provider == "openai":
+                settings.openai_key = new_key
+            elif provider == "gemini":
+                self._init_gemini(new_key)
+                self.gemini_registry.refresh_in_background()
+            settings.provider = provider
+            return
         if provider == "openai":
             self._init_openai(new_key)
             self.provider = "openai"
         elif provider == "gemini":
             self._init_gemini(new_key)
+            self.gemini_registry.refresh_in_background()
             self.provider = "gemini"
         elif provider == "ollama":
             self.provider = "ollama"
 
-    def get_answer(self, question, source="Interviewer"):
-        target_provider = self.provider
-        print(f"System: Processing via {target_provider.upper()}...")
-        
-        # Explicitly try the user's selected provider
+    def get_answer(self, question, source="Interviewer", on_delta=None, settings=None, memory=None):
+        """Blocking form of aget_answer for code that has no event loop."""
+        return self._run_sync(self.aget_answer(question, source, on_delta, settings, memory))
+
+    def submit_answer(self, question, source="Interviewer", on_delta=None, settings=None, memory=None):
+        """aget_answer as a concurrent.futures.Future; cancelling it cancels the provider calls.
+        on_delta is called on the assistant's loop thread."""
+        return self._submit(self.aget_answer(question, source, on_delta, settings, memory))
+
+    async def aget_answer(self, question, source="Interviewer", on_delta=None, settings=None, memory=None):
+        """Returns the structured answer. If on_delta is given, providers stream and
+        each partial field update is passed to it as it arrives. With a
+        ConversationMemory, its context goes into the prompt and the turn is recorded.
+        Mid-conversation, the answer cache only serves self-contained questions: a
+        follow-up ("Why?", "What did you learn from it?") means something else in
+        every conversation."""
+        context = memory.context() if memory is not None else ""
+        cacheable = not context or standalone(question)
+        if not cacheable:
+            answer_cache_lookups.inc("bypass")
+        else:
+            try:
+                cached = await self._cache_lookup(question, source)
+                answer_cache_lookups.inc("hit" if cached else "miss")
+                if cached:
+                    log.info("answer cache hit", extra=fields(question=question[:40]))
+                    if memory is not None:
+                        memory.add(source, question, cached.get("main_answer"))
+                    return cached
+            except Exception as e:
+                log.warning("answer cache lookup failed", extra=fields(error=str(e)))
+
+        if ANSWER_MODE == "tiered" and self._tiers_fit(settings):
+            result = await self._get_tiered_answer(question, source, on_delta, settings, context)
+        else:
+            result = await self._get_provider_answer(question, source, on_delta, settings, context)
+        if memory is not None and "error" not in result:
+            memory.add(source, question, result.get("main_answer"))
+        if cacheable and self._is_cacheable(result):
+            # Persisting writes a file; keep it off the answer path
+            asyncio.get_running_loop().run_in_executor(None, self._cache_store, question, source, result)
+        return result
+
+    async def _cache_lookup(self, question, source):
+        if self.answer_cache.embedder_name == "lexical":
+            return self.answer_cache.lookup(question, source)
+        # Provider embeddings are a blocking network call
+        return await asyncio.to_thread(self.answer_cache.lookup, question, source)
+
+    def _cache_store(self, question, source, result):
         try:
-            if target_provider == "openai":
-                result = self._get_openai_answer(question, source)
-                if "Error" not in result.get("main_answer", ""):
-                    return result
-            
-            elif target_provider == "gemini":
-                result = self._get_gemini_answer(question, source)
-                # If Gemini works, return it. If quota is 429, we'll hit the fallback below.
-                if "Quota" not in result.get("main_answer", "") and "Error" not in result.get("main_answer", ""):
-                    return result
-            
-            elif target_provider == "ollama":
-                return self._get_ollama_answer(question, source)
-                
+            self.answer_cache.put(question, source, result)
         except Exception as e:
-            print(f"User selected provider {target_provider} failed: {e}")
+            log.warning("answer cache store failed", extra=fields(error=str(e)))
+
+    def _is_cacheable(self, result):
+        # Errors and fallback answers should be retried, not replayed
+        return (bool(result.get("main_answer")) and "error" not in result and "fallback_from" not in result
+                and "expansion_error" not in result)
+
+    def _hedge_delay(self, provider):
+        """Seconds to wait on provider before also asking the next one; None disables hedging."""
+        if not self.hedging:
+            return None
+        if self.hedge_delay != "p95":
+            return float(self.hedge_delay)
+        p95 = self.router.health[provider].latency.percentile(95)
+        return p95 if p95 is not None else self.hedge_delay_default
+
+    async def _call_provider(self, provider, question, source, on_delta, openai_key, context="", tier=None):
+        tier = tier or self.tiers["full"]
+        health = self.router.health_for(provider, self._session_keys(openai_key).get(provider))
+        if not health.acquire():
+            raise ProviderUnavailable(provider, f"{PROVIDER_NAMES[provider]} is cooling down after errors.")
+        started = time.monotonic()
+        finished = False
+        try:
+            if provider == "openai":
+                result = await self._get_openai_answer(question, source, on_delta, openai_key, context, tier)
+            elif provider == "gemini":
+                result = await self._get_gemini_answer(question, source, on_delta, context, tier)
+            else:
+                result = await self._get_ollama_answer(question, source, on_delta, context, tier)
+            health.record_success(time.monotonic() - started)
+            provider_latency.observe(time.monotonic() - started, provider)
+            finished = True
+            return result
+        except ProviderError as e:
+            health.record_failure(e)
+            provider_errors.inc(provider, e.kind)
+            finished = True
+            raise
+        finally:
+            if not finished:
+                # Cancelled (lost a hedged race, or the client went away): no verdict on the provider
+                health.release()
+
+    def _session_keys(self, openai_key):
+        """Keys a session brought itself: their failures count against that key's circuit, not the provider's."""
+        return {"openai": openai_key} if openai_key and openai_key != self.openai_key else {}
+
+    def _candidates(self, target_provider, openai_key):
+        """Providers that can serve this request: the selected one plus every configured fallback."""
+        configured = {"openai": bool(openai_key), "gemini": self.gemini_key is not None, "ollama": True}
+        return [p for p in PROVIDER_NAMES if p == target_provider or configured[p]]
+
+    async def _get_provider_answer(self, question, source, on_delta=None, settings=None, context="", tier=None, provider=None):
+        target_provider = provider or (settings and settings.provider) or self.provider
+        openai_key = (settings and settings.openai_key) or self.openai_key
+        keys = self._session_keys(openai_key)
+        attempts = self.router.route(target_provider, self._candidates(target_provider, openai_key), keys)
+        if not attempts:
+            return ProviderUnavailable(target_provider, "All AI providers are cooling down after errors. Please retry shortly.").as_answer()
+        log.info("answering", extra=fields(provider=attempts[0], source=source))
+
+        # Healthy providers in router order; the next one starts when one fails or,
+        # with hedging on, when the current one is slower than usual. First answer wins.
+        winner, result, failures = await hedged_race(
+            attempts,
+            lambda provider, delta: self._call_provider(provider, question, source, delta, openai_key, context, tier),
+            self._hedge_delay,
+            on_delta
+        )
+        if winner is None:
+            # Every provider failed: report the primary's own error, without asking it again
+            return failures.get(target_provider, next(iter(failures.values()))).as_answer()
+        if winner != target_provider and (target_provider in failures or target_provider not in attempts):
+            health = self.router.health_for(target_provider, keys.get(target_provider))
+            reason = "LIMIT REACHED" if health.last_kind == "quota" else "UNAVAILABLE"
+            log.warning("answer served by fallback", extra=fields(selected=target_provider, served_by=winner, reason=health.last_kind))
+            answer_fallbacks.inc(target_provider, winner)
+            if "main_answer" in result:
+                result["main_answer"] = f"⚠️ [{target_provider.upper()} {reason}] - Fallback to {PROVIDER_NAMES[winner]}: " + result["main_answer"]
+            result["fallback_from"] = target_provider
+        elif winner != target_provider:
+            log.info("answer served by another provider", extra=fields(selected=target_provider, served_by=winner))
+        return result
+
+    def _tiers_fit(self, settings):
+        """Two calls only pay off while the providers have room for both; at capacity one full call waits less."""
+        pool = self._providers()
+        target = (settings and settings.provider) or self.provider
+        fast = FAST_ANSWER_PROVIDER or target
+        if fast == target:
+            return pool.spare(target) >= 2
+        return pool.spare(fast) >= 1 and pool.spare(target) >= 1
+
+    async def _get_tiered_answer(self, question, source, on_delta, settings, context):
+        """The fast tier (main_answer, keywords) and the expansion run concurrently. Their fields
+        do not overlap, so both stream into the same answer; the fast tier's result is also
+        passed to on_delta as {"tier": "fast", "answer": ...} the moment it is complete."""
+        started = time.monotonic()
+        fast_tier, expansion_tier = self.tiers["fast"], self.tiers["expansion"]
+
+        def tier_deltas(tier):
+            if on_delta is None:
+                return None
+            # A hedged race restarting one tier only takes back that tier's fields
+            return lambda event: on_delta(dict(event, fields=list(tier.fields)) if event.get("reset") else event)
+
+        async def fast():
+            result = await self._get_provider_answer(question, source, tier_deltas(fast_tier), settings, context,
+                                                     fast_tier, FAST_ANSWER_PROVIDER)
+            tier_latency.observe(time.monotonic() - started, "fast")
+            if on_delta is not None:
+                on_delta({"tier": "fast", "answer": result})
+            return result
+
+        async def expansion():
+            result = await self._get_provider_answer(question, source, tier_deltas(expansion_tier), settings, context,
+                                                     expansion_tier)
+            tier_latency.observe(time.monotonic() - started, "expansion")
+            return result
+
+        fast_answer, expansion_answer = await asyncio.gather(fast(), expansion())
+        if "error" in expansion_answer:
+            # The short answer stands on its own; not cached, so the expansion is asked again next time
+            log.warning("answer expansion failed", extra=fields(error=expansion_answer.get("main_answer")))
+            return dict(fast_answer, expansion_error=expansion_answer.get("main_answer"))
+        # The fast tier owns its fields (and reports its errors); the expansion fills in the rest
+        return {**expansion_answer, **{k: v for k, v in fast_answer.items() if k in fast_tier.fields or k not in expansion_answer}}
 
-        # Fallback to Ollama ONLY if the primary failed and it wasn't already Ollama
-        if target_provider != "ollama":
-            print(f"!!! {target_provider.upper()} failed or quota hit. Falling back to local Ollama...")
+    async def acomplete(self, prompt, settings=None):
+        """Plain-text completion on the first healthy provider, for background jobs like memory summaries.
+        Queues behind answers for provider slots, and never takes the local model's last free slot:
+        a CPU-bound summary would hold it for as long as an answer takes."""
+        target_provider = (settings and settings.provider) or self.provider
+        openai_key = (settings and settings.openai_key) or self.openai_key
+        for provider in self.router.route(target_provider, self._candidates(target_provider, openai_key),
+                                          self._session_keys(openai_key)):
+            if provider == "ollama" and self._providers().spare("ollama") <= 1:
+                log.debug("completion skips the local model", extra=fields(spare=self._providers().spare("ollama")))
+                continue
             try:
-                result = self._get_ollama_answer(question, source)
-                result["main_answer"] = f"⚠️ [{target_provider.upper()} LIMIT REACHED] - Fallback to Local AI: " + result["main_answer"]
-                return result
-            except:
-                pass
+                if provider == "openai":
+                    client = self._providers().openai(openai_key)
+                    response = await self._providers().call("openai", lambda: client.chat.completions.create(
+                        model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], max_tokens=600),
+                        BACKGROUND_PRIORITY)
+                    return response.choices[0].message.content
+                if provider == "gemini":
+                    model = await self._gemini_model()
+                    response = await self._providers().call("gemini", lambda: model.generate_content_async(prompt),
+                                                            BACKGROUND_PRIORITY)
+                    return response.text
+                client = self._providers().ollama()
+                response = await self._providers().call("ollama", lambda: client.chat(
+                    model=self.local_llm.model, messages=[{'role': 'user', 'content': prompt}],
+                    keep_alive=self.local_llm.keep_alive), BACKGROUND_PRIORITY)
+                self.local_llm.record(response)
+                return response['message']['content']
+            except Exception as e:
+                log.warning("completion failed", extra=fields(provider=provider, error=repr(e)))
+        return None
 
-        # If everything fails, return the original error from primary
-        if target_provider == "gemini": return self._get_gemini_answer(question, source)
-        return self._get_openai_answer(question, source)
+    def _user_content(self, question, source, context=""):
+        # Conversation memory goes after the system prompt, never into it, so that
+        # prefix stays byte-identical across calls and providers can cache it
+        content = f"Source: {source}\nContent: {question}"
+        return f"{context}\n\n{content}" if context else content
 
-    def _get_openai_answer(self, question, source):
+    async def _consume_stream(self, pieces, on_delta):
+        """Feeds streamed text pieces through the incremental parser and returns the full text."""
+        parser = IncrementalJSONParser()
+        content = []
+        async for piece in pieces:
+            if not piece:
+                continue
+            content.append(piece)
+            for event in parser.feed(piece):
+                on_delta(event)
+        return "".join(content)
+
+    async def _get_openai_answer(self, question, source, on_delta=None, openai_key=None, context="", tier=None):
+        tier = tier or self.tiers["full"]
         try:
-            print(f"Querying OpenAI ({source})...")
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"Source: {source}\nContent: {question}"}
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=800
-            )
-            return json.loads(response.choices[0].message.content)
+            log.debug("querying OpenAI", extra=fields(source=source))
+            client = self._providers().openai(openai_key or self.openai_key)
+
+            async def call():
+                response = await client.chat.completions.create(
+                    model=tier.openai_model,
+                    messages=[
+                        {"role": "system", "content": tier.prompt},
+                        {"role": "user", "content": self._user_content(question, source, context)}
+                    ],
+                    response_format={"type": "json_object"},
+                    max_tokens=tier.max_tokens,
+                    stream=on_delta is not None
+                )
+                if on_delta:
+                    pieces = (chunk.choices[0].delta.content async for chunk in response if chunk.choices)
+                    return await self._consume_stream(pieces, on_delta)
+                return response.choices[0].message.content
+
+            return json.loads(await self._providers().call("openai", call, tier.priority))
         except Exception as e:
-            print(f"!!! OpenAI Error: {e}")
-            return {"main_answer": f"OpenAI Error: {str(e)}", "talking_points": [], "keywords": [], "interviewer_question": ""}
+            log.warning("OpenAI call failed", extra=fields(error=repr(e)))
+            message = f"OpenAI Error: {str(e) or type(e).__name__}"
+            import openai
+            if isinstance(e, openai.RateLimitError):
+                raise QuotaExceeded("openai", message) from e
+            if isinstance(e, asyncio.TimeoutError):
+                raise ProviderTimeout("openai", message) from e
+            raise ProviderError("openai", message) from e
 
-    def _get_gemini_answer(self, question, source):
+    async def _gemini_model(self):
+        if self.gemini_registry.model is None:
+            # First use: discovery is a blocking network call
+            return await asyncio.to_thread(self.gemini_registry.get_model)
+        return self.gemini_registry.get_model()
+
+    async def _get_gemini_answer(self, question, source, on_delta=None, context="", tier=None):
+        tier = tier or self.tiers["full"]
         try:
-            # Dynamically find the best available model to avoid 404
-            all_models = [m.name for m in genai_stable.list_models() if 'generateContent' in m.supported_generation_methods]
-            
-            # Look for 1.5-flash as priority, then any flash, then any pro
-            model_name = next((m for m in all_models if '1.5-flash' in m), 
-                         next((m for m in all_models if 'flash' in m), 
-                         next((m for m in all_models if '1.5-pro' in m), 
-                         all_models[0] if all_models else 'models/gemini-1.5-flash')))
-            
-            print(f"Querying Gemini ({model_name}) for {source}...")
-            temp_model = genai_stable.GenerativeModel(model_name)
-            response = temp_model.generate_content(
-                f"{self.system_prompt}\n\nSource: {source}\nContent: {question}",
-                generation_config=genai_stable.types.GenerationConfig(response_mime_type="application/json"),
-                request_options={"timeout": 12}
-            )
-            return json.loads(response.text)
+            import google.generativeai as genai
+            model = await self._gemini_model()
+            lookup = self.gemini_registry.stats()
+            log.debug("querying Gemini", extra=fields(model=self.gemini_registry.model_name, source=source,
+                                                      model_lookup="hit" if lookup["last_lookup_hit"] else "miss",
+                                                      model_lookup_ms=lookup["last_lookup_ms"]))
+
+            async def call():
+                response = await model.generate_content_async(
+                    f"{tier.prompt}\n\n{self._user_content(question, source, context)}",
+                    generation_config=genai.types.GenerationConfig(response_mime_type="application/json",
+                                                                   max_output_tokens=tier.max_tokens),
+                    stream=on_delta is not None
+                )
+                if on_delta:
+                    return await self._consume_stream((chunk.text async for chunk in response), on_delta)
+                return response.text
+
+            return json.loads(await self._providers().call("gemini", call, tier.priority))
         except Exception as e:
-            err_str = str(e)
-            print(f"!!! Gemini Error: {err_str[:100]}")
-            # Identify if it's a quota issue
-            if "429" in err_str or "quota" in err_str.lower():
-                return {"main_answer": "Gemini Quota Exceeded.", "talking_points": [], "keywords": [], "interviewer_question": ""}
-            return {"main_answer": f"Gemini Error: {err_str[:50]}", "talking_points": [], "keywords": [], "interviewer_question": ""}
-
-    def _get_ollama_answer(self, question, source):
+            err_str = str(e) or type(e).__name__
+            log.warning("Gemini call failed", extra=fields(error=err_str[:100]))
+            from google.api_core import exceptions as google_exceptions
+            if isinstance(e, google_exceptions.ResourceExhausted):
+                raise QuotaExceeded("gemini", "Gemini Quota Exceeded.") from e
+            if isinstance(e, asyncio.TimeoutError):
+                raise ProviderTimeout("gemini", f"Gemini Error: {err_str[:50]}") from e
+            raise ProviderError("gemini", f"Gemini Error: {err_str[:50]}") from e
+
+    async def _get_ollama_answer(self, question, source, on_delta=None, context="", tier=None):
+        tier = tier or self.tiers["full"]
         try:
-            model_name = 'llama3.2:1b'
-            print(f"Querying Ollama Local ({model_name}) for {source}...")
-            response = ollama.chat(
-                model=model_name,
-                messages=[
-                    {'role': 'system', 'content': self.system_prompt + " \nIMPORTANT: Output ONLY a valid JSON object. No other text."},
-                    {'role': 'user', 'content': f"Source: {source}\nContent: {question}"}
-                ],
-                format='json'
-            )
-            content = response['message']['content']
+            model_name = tier.ollama_model
+            log.debug("querying Ollama", extra=fields(model=model_name, source=source))
+            client = self._providers().ollama()
+
+            async def call():
+                response = await client.chat(
+                    model=model_name,
+                    messages=[
+                        {'role': 'system', 'content': tier.prompt + " \nIMPORTANT: Output ONLY a valid JSON object. No other text."},
+                        {'role': 'user', 'content': self._user_content(question, source, context)}
+                    ],
+                    format='json',
+                    options={'num_predict': tier.max_tokens},
+                    keep_alive=self.local_llm.keep_alive,
+                    stream=on_delta is not None
+                )
+                if on_delta:
+                    return await self._consume_stream(self._ollama_pieces(response, model_name), on_delta)
+                self.local_llm.record(response, model_name)
+                return response['message']['content']
+
+            content = await self._providers().call("ollama", call, tier.priority)
             
             # Robust JSON extraction
             try:
                 return json.loads(content)
             except:
-                import re
                 match = re.search(r'\{.*\}', content, re.DOTALL)
                 if match:
                     return json.loads(match.group())
                 raise ValueError("JSON not found in response")
                 
         except Exception as e:
-            err_msg = str(e)
-            print(f"!!! Ollama Error: {err_msg}")
-            return {"main_answer": "Local AI is currently overloaded or starting up. Please retry in a moment.", "talking_points": [], "keywords": [], "interviewer_question": ""}
+            err_msg = str(e) or type(e).__name__
+            log.warning("Ollama call failed", extra=fields(error=err_msg))
+            error = ProviderTimeout if isinstance(e, asyncio.TimeoutError) else ProviderError
+            raise error("ollama", "Local AI is currently overloaded or starting up. Please retry in a moment.") from e
+
+    async def _ollama_pieces(self, response, model_name):
+        async for part in response:
+            if part.get('done'):
+                # The last part carries the generation's token counts
+                self.local_llm.record(part, model_name)
+            yield part['message']['content']
+
+    def transcribe_audio(self, audio, mime_type="audio/webm", settings=None):
+        """Blocking form of atranscribe_audio for code that has no event loop."""
+        return self._run_sync(self.atranscribe_audio(audio, mime_type, settings))
+
+    async def atranscribe_audio(self, audio, mime_type="audio/webm", settings=None):
+        """Transcribes audio (bytes or an AudioPayload) using Whisper OR Gemini as a fallback."""
+        openai_key = (settings and settings.openai_key) or self.openai_key
+        if not isinstance(audio, AudioPayload):
+            audio = AudioPayload(audio)
+        # Remote backends get PCM segments re-encoded to their smallest accepted format
+        upload = STTUpload(audio, mime_type)
+        # 0. Local warm Whisper if this deployment selected it
+        if self.local_stt:
+            started = time.monotonic()
+            try:
+                text = await asyncio.wrap_future(self.local_stt.submit(audio.tobytes()))
+                if text is not None:
+                    stt_latency.observe(time.monotonic() - started, "local")
+                    return text or None
+            except Exception as e:
+                stt_errors.inc("local")
+                log.warning("local Whisper failed", extra=fields(error=str(e)))
 
-    def transcribe_audio(self, audio_bytes):
-        """Transcribes audio using Whisper OR Gemini as a fallback."""
         # 1. Try Whisper if OpenAI is configured
-        if self.openai_client.api_key:
+        if openai_key:
+            started = time.monotonic()
             try:
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-                    tmp.write(audio_bytes)
-                    tmp_path = tmp.name
-                
-                try:
-                    with open(tmp_path, "rb") as audio_file:
-                        transcript = self.openai_client.audio.transcriptions.create(
+                client = self._providers().openai(openai_key)
+                payload, payload_type = await upload.for_backend("openai")
+                suffix = "." + payload_type.split("/")[-1].split(";")[0]
+
+                async def call():
+                    # Streamed from memory; the SDK only needs a name to infer the format
+                    with payload.open() as audio_file:
+                        return await client.audio.transcriptions.create(
                             model="whisper-1", 
-                            file=audio_file
+                            file=(f"segment{suffix}", audio_file)
                         )
-                    if transcript.text:
-                        return transcript.text
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
+
+                transcript = await self._providers().call("stt", call)
+                if transcript.text:
+                    stt_latency.observe(time.monotonic() - started, "openai")
+                    return transcript.text
             except Exception as e:
-                print(f"Whisper Error: {e}")
+                stt_errors.inc("openai")
+                log.warning("Whisper API failed", extra=fields(error=repr(e)))
 
         # 2. Try Gemini fallback if configured
-        if self.gemini_model:
+        if self.gemini_key:
+            started = time.monotonic()
             try:
-                print("Using Gemini fallback for transcription...")
+                log.info("transcribing with Gemini fallback")
+                model = await self._gemini_model()
+                payload, payload_type = await upload.for_backend("gemini")
                 # Use a specific high-efficiency model for transcription
-                response = self.gemini_model.generate_content([
+                response = await self._providers().call("stt", lambda: model.generate_content_async([
                     "Transcribe the following audio. Output ONLY the text of the speech.",
                     {
-                        "mime_type": "audio/webm",
-                        "data": audio_bytes
+                        "mime_type": payload_type,
+                        "data": payload.tobytes()
                     }
-                ])
+                ]))
                 if response.text:
+                    stt_latency.observe(time.monotonic() - started, "gemini")
                     return response.text.strip()
             except Exception as e:
-                print(f"Gemini Transcription Error: {e}")
+                stt_errors.inc("gemini")
+                log.warning("Gemini transcription failed", extra=fields(error=repr(e)))
 
         return None
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from telemetry import fields
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", 1200))
+MEMORY_RECENT_TOKENS = int(os.getenv("MEMORY_RECENT_TOKENS", 700))
+
+log = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English; close enough for budgeting without a tokenizer
+    return len(text) // 4 + 1 if text else 0
+
+
+def clip_tokens(text, tokens):
+    """Keeps the end of text (the most recent part) within a token budget."""
+    limit = tokens * 4
+    if limit <= 0:
+        return ""
+    return text if len(text) <= limit else "…" + text[-limit:]
+
+
+class ConversationMemory:
+    """Rolling context for one session, kept inside a fixed token budget.
+
+    The newest turns are kept verbatim up to `recent_budget` tokens. Turns that
+    fall out of that window are folded into a running summary by a background
+    task (`summarize(prompt)` returns text), so answering never waits on it.
+    The summary is held to the rest of the budget, which keeps prompt size,
+    and with it latency, flat however long the session runs.
+    """
+
+    def __init__(self, summarize=None, spawn=asyncio.create_task, budget=MEMORY_TOKEN_BUDGET, recent_budget=MEMORY_RECENT_TOKENS):
+        self.summarize = summarize
+        self.spawn = spawn
+        self.recent_budget = min(recent_budget, budget)
+        self.summary_budget = budget - self.recent_budget
+        self.summary = ""
+        self.recent = deque()
+        self.recent_tokens = 0
+        self.pending = []
+        self.turns = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self._summarizing = None
+
+    def add(self, source, question, answer=None):
+        turn = f"{source}: {question.strip()}"
+        if answer:
+            turn += f"\nAssistant: {answer.strip()}"
+        turn = clip_tokens(turn, self.recent_budget)
+        tokens = estimate_tokens(turn)
+        self.recent.append((turn, tokens))
+        self.recent_tokens += tokens
+        self.turns += 1
+        while self.recent_tokens > self.recent_budget and len(self.recent) > 1:
+            old, old_tokens = self.recent.popleft()
+            self.recent_tokens -= old_tokens
+            self.pending.append(old)
+        if self.pending and self._summarizing is None:
+            self._summarizing = self.spawn(self._summarize_pending())
+
+    def _summary_prompt(self, turns):
+        words = self.summary_budget * 3 // 4
+        return (
+            "You maintain the running summary of a live interview/meeting for an assistant.\n"
+            "Merge the new turns into the summary. Keep names, facts, numbers, topics covered and open questions. "
+            f"Plain text, at most {words} words, no preamble.\n\n"
+            f"Current summary:\n{self.summary or '(empty)'}\n\n"
+            "New turns:\n" + "\n".join(turns)
+        )
+
+    async def _summarize_pending(self):
+        try:
+            while self.pending:
+                turns, self.pending = self.pending, []
+                summary = None
+                if self.summarize:
+                    try:
+                        summary = await self.summarize(self._summary_prompt(turns))
+                    except Exception as e:
+                        log.warning("memory summarization failed", extra=fields(error=str(e)))
+                if summary:
+                    self.summaries += 1
+                else:
+                    # No summarizer (or it failed): keep the newest raw text that fits
+                    self.summary_failures += 1
+                    summary = "\n".join([self.summary] + turns if self.summary else turns)
+                self.summary = clip_tokens(summary.strip(), self.summary_budget)
+        finally:
+            self._summarizing = None
+
+    def context(self):
+        """The memory block placed after the system prompt and before the current question."""
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation (summary):\n" + self.summary)
+        if self.recent:
+            parts.append("Recent turns:\n" + "\n".join(turn for turn, _ in self.recent))
+        return "\n\n".join(parts)
+
+    def stats(self):
+        return {
+            "turns": self.turns,
+            "recent_turns": len(self.recent),
+            "recent_tokens": self.recent_tokens,
+            "summary_tokens": estimate_tokens(self.summary),
+            "context_tokens": estimate_tokens(self.context()),
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summarizing": self._summarizing is not None
+        }
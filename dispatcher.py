@@ -0,0 +1,92 @@
+import itertools
+import logging
+import os
+from answer_cache import lexical_embedding, cosine
+from telemetry import metrics, fields, RequestTrace
+
+COALESCE_THRESHOLD = float(os.getenv("COALESCE_THRESHOLD", 0.9))
+
+log = logging.getLogger(__name__)
+coalesced = metrics.counter("answers_coalesced_total", "Texts merged into an answer call already in flight")
+superseded = metrics.counter("answers_superseded_total", "Answer calls cancelled by newer input from the same source")
+
+
+class AnswerRequest:
+    """One text being answered for a session."""
+
+    def __init__(self, request_id, text, source, trace=None):
+        self.id = request_id
+        self.text = text
+        self.source = source
+        self.trace = trace
+        self.embedding = lexical_embedding(text)
+        self.task = None
+        self.cancelled = False
+        self.streamed = False
+        self.merged = 0
+
+
+class AnswerDispatcher:
+    """Decides which texts of one session get a provider call.
+
+    A text that is (near-)identical to one already being answered for the same
+    source joins that call instead of starting another. Any other new text cancels the calls
+    still running for the same source, so the newest utterance wins and a
+    stale answer can never arrive after a fresh one. `run(request)` does the
+    actual work as a session task.
+    """
+
+    def __init__(self, session, run, threshold=COALESCE_THRESHOLD):
+        self.session = session
+        self.run = run
+        self.threshold = threshold
+        self.in_flight = {}
+        self._ids = itertools.count(1)
+        self.coalesced = 0
+        self.superseded = 0
+
+    def submit(self, text, source, trace=None):
+        """Answers text, or merges it into a call already in flight. `trace` carries the
+        timings of the stages before this one (audio, STT); typed text starts a new one."""
+        embedding = lexical_embedding(text)
+        for request in self.in_flight.values():
+            # Same source only, like supersede below: the interviewer's question and the
+            # candidate repeating it are separate turns and each gets its own answer
+            if request.source == source and embedding and cosine(embedding, request.embedding) >= self.threshold:
+                request.merged += 1
+                self.coalesced += 1
+                coalesced.inc()
+                log.info("merged into request in flight", extra=fields(session=self.session.id, request=request.id, text=text[:40]))
+                return request
+
+        for request in list(self.in_flight.values()):
+            if request.source == source:
+                self.superseded += 1
+                superseded.inc()
+                self.cancel(request)
+
+        trace = trace or RequestTrace(self.session.id, "text_received")
+        request = AnswerRequest(str(next(self._ids)), text, source, trace)
+        self.in_flight[request.id] = request
+        request.task = self.session.spawn(self.run(request))
+        request.task.add_done_callback(lambda _: self.in_flight.pop(request.id, None))
+        return request
+
+    def cancel(self, request):
+        """Stops a request; none of its frames reach the client after this."""
+        if request.cancelled:
+            return
+        request.cancelled = True
+        self.in_flight.pop(request.id, None)
+        request.task.cancel()
+        if request.streamed:
+            # Take back the partial answer the client is showing
+            self.session.send({"type": "answer_delta", "id": request.id, "reset": True})
+
+    def send(self, request, data):
+        """Queues a frame for the client unless the request has been cancelled."""
+        if not request.cancelled:
+            self.session.send(dict(data, id=request.id), request)
+
+    def stats(self):
+        return {"in_flight": len(self.in_flight), "coalesced": self.coalesced, "superseded": self.superseded}
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from telemetry import metrics, fields
+
+log = logging.getLogger(__name__)
+hedges = metrics.counter("answer_hedges_total", "Extra provider calls started because the current one was slow", ("provider",))
+
+
+class LatencyWindow:
+    """Rolling window of recent successful call latencies (seconds)."""
+
+    def __init__(self, size=50):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p, min_samples=5):
+        if len(self.samples) < min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class StreamArbiter:
+    """Lets exactly one of several racing attempts stream deltas to the client.
+
+    The first attempt to produce output leads; the others are buffered. If the
+    leader fails, the client gets a reset and the next attempt's buffered
+    output is replayed, so text from two providers is never interleaved.
+    """
+
+    def __init__(self, on_delta):
+        self.on_delta = on_delta
+        self.leader = None
+        self.buffers = {}
+
+    def sink(self, name):
+        if self.on_delta is None:
+            return None
+        self.buffers[name] = []
+
+        def emit(event):
+            if self.leader is None:
+                self.leader = name
+            if self.leader == name:
+                self.on_delta(event)
+            else:
+                self.buffers[name].append(event)
+        return emit
+
+    def failed(self, name):
+        self.buffers.pop(name, None)
+        if self.on_delta is None or self.leader != name:
+            return
+        self.on_delta({"reset": True})
+        self.leader = None
+        for other, events in self.buffers.items():
+            if events:
+                self.leader = other
+                for event in events:
+                    self.on_delta(event)
+                events.clear()
+                break
+
+
+async def hedged_race(attempts, run, hedge_delay, on_delta=None):
+    """Races provider attempts, starting the next one after hedge_delay(name) or as soon as one fails.
+
+    A hedge_delay of None means "only on failure", i.e. a plain fallback chain.
+
+    `run(name, on_delta)` performs one attempt and raises if it fails. The first
+    attempt to return wins and every other attempt still running is cancelled.
+    Returns (winner, result, failures), with winner None if every attempt failed;
+    failures maps each failed attempt to its exception and is never retried.
+    """
+    arbiter = StreamArbiter(on_delta)
+    queue = list(attempts)
+    pending = {}
+    failures = {}
+
+    def launch():
+        name = queue.pop(0)
+        pending[asyncio.create_task(run(name, arbiter.sink(name)))] = name
+        delay = hedge_delay(name)
+        return None if delay is None else time.monotonic() + delay
+
+    next_hedge = launch()
+    try:
+        while pending:
+            timeout = max(0.0, next_hedge - time.monotonic()) if queue and next_hedge is not None else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                log.info("hedging: no answer yet, starting next provider", extra=fields(provider=queue[0]))
+                hedges.inc(queue[0])
+                next_hedge = launch()
+                continue
+            for task in done:
+                name = pending.pop(task)
+                if task.exception() is None:
+                    return name, task.result(), failures
+                failures[name] = task.exception()
+                arbiter.failed(name)
+            if queue and len(pending) == 0:
+                # Nothing left racing: don't wait out the hedge delay
+                next_hedge = launch()
+        return None, None, failures
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,213 @@
+import logging
+import math
+import os
+import re
+import time
+import numpy as np
+from answer_cache import normalize, lexical_embedding, cosine
+from telemetry import metrics, fields
+
+# INTENT_GATE=off answers every utterance, as before
+INTENT_GATE = os.getenv("INTENT_GATE", "on").lower() not in ("0", "off", "false", "no")
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", 0.5))
+# Statements this long (content words) are answered with talking points even without a question
+INTENT_STATEMENT_WORDS = int(os.getenv("INTENT_STATEMENT_WORDS", 8))
+CONTINUATION_SECONDS = float(os.getenv("CONTINUATION_SECONDS", 4.0))
+# A held utterance nothing followed is answered at expiry if it has this many content words, else dropped
+INTENT_FLUSH_WORDS = int(os.getenv("INTENT_FLUSH_WORDS", 3))
+REPEAT_SECONDS = float(os.getenv("REPEAT_SECONDS", 30))
+REPEAT_THRESHOLD = float(os.getenv("REPEAT_THRESHOLD", 0.92))
+
+log = logging.getLogger(__name__)
+decisions = metrics.counter("intent_gate_decisions_total",
+                            "Utterances by gate decision (every one but answer and merge saved a provider call)",
+                            ("decision", "reason"))
+
+_FILLER = {
+    "okay", "ok", "yeah", "yes", "yep", "no", "nope", "right", "sure", "so", "um", "uh", "uhm", "hmm", "mm",
+    "mhm", "huh", "ah", "oh", "well", "like", "alright", "cool", "great", "nice", "got", "it", "thanks",
+    "thank", "you", "i", "see", "mean", "know", "exactly", "true", "totally", "gotcha", "and", "then", "anyway",
+    "sounds", "good", "to", "me", "that", "that's", "is", "makes", "sense", "interesting", "perfect", "awesome"
+}
+_WH_WORDS = {"what", "how", "why", "when", "where", "who", "whom", "which", "whose"}
+_AUXILIARIES = {"can", "could", "would", "will", "do", "does", "did", "is", "are", "was", "were", "have",
+                "has", "had", "should", "shall", "may", "might", "must"}
+# Imperatives that open a prompt without any question wording ("design a url shortener")
+_IMPERATIVES = {"design", "implement", "write", "build", "create", "explain", "describe", "walk", "talk", "give",
+                "name", "list", "compare", "define", "tell", "show", "sketch", "outline", "summarize", "estimate",
+                "code", "solve"}
+_CONTINUATIONS = {"and", "or", "but", "because", "cause", "which", "that", "then", "also", "plus", "with",
+                  "without", "especially", "including", "for", "if", "when", "while"}
+_PROMPT_CUES = re.compile(r"\b(tell me|walk me through|talk me through|explain|describe|give me an example|"
+                          r"talk about|share|elaborate|how about|what about|thoughts on|compare|define|"
+                          r"(i'd|i would|i want to) (like to |love to )?(hear|know)|curious (about|how|why|what))\b")
+
+# What gets answered: interview-style questions and prompts
+_PROTOTYPES = [lexical_embedding(text) for text in (
+    "tell me about yourself and your background",
+    "what are your greatest strengths and weaknesses",
+    "describe a challenging project you worked on",
+    "tell me about a time you had a conflict with a colleague",
+    "how would you design a scalable system",
+    "what is the difference between these two approaches",
+    "explain how this works under the hood",
+    "why do you want to work here",
+    "where do you see yourself in five years",
+    "give me an example of a mistake you made and what you learned",
+    "what questions do you have for us",
+    "how do you handle pressure and deadlines",
+)]
+
+# Linear scorer over _features(): bias, '?', wh-word opener, auxiliary opener, prompt cue,
+# log content words, closest prototype, filler share, continuation opener, auxiliary addressing
+# the listener ("have you", "is there"), imperative opener. Speech recognizers often return no
+# punctuation, so the last two carry an unpunctuated question or prompt over the threshold alone.
+_WEIGHTS = np.array([-2.0, 2.5, 2.0, 1.2, 2.5, 0.6, 2.0, -3.0, -1.0, 1.5, 2.0])
+
+
+class GateDecision:
+    """What to do with one utterance: answer `text`, merge (answer `text`, which includes the
+    utterance before it), hold it as the start of something longer, or drop it."""
+
+    def __init__(self, action, text, reason, score=None):
+        self.action = action
+        self.text = text
+        self.reason = reason
+        self.score = score
+
+    @property
+    def answered(self):
+        return self.action in ("answer", "merge")
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _features(text):
+    words = _words(text)
+    content = normalize(text).split()
+    embedding = lexical_embedding(text)
+    return [
+        1.0,
+        1.0 if "?" in text else 0.0,
+        1.0 if words and words[0] in _WH_WORDS else 0.0,
+        1.0 if words and words[0] in _AUXILIARIES else 0.0,
+        1.0 if _PROMPT_CUES.search(text.lower()) else 0.0,
+        math.log1p(len(content)),
+        max((cosine(embedding, p) for p in _PROTOTYPES), default=0.0) if embedding else 0.0,
+        sum(w in _FILLER for w in words) / len(words) if words else 1.0,
+        1.0 if words and words[0] in _CONTINUATIONS else 0.0,
+        1.0 if words and words[0] in _AUXILIARIES and any(w in ("you", "your", "there") for w in words[1:3]) else 0.0,
+        1.0 if words and words[0] in _IMPERATIVES else 0.0,
+    ]
+
+
+def question_scores(texts):
+    """Probability-like score that each text is a question or prompt worth answering (one matrix product)."""
+    matrix = np.array([_features(t) for t in texts], dtype=np.float64).reshape(-1, len(_WEIGHTS))
+    return 1.0 / (1.0 + np.exp(-(matrix @ _WEIGHTS)))
+
+
+class IntentGate:
+    """Decides, per session, which spoken utterances are worth a provider call.
+
+    Cheap rules go first: filler and backchannel ("okay", "yeah, so...") and
+    repeats of something just answered are dropped. A fragment that continues
+    the previous utterance of the same source ("...and how would it scale?")
+    is merged into it, so the combined text is answered instead. Everything
+    else is scored by question_scores(); a question, a prompt or a substantial
+    statement is answered, a short remark is held for a few seconds in case
+    the next fragment completes it or a question follows it as context.
+    Anything ending in "?" counts as a question, however short ("And you?").
+    The caller settles held utterances with expire() once their window has
+    passed.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = INTENT_GATE if enabled is None else enabled
+        self._pending = {}   # source -> (text, at, answered)
+        self._recent = {}    # source -> [(embedding, at)] of answered texts
+
+    def classify(self, text, source, now=None):
+        return self._count(self._decide(text.strip(), source, time.monotonic() if now is None else now), source)
+
+    def expire(self, source, now=None):
+        """Settles what source left held once CONTINUATION_SECONDS passed without a follow-up:
+        a prompt that trailed off ("Your experience with Kafka in production") is answered,
+        a short remark dropped. None while nothing held has expired."""
+        now = time.monotonic() if now is None else now
+        pending = self._pending.get(source)
+        if not pending or pending[2] or now - pending[1] <= CONTINUATION_SECONDS:
+            return None
+        del self._pending[source]
+        text = pending[0]
+        if len(normalize(text).split()) >= INTENT_FLUSH_WORDS:
+            return self._count(self._answer(text, source, now, "answer", "held_prompt", None), source)
+        return self._count(GateDecision("drop", text, "expired"), source)
+
+    def _count(self, decision, source):
+        decisions.inc(decision.action, decision.reason)
+        log.debug("intent gate", extra=fields(source=source, decision=decision.action, reason=decision.reason,
+                                               score=None if decision.score is None else round(decision.score, 2),
+                                               text=decision.text[:60]))
+        return decision
+
+    def _decide(self, text, source, now):
+        if not self.enabled:
+            return GateDecision("answer", text, "gate_off")
+        words = _words(text)
+        if not words:
+            return GateDecision("drop", text, "empty")
+        pending = self._pending.get(source)
+        if pending and now - pending[1] > CONTINUATION_SECONDS:
+            pending = None
+        if all(w in _FILLER for w in words) and not self._asked(text):
+            return GateDecision("drop", text, "filler")
+
+        if pending and self._continues(pending, text, words):
+            combined = f"{pending[0]} {text}"
+            score = float(question_scores([combined])[0])
+            if score >= INTENT_THRESHOLD or self._asked(combined) or self._substantial(combined):
+                return self._answer(combined, source, now, "merge", "continuation", score)
+            self._pending[source] = (combined, now, False)
+            return GateDecision("hold", combined, "fragment", score)
+
+        embedding = lexical_embedding(text)
+        recent = [(e, at) for e, at in self._recent.get(source, []) if now - at <= REPEAT_SECONDS]
+        self._recent[source] = recent
+        if embedding and any(cosine(embedding, e) >= REPEAT_THRESHOLD for e, _ in recent):
+            return GateDecision("drop", text, "repeat")
+
+        score = float(question_scores([text])[0])
+        if score >= INTENT_THRESHOLD or self._asked(text) or self._substantial(text):
+            reason = "question" if score >= INTENT_THRESHOLD or self._asked(text) else "statement"
+            if pending and not pending[2] and not self._finished(pending[0]):
+                # Unfinished context just before the question ("About your last project... what was hardest?")
+                return self._answer(f"{pending[0]} {text}", source, now, "merge", "context", score)
+            return self._answer(text, source, now, "answer", reason, score)
+        self._pending[source] = (text, now, False)
+        return GateDecision("hold", text, "no_question", score)
+
+    def _continues(self, pending, text, words):
+        previous, _, answered = pending
+        if words[0] in _CONTINUATIONS:
+            return True
+        # A held, unfinished sentence followed by a short tail without its own question opener;
+        # re-answering something already answered needs an explicit conjunction
+        return (not answered and not self._finished(previous) and len(words) <= 6
+                and words[0] not in _WH_WORDS and words[0] not in _AUXILIARIES)
+
+    def _asked(self, text):
+        return text.rstrip().endswith("?")
+
+    def _finished(self, text):
+        return text.rstrip().endswith((".", "?", "!"))
+
+    def _substantial(self, text):
+        return len(normalize(text).split()) >= INTENT_STATEMENT_WORDS
+
+    def _answer(self, text, source, now, action, reason, score):
+        self._pending[source] = (text, now, True)
+        self._recent.setdefault(source, []).append((lexical_embedding(text), now))
+        return GateDecision(action, text, reason, score)
@@ -0,0 +1,137 @@
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class IncrementalJSONParser:
+    """Parses a streamed JSON object and reports its string fields as they fill in.
+
+    Only the shape the assistant prompt asks for is tracked: top-level string
+    values (``main_answer``) and top-level arrays of strings (``talking_points``).
+    Anything before the first '{' (e.g. chatty local models) is skipped.
+    """
+
+    def __init__(self):
+        self.partial = {}
+        self.done = False
+        self._started = False
+        self._stack = []          # [type, expect_key, element_index] per open container
+        self._in_string = False
+        self._is_key = False
+        self._escape = None       # None, "" right after a backslash, or collected \u hex digits
+        self._high_surrogate = None
+        self._buf = []
+        self._key = None
+        self._events = []
+
+    def feed(self, text):
+        """Consumes a chunk and returns the delta events it produced."""
+        for ch in text:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append(["object", True, 0])
+                continue
+            if self._in_string:
+                self._read_string_char(ch)
+            else:
+                self._read_structural_char(ch)
+        self._flush()
+        events, self._events = self._events, []
+        return events
+
+    def _read_structural_char(self, ch):
+        frame = self._stack[-1]
+        if ch == '"':
+            self._in_string = True
+            self._is_key = frame[0] == "object" and frame[1]
+            self._buf = []
+            if not self._is_key and self._target() is not None:
+                field, index = self._target()
+                if index is None:
+                    self.partial[field] = ""
+                else:
+                    self.partial.setdefault(field, [])
+                    while len(self.partial[field]) <= index:
+                        self.partial[field].append("")
+        elif ch == "{":
+            self._stack.append(["object", True, 0])
+        elif ch == "[":
+            self._stack.append(["array", False, 0])
+            if len(self._stack) == 2 and self._key is not None:
+                self.partial[self._key] = []
+        elif ch in "}]":
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+        elif ch == ":":
+            frame[1] = False
+        elif ch == ",":
+            if frame[0] == "object":
+                frame[1] = True
+            else:
+                frame[2] += 1
+
+    def _read_string_char(self, ch):
+        if self._escape is not None:
+            if self._escape == "" and ch != "u":
+                self._append(_ESCAPES.get(ch, ch))
+                self._escape = None
+            elif self._escape == "":
+                self._escape = "u"
+            else:
+                self._escape += ch
+                if len(self._escape) == 5:
+                    self._append_code_unit(int(self._escape[1:], 16))
+                    self._escape = None
+        elif ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._flush()
+            self._in_string = False
+            self._high_surrogate = None
+            if self._is_key:
+                if len(self._stack) == 1:
+                    self._key = "".join(self._buf)
+                self._buf = []
+        else:
+            self._append(ch)
+
+    def _append_code_unit(self, code):
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._append(chr(code))
+
+    def _append(self, text):
+        self._buf.append(text)
+
+    def _target(self):
+        """Returns (field, index) if the current string value is one we report."""
+        if self._key is None:
+            return None
+        if len(self._stack) == 1:
+            return self._key, None
+        if len(self._stack) == 2 and self._stack[1][0] == "array":
+            return self._key, self._stack[1][2]
+        return None
+
+    def _flush(self):
+        if not self._in_string or self._is_key or not self._buf:
+            return
+        target = self._target()
+        delta = "".join(self._buf)
+        self._buf = []
+        if target is None:
+            return
+        field, index = target
+        event = {"field": field, "delta": delta}
+        if index is None:
+            self.partial[field] += delta
+        else:
+            event["index"] = index
+            self.partial[field][index] += delta
+        self._events.append(event)
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from telemetry import metrics, fields
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:1b")
+# How long Ollama keeps the model loaded after each call; -1 pins it for the life of the Ollama server
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "-1")
+# OLLAMA_WARMUP=off skips loading the model at startup (it then loads on the first call)
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "on").lower() not in ("0", "off", "false", "no")
+# Pull the model during warm-up if the Ollama server does not have it yet
+OLLAMA_PULL = os.getenv("OLLAMA_PULL", "off").lower() in ("1", "on", "true", "yes")
+OLLAMA_WARMUP_PROMPT = os.getenv("OLLAMA_WARMUP_PROMPT", "Reply with the single word OK.")
+
+log = logging.getLogger(__name__)
+generated_tokens = metrics.counter("ollama_generated_tokens_total", "Tokens generated by the local model", ("model",))
+generation_seconds = metrics.counter("ollama_generation_seconds_total", "Time the local model spent generating them", ("model",))
+
+
+def keep_alive_value(value):
+    """Ollama takes a number of seconds (-1: forever) or a duration string like "30m"."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class LocalModel:
+    """The local Ollama model: which one, whether it is loaded, and how fast it generates.
+
+    warm_up() runs at startup, off the request path: it loads the model (and
+    any other model a tier answers with) with a short prompt, pulling it first
+    when OLLAMA_PULL is on, so the first fallback to the local model does not
+    pay for loading it into memory.
+    Every call passes the same keep_alive, which keeps the model pinned.
+    record() takes the eval counters Ollama reports with each finished
+    generation and keeps a moving tokens/sec figure.
+    """
+
+    SMOOTHING = 0.3
+
+    def __init__(self, model=None, keep_alive=None):
+        self.model = model or OLLAMA_MODEL
+        self.keep_alive = keep_alive_value(keep_alive or OLLAMA_KEEP_ALIVE)
+        self.state = "cold"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.tokens_per_second = None
+        self.generations = 0
+        self._lock = threading.Lock()
+
+    def warm_up(self, host=None, also=()):
+        """Blocking: loads and pins the model with one short generation, then each model in
+        `also` (other tiers' models) the same way. Raises if Ollama cannot serve one of them."""
+        if not OLLAMA_WARMUP:
+            return
+        import ollama
+        client = ollama.Client(host=host or os.getenv("OLLAMA_HOST") or None)
+        self.state = "loading"
+        started = time.monotonic()
+        try:
+            response = self._warm(client, self.model)
+            for model in dict.fromkeys(also):
+                if model != self.model:
+                    self._warm(client, model)
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e) or type(e).__name__
+            raise
+        self.warmup_seconds = round(time.monotonic() - started, 3)
+        load = response.get("load_duration")
+        self.load_seconds = round(load / 1e9, 3) if load else None
+        self.state = "ready"
+        self.error = None
+        log.info("local model ready", extra=fields(model=self.model, keep_alive=self.keep_alive,
+                                                   load_s=self.load_seconds, warmup_s=self.warmup_seconds))
+
+    def _warm(self, client, model):
+        import ollama
+        try:
+            response = self._warmup_chat(client, model)
+        except ollama.ResponseError as e:
+            if e.status_code != 404 or not OLLAMA_PULL:
+                raise
+            log.info("pulling local model", extra=fields(model=model))
+            client.pull(model)
+            response = self._warmup_chat(client, model)
+        self.record(response, model)
+        return response
+
+    def _warmup_chat(self, client, model):
+        return client.chat(model=model, messages=[{"role": "user", "content": OLLAMA_WARMUP_PROMPT}],
+                           options={"num_predict": 8}, keep_alive=self.keep_alive)
+
+    def record(self, response, model=None):
+        """Takes eval_count/eval_duration from a finished Ollama response (or the last streamed part)."""
+        count, duration = response.get("eval_count"), response.get("eval_duration")
+        if not count or not duration:
+            return
+        model = model or self.model
+        seconds = duration / 1e9
+        generated_tokens.inc(model, amount=count)
+        generation_seconds.inc(model, amount=seconds)
+        with self._lock:
+            rate = count / seconds
+            self.tokens_per_second = rate if self.tokens_per_second is None else (
+                self.SMOOTHING * rate + (1 - self.SMOOTHING) * self.tokens_per_second)
+            self.generations += 1
+            if self.state == "cold":
+                self.state = "ready"
+
+    def stats(self):
+        return {"model": self.model,
+                "keep_alive": self.keep_alive,
+                "state": self.state,
+                "error": self.error,
+                "load_seconds": self.load_seconds,
+                "warmup_seconds": self.warmup_seconds,
+                "tokens_per_second": None if self.tokens_per_second is None else round(self.tokens_per_second, 1),
+                "generations": self.generations}
@@ -0,0 +1,137 @@
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from telemetry import configure_logging, fields
+
+log = logging.getLogger(__name__)
+
+# Loaded once per worker process by the pool initializer
+_model = None
+
+
+def _load_model(model_name):
+    global _model
+    # Spawned workers start with bare logging; give them the same structured handler as the parent
+    configure_logging()
+    import whisper
+    start = time.perf_counter()
+    _model = whisper.load_model(model_name, device="cpu")
+    # One tiny pass so the first real segment doesn't pay for lazy initialization
+    _model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False)
+    log.info("local Whisper ready", extra=fields(model=model_name, worker=os.getpid(), load_s=round(time.perf_counter() - start, 1)))
+
+
+def _decode(audio_bytes):
+    """Returns float32 16 kHz mono samples for WAV or any container ffmpeg reads."""
+    if audio_bytes[:4] == b"RIFF":
+        with wave.open(io.BytesIO(audio_bytes), "rb") as w:
+            if w.getframerate() == 16000 and w.getnchannels() == 1 and w.getsampwidth() == 2:
+                return np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+    pcm = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", "16000", "pipe:1"],
+        input=audio_bytes, capture_output=True, check=True
+    ).stdout
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _transcribe_batch(batch):
+    """Runs in a worker: transcribes the queued segments one after another with the warm model.
+
+    Whisper's transcribe() takes one clip at a time, so this only batches the
+    round trip to the pool; inference is still sequential within the worker.
+    """
+    results = []
+    for audio_bytes in batch:
+        try:
+            result = _model.transcribe(_decode(audio_bytes), fp16=False, language=os.getenv("WHISPER_LANGUAGE") or None)
+            results.append(result["text"].strip())
+        except Exception as e:
+            log.warning("local Whisper batch failed", extra=fields(error=str(e)))
+            results.append(None)
+    return results
+
+
+class LocalWhisperEngine:
+    """CPU Whisper transcription kept warm in a dedicated process pool.
+
+    Each worker loads the model once. Segments submitted while the workers are
+    busy wait in a queue and are handed over together (up to max_batch), so a
+    burst costs one round trip to the pool instead of one per segment. The
+    worker still transcribes them one by one.
+    """
+
+    def __init__(self, model_name=None, workers=None, max_batch=None):
+        self.model_name = model_name or os.getenv("WHISPER_MODEL", "base")
+        self.workers = workers or int(os.getenv("WHISPER_WORKERS", 1))
+        self.max_batch = max_batch or int(os.getenv("WHISPER_MAX_BATCH", 4))
+        self._queue = queue.Queue()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Spawns the workers and loads the model in each of them."""
+        with self._lock:
+            if self._pool is not None:
+                return
+            log.info("starting local Whisper pool", extra=fields(workers=self.workers, model=self.model_name))
+            # Spawned, not forked: start() runs during warm-up alongside other threads, and a fork
+            # copies their locks in whatever state they happen to be
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_load_model, initargs=(self.model_name,))
+            for _ in range(self.workers):
+                threading.Thread(target=self._dispatch_loop, daemon=True).start()
+                # Forces each worker process up front so the model is loaded before the first segment
+                self._pool.submit(_transcribe_batch, [])
+
+    def stop(self):
+        with self._lock:
+            if self._pool is None:
+                return
+            for _ in range(self.workers):
+                self._queue.put(None)
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, audio_bytes):
+        self.start()
+        future = Future()
+        self._queue.put((audio_bytes, future))
+        return future
+
+    def transcribe(self, audio_bytes, timeout=60):
+        return self.submit(audio_bytes).result(timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _dispatch_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                texts = self._pool.submit(_transcribe_batch, [audio for audio, _ in batch]).result()
+                for (_, future), text in zip(batch, texts):
+                    future.set_result(text)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
@@ -1,22 +1,74 @@
 import sys
+import logging
+import threading
+import time
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLabel, 
                              QPushButton, QTextEdit, QHBoxLayout, QFrame)
-from PyQt6.QtCore import Qt, QTimer, QPoint
+from PyQt6.QtCore import Qt, QTimer, QPoint, QThreadPool, pyqtSignal
 from PyQt6.QtGui import QFont, QColor, QPalette
 from speech_processor import SpeechProcessor
 from chat_gpt import ChatGPTAssistant
+from intent_gate import IntentGate, CONTINUATION_SECONDS
+from telemetry import configure_logging, fields
+
+log = logging.getLogger(__name__)
+
+# Streamed deltas are painted at most once per frame (~60 fps), however fast they arrive
+FRAME_MS = 16
+
+
+def format_answer(answer):
+    """Plain-text rendering of a structured answer, complete or still streaming."""
+    parts = [answer.get("main_answer") or answer.get("error") or "", answer.get("star_expansion") or ""]
+    points = [p for p in answer.get("talking_points") or [] if p]
+    if points:
+        parts.append("\n".join(f"• {p}" for p in points))
+    keywords = [k for k in answer.get("keywords") or [] if k]
+    if keywords:
+        parts.append("Keywords: " + ", ".join(keywords))
+    if answer.get("interviewer_question"):
+        parts.append("Follow-up: " + answer["interviewer_question"])
+    return "\n\n".join(p for p in parts if p)
+
 
 class InterviewAssistantUI(QWidget):
+    """Desktop overlay. The GUI thread only paints: recognition, answers and device
+    work run on other threads and come back through these signals. Every
+    question bumps `generation`; anything tagged with an older one is stale and
+    dropped (its provider call is cancelled too)."""
+
+    phrase_detected = pyqtSignal(str)
+    answer_delta = pyqtSignal(int, dict)
+    answer_ready = pyqtSignal(int, object)
+    listening_changed = pyqtSignal(bool)
+
     def __init__(self):
         super().__init__()
         self.processor = SpeechProcessor()
+        self.gate = IntentGate()
         self.ai = ChatGPTAssistant()
+        self.pool = QThreadPool()
+        self.generation = 0
+        self.answer_future = None
+        self.partial = {}
         self.init_ui()
-        
-        # Timer to poll for new speech results
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_speech)
-        self.timer.start(100)
+        # SDK imports, device probing and model loading happen behind the visible window, on one
+        # thread: import-heavy threads each hold the GIL in turn, and on a single core the GUI
+        # thread would wait behind all of them at once
+        threading.Thread(target=self.warm_up, daemon=True).start()
+
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(FRAME_MS)
+        self.render_timer.timeout.connect(self.render_partial)
+
+        self.phrase_detected.connect(self.on_phrase)
+        self.answer_delta.connect(self.on_answer_delta)
+        self.answer_ready.connect(self.on_answer_ready)
+        self.listening_changed.connect(self.on_listening_changed)
+        # Emitting a signal is safe from the recognition threads; the slot runs on the GUI thread
+        self._speech_listener = self.phrase_detected.emit
+        self.processor.add_listener(self._speech_listener)
 
     def init_ui(self):
         # Window Setup
@@ -102,36 +154,136 @@ class InterviewAssistantUI(QWidget):
         # Dragging logic
         self.oldPos = self.pos()
         
-        # Print devices
-        self.list_audio_devices()
+    def warm_up(self):
+        # Startup thread: probing devices can take seconds with some drivers, loading the local model
+        # longer. Each step waits while an answer streams, so the two never compete for the GUI's frames.
+        for step in (self.list_audio_devices, self.warm_up_sdks, self.warm_up_local_model):
+            while self.answer_future is not None:
+                time.sleep(0.1)
+            step()
+
+    def warm_up_sdks(self):
+        try:
+            self.ai.warm_up()
+        except Exception as e:
+            log.warning("warm-up failed", extra=fields(error=str(e)))
 
     def list_audio_devices(self):
-        print("Available Audio Devices:")
-        import sounddevice as sd
-        devices = sd.query_devices()
-        for i, d in enumerate(devices):
-            print(f"{i}: {d['name']} ({d['hostapi_name']})")
+        try:
+            import sounddevice as sd
+            devices = sd.query_devices()
+            for i, d in enumerate(devices):
+                log.info("audio device", extra=fields(index=i, name=d['name'],
+                                                      hostapi=sd.query_hostapis(d['hostapi'])['name']))
+        except Exception as e:
+            log.error("listing audio devices failed", extra=fields(error=str(e)))
 
     def toggle_listening(self):
-        if not self.processor.is_listening:
+        starting = not self.processor.is_listening
+        self.listen_btn.setEnabled(False)
+        self.status_label.setText("Status: Starting..." if starting else "Status: Stopping...")
+        self.pool.start(lambda: self._set_listening(starting))
+
+    def _set_listening(self, listening):
+        # Pool thread: the device probe and opening the stream must not freeze the window
+        if listening:
             self.processor.start_listening()
+        else:
+            self.processor.stop_listening()
+        self.listening_changed.emit(self.processor.is_listening)
+
+    def on_listening_changed(self, listening):
+        self.listen_btn.setEnabled(True)
+        if listening:
             self.listen_btn.setText("STOP LISTENING")
             self.listen_btn.setStyleSheet("background-color: #e24a4a;")
-            self.status_label.setText("Status: Listening...")
         else:
-            self.processor.stop_listening()
             self.listen_btn.setText("START LISTENING")
             self.listen_btn.setStyleSheet("background-color: #4a4ae2;")
-            self.status_label.setText("Status: Idle")
+        if self.answer_future is None:
+            self.status_label.setText("Status: Listening..." if listening else "Status: Idle")
+
+    def on_phrase(self, text):
+        if not text or len(text.strip()) < 3:
+            return
+        decision = self.gate.classify(text, "Interviewer")
+        if decision.action == "hold":
+            QTimer.singleShot(int(CONTINUATION_SECONDS * 1000) + 100, self.settle_held)
+        if decision.answered:
+            self.ask(decision.text)
+
+    def settle_held(self):
+        # A held prompt nothing followed up on is answered after all
+        decision = self.gate.expire("Interviewer")
+        if decision and decision.answered:
+            self.ask(decision.text)
+
+    def ask(self, text):
+        # A newer question supersedes the one still being answered
+        self.generation += 1
+        generation = self.generation
+        if self.answer_future is not None:
+            self.answer_future.cancel()
+        self.question_box.setText(text)
+        self.partial = {}
+        self.answer_box.clear()
+        self.status_label.setText("Status: Generating Answer...")
+        self.answer_future = self.ai.submit_answer(
+            text, on_delta=lambda event: self.answer_delta.emit(generation, event))
+        # Runs on the assistant's loop thread when the call ends; no thread waits on it
+        self.answer_future.add_done_callback(lambda future: self.answer_ready.emit(generation, future))
+
+    def on_answer_delta(self, generation, event):
+        if generation != self.generation:
+            return
+        if event.get("reset"):
+            # The hedged race switched providers: the text so far (of that tier, if tiered) is being replaced
+            for field in event.get("fields") or list(self.partial):
+                self.partial.pop(field, None)
+        elif "tier" in event:
+            # Tiered answers: the fast tier's fields are complete, the expansion is still streaming
+            self.partial.update(event["answer"])
+        elif "index" in event:
+            items = self.partial.setdefault(event["field"], [])
+            items.extend([""] * (event["index"] + 1 - len(items)))
+            items[event["index"]] += event["delta"]
+        else:
+            self.partial[event["field"]] = self.partial.get(event["field"], "") + event["delta"]
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def render_partial(self):
+        scroll = self.answer_box.verticalScrollBar()
+        position = scroll.value()
+        self.answer_box.setPlainText(format_answer(self.partial))
+        scroll.setValue(position)
+
+    def on_answer_ready(self, generation, future):
+        if generation != self.generation or future.cancelled():
+            return
+        try:
+            answer = future.result()
+        except Exception as e:
+            log.error("answer failed", extra=fields(error=str(e)))
+            answer = {"error": f"Error: {e}"}
+        self.render_timer.stop()
+        self.answer_future = None
+        self.partial = answer
+        self.render_partial()
+        self.status_label.setText("Status: Listening..." if self.processor.is_listening else "Status: Idle")
+
+    def warm_up_local_model(self):
+        try:
+            self.ai.warm_up_local_model()
+        except Exception as e:
+            log.warning("local model warm-up failed", extra=fields(model=self.ai.local_llm.model, error=str(e)))
 
-    def process_speech(self):
-        text = self.processor.get_latest_text()
-        if text:
-            self.question_box.setText(text)
-            self.status_label.setText("Status: Generating Answer...")
-            answer = self.ai.get_answer(text)
-            self.answer_box.setText(answer)
-            self.status_label.setText("Status: Listening...")
+    def closeEvent(self, event):
+        self.processor.remove_listener(self._speech_listener)
+        if self.answer_future is not None:
+            self.answer_future.cancel()
+        self.processor.stop_listening()
+        super().closeEvent(event)
 
     # Drag window methods
     def mousePressEvent(self, event):
@@ -143,6 +295,7 @@ class InterviewAssistantUI(QWidget):
         self.oldPos = event.globalPosition().toPoint()
 
 if __name__ == "__main__":
+    configure_logging()
     app = QApplication(sys.argv)
     window = InterviewAssistantUI()
     window.show()
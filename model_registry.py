@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import time
+from telemetry import fields
+
+log = logging.getLogger(__name__)
+
+
+class GeminiModelRegistry:
+    """Resolves the preferred Gemini model once and serves it from memory.
+
+    Discovery (list_models) runs in the startup warm-up and again in the background
+    once the TTL expires; the cached model keeps being served meanwhile. If
+    discovery fails the last known-good model is kept. The SDK itself is only
+    imported and configured when first needed.
+    """
+
+    PRIORITY = [
+        'models/gemini-1.5-flash',
+        'models/gemini-1.5-flash-latest',
+        'models/gemini-2.0-flash-exp',
+        'models/gemini-1.0-pro',
+        'models/gemini-pro'
+    ]
+    DEFAULT_MODEL = 'models/gemini-1.5-flash'
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("GEMINI_MODEL_TTL", 3600))
+        self.api_key = None
+        self._configured_key = None
+        self.model_name = None
+        self.model = None
+        self._resolved_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "last_lookup_ms": 0.0,
+            "last_refresh_ms": 0.0,
+            "last_lookup_hit": None
+        }
+
+    def configure(self, api_key):
+        """Sets the API key to use; the previously resolved model is forgotten."""
+        self.api_key = api_key
+        self.invalidate()
+
+    def _genai(self):
+        # ~0.5 s to import, so only on the first discovery or request
+        import google.generativeai as genai
+        with self._lock:
+            if self._configured_key != self.api_key:
+                genai.configure(api_key=self.api_key)
+                self._configured_key = self.api_key
+        return genai
+
+    def _select(self, available_models):
+        for p in self.PRIORITY:
+            if p in available_models:
+                return p
+        # Look for any flash, then any pro, then whatever is there
+        return next((m for m in available_models if 'flash' in m),
+               next((m for m in available_models if 'pro' in m),
+               available_models[0] if available_models else None))
+
+    def refresh(self):
+        """Runs model discovery. Returns True if a model was (re)resolved."""
+        start = time.perf_counter()
+        try:
+            genai = self._genai()
+            available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+            log.debug("available Gemini models", extra=fields(models=available_models))
+            selected_model = self._select(available_models)
+            if not selected_model:
+                raise ValueError("No suitable Gemini model found!")
+            model = self.model if selected_model == self.model_name else genai.GenerativeModel(selected_model)
+            with self._lock:
+                self.model_name = selected_model
+                self.model = model
+                self._resolved_at = time.monotonic()
+                self._stats["refreshes"] += 1
+            log.info("selected Gemini model", extra=fields(model=selected_model))
+            return True
+        except Exception as e:
+            with self._lock:
+                self._stats["refresh_failures"] += 1
+                # Keep serving the last known-good model, just retry after another TTL
+                self._resolved_at = time.monotonic()
+            log.warning("Gemini model discovery failed", extra=fields(error=str(e), keeping=self.model_name))
+            return False
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._stats["last_refresh_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def get_model(self):
+        """Returns the cached GenerativeModel, resolving it on first use."""
+        start = time.perf_counter()
+        with self._lock:
+            hit = self.model is not None
+            expired = hit and time.monotonic() - self._resolved_at > self.ttl
+        if expired:
+            self.refresh_in_background()
+        if not hit:
+            if not self.refresh():
+                # Discovery has never worked: try the default rather than failing outright
+                genai = self._genai()
+                with self._lock:
+                    if self.model is None:
+                        self.model_name = self.DEFAULT_MODEL
+                        self.model = genai.GenerativeModel(self.DEFAULT_MODEL)
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+            self._stats["last_lookup_hit"] = hit
+            self._stats["last_lookup_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return self.model
+
+    def invalidate(self):
+        """Forgets the resolved model, e.g. after the API key changed."""
+        with self._lock:
+            self.model_name = None
+            self.model = None
+            self._resolved_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, model=self.model_name, ttl=self.ttl,
+                        age_s=round(time.monotonic() - self._resolved_at, 1) if self.model else None)
@@ -0,0 +1,297 @@
+"""
+Offline batch mode: runs a recorded practice session through the live pipeline.
+
+The file is decoded and cut into speech segments up front (the same VAD as
+/ws), every segment is transcribed on a bounded pool of concurrent STT calls,
+and the transcripts go through the intent gate in the order they were spoken
+as soon as they are ready. Each question is answered right away, a bounded
+number at a time; the provider pool's per-provider caps, the router's
+fallbacks and the answer cache apply exactly as live. The result is a JSON
+report with the timeline (every segment, its text and the gate's decision)
+and every question with its answer.
+
+    python offline_batch.py interview.webm --out report.json
+    curl --data-binary @interview.webm "localhost:8000/batch?name=interview.webm"
+
+Without ffmpeg, only 16 kHz mono 16-bit WAV files can be read.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+import wave
+from audio_segmenter import StreamingPCMDecoder, VADSegmenter, SAMPLE_RATE
+from audio_buffer import wav_payload
+from conversation_memory import clip_tokens, MEMORY_RECENT_TOKENS
+from intent_gate import IntentGate
+from transcript_store import answer_text
+from telemetry import metrics, fields
+
+BATCH_STT_CONCURRENCY = int(os.getenv("BATCH_STT_CONCURRENCY", 8))
+# Answer calls one batch job keeps in flight; below the provider caps, so live sessions still get slots
+BATCH_ANSWER_CONCURRENCY = int(os.getenv("BATCH_ANSWER_CONCURRENCY", 4))
+# Segments fed to the VAD at a time, so an hour of audio is not framed in one allocation
+VAD_BLOCK_SECONDS = 60
+
+SOURCE = "Interviewer"
+
+log = logging.getLogger(__name__)
+batch_seconds = metrics.histogram("batch_job_seconds", "Processing time of offline batch jobs", ("stage",))
+batch_audio_seconds = metrics.counter("batch_audio_seconds_total", "Seconds of recorded audio processed in batch jobs")
+
+
+def _plain_wav(path, sample_rate):
+    """PCM of a WAV file that already is 16 kHz mono 16-bit, else None."""
+    try:
+        with wave.open(path, "rb") as f:
+            if (f.getnchannels(), f.getsampwidth(), f.getframerate()) != (1, 2, sample_rate):
+                return None
+            return f.readframes(f.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+
+async def decode_file(path, sample_rate=SAMPLE_RATE):
+    """The whole recording as 16 kHz mono 16-bit PCM."""
+    pcm = _plain_wav(path, sample_rate)
+    if pcm is not None:
+        return pcm
+    if not StreamingPCMDecoder.available():
+        raise RuntimeError(f"ffmpeg is needed to decode {os.path.basename(path)}; "
+                           "without it only 16 kHz mono 16-bit WAV is supported")
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-loglevel", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    out, err = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"ffmpeg could not decode {os.path.basename(path)}: {err.decode(errors='replace')[:200]}")
+    return out
+
+
+def split_segments(pcm, sample_rate=SAMPLE_RATE):
+    """(start, end) byte offsets of the speech segments in pcm, as the live VAD would close them."""
+    segmenter = VADSegmenter(sample_rate)
+    block = VAD_BLOCK_SECONDS * sample_rate * 2
+    view = memoryview(pcm)
+    segments = []
+    for offset in range(0, len(pcm), block):
+        segments.extend(segmenter.feed(view[offset:offset + block]))
+    last = segmenter.flush()
+    if last:
+        segments.append(last)
+    return segments
+
+
+class _PrecedingTranscript:
+    """Answer context for a question in a recording: what was said just before it.
+
+    Stands in for the live session's ConversationMemory, whose running summary
+    depends on answering one question at a time.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def context(self):
+        return clip_tokens(self.text, MEMORY_RECENT_TOKENS) if self.text else ""
+
+    def add(self, source, question, answer=None):
+        pass
+
+
+class BatchJob:
+    """One recording being processed: where it is, and the report once it is done."""
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.state = "queued"
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.audio_seconds = None
+        self.segments = 0
+        self.transcribed = 0
+        self.questions = 0
+        self.answered = 0
+        self.report = None
+        self.task = None
+
+    def stats(self):
+        return {"id": self.id, "name": self.name, "state": self.state, "error": self.error,
+                "audio_seconds": self.audio_seconds, "segments": self.segments, "transcribed": self.transcribed,
+                "questions": self.questions, "answered": self.answered}
+
+
+async def run_batch(ai, path, job=None, settings=None, record=None,
+                    stt_concurrency=None, answer_concurrency=None):
+    """Processes a recording and returns its report (also kept on job).
+
+    record(kind, text, **details), when given, receives the utterances,
+    questions and answers as the live pipeline records them.
+    """
+    job = job or BatchJob(os.path.basename(path))
+    record = record or (lambda kind, text, **details: None)
+    stt_slots = asyncio.Semaphore(stt_concurrency or BATCH_STT_CONCURRENCY)
+    answer_slots = asyncio.Semaphore(answer_concurrency or BATCH_ANSWER_CONCURRENCY)
+    started = time.monotonic()
+    try:
+        job.state = "decoding"
+        pcm = await decode_file(path)
+        bytes_per_second = 2 * SAMPLE_RATE
+        job.audio_seconds = round(len(pcm) / bytes_per_second, 1)
+        segments = await asyncio.to_thread(split_segments, pcm)
+        job.segments = len(segments)
+        decoded = time.monotonic()
+        batch_seconds.observe(decoded - started, "decode")
+        log.info("batch segmented", extra=fields(job=job.id, audio_s=job.audio_seconds, segments=len(segments)))
+
+        async def transcribe(start, end):
+            async with stt_slots:
+                called = time.monotonic()
+                text = await ai.atranscribe_audio(wav_payload(memoryview(pcm)[start:end]), "audio/wav", settings)
+                job.transcribed += 1
+                return (text or "").strip(), time.monotonic() - called
+
+        async def answer(entry, context):
+            async with answer_slots:
+                called = time.monotonic()
+                result = await ai.aget_answer(entry["question"], SOURCE, settings=settings,
+                                              memory=_PrecedingTranscript(context))
+            entry["seconds"] = round(time.monotonic() - called, 2)
+            entry["answer"] = result
+            if result.get("error"):
+                entry["error"] = result.get("main_answer")
+                record("error", str(result.get("main_answer")), source=SOURCE, request=entry["id"])
+            else:
+                record("answer", answer_text(result), source=SOURCE, request=entry["id"], data=result)
+            job.answered += 1
+
+        job.state = "transcribing"
+        transcriptions = [asyncio.create_task(transcribe(start, end)) for start, end in segments]
+        gate = IntentGate()
+        timeline, questions, answers, heard = [], [], [], []
+        latest = held = None
+
+        def ask(decision, item):
+            nonlocal latest
+            entry = {"id": f"q{len(questions) + 1}", "at_s": item["start_s"], "question": decision.text}
+            if (decision.reason == "continuation" and latest is not None
+                    and decision.text.startswith(latest[0]["question"] + " ")):
+                # As live: the fuller question replaces the one it extends (a held fragment
+                # merged into a new question completes nothing answered)
+                latest[1].cancel()
+                latest[0]["superseded_by"] = entry["id"]
+            item["question"] = entry["id"]
+            questions.append(entry)
+            job.questions += 1
+            record("question", decision.text, source=SOURCE, request=entry["id"])
+            task = asyncio.create_task(answer(entry, "\n".join(heard)))
+            answers.append(task)
+            latest = (entry, task)
+
+        def settle(now):
+            # A held prompt nothing followed up on is answered after all, as live
+            decision = gate.expire(SOURCE, now)
+            if decision and decision.answered:
+                ask(decision, held)
+
+        try:
+            # In spoken order: the gate's continuation and repeat windows run on audio time
+            for index, ((start, end), task) in enumerate(zip(segments, transcriptions)):
+                text, stt_seconds = await task
+                item = {"index": index, "start_s": round(start / bytes_per_second, 2),
+                        "end_s": round(end / bytes_per_second, 2), "text": text, "stt_s": round(stt_seconds, 2)}
+                timeline.append(item)
+                if not text:
+                    item["decision"] = "no_speech"
+                    continue
+                settle(end / bytes_per_second)
+                decision = gate.classify(text, SOURCE, now=end / bytes_per_second)
+                item["decision"], item["reason"] = decision.action, decision.reason
+                record("utterance", text, source=SOURCE, data={"decision": decision.action, "reason": decision.reason,
+                                                               "offset_s": item["start_s"]})
+                if decision.action == "hold":
+                    held = item
+                if decision.answered:
+                    ask(decision, item)
+                heard.append(f"{SOURCE}: {text}")
+            settle(float("inf"))
+            transcribed = time.monotonic()
+            batch_seconds.observe(transcribed - decoded, "transcribe")
+            job.state = "answering"
+            await asyncio.gather(*answers, return_exceptions=True)
+        finally:
+            for task in transcriptions + answers:
+                task.cancel()
+        batch_seconds.observe(time.monotonic() - transcribed, "answer")
+    except Exception as e:
+        job.state = "failed"
+        job.error = str(e) or type(e).__name__
+        job.finished = time.time()
+        log.warning("batch job failed", extra=fields(job=job.id, error=job.error))
+        raise
+
+    elapsed = time.monotonic() - started
+    batch_seconds.observe(elapsed, "total")
+    batch_audio_seconds.inc(amount=job.audio_seconds)
+    answered = [q for q in questions if "answer" in q and "superseded_by" not in q]
+    job.report = {
+        "file": job.name,
+        "audio_seconds": job.audio_seconds,
+        "processing_seconds": round(elapsed, 1),
+        "speedup": round(job.audio_seconds / elapsed, 1) if elapsed else None,
+        "segments": len(segments),
+        "no_speech": sum(item["decision"] == "no_speech" for item in timeline),
+        "questions": len(questions),
+        "answered": len(answered),
+        "superseded": sum("superseded_by" in q for q in questions),
+        "errors": sum("error" in q for q in answered),
+        "timeline": timeline,
+        "answers": questions,
+    }
+    job.state = "done"
+    job.finished = time.time()
+    log.info("batch done", extra=fields(job=job.id, audio_s=job.audio_seconds, seconds=round(elapsed, 1),
+                                        questions=len(questions)))
+    return job.report
+
+
+async def _main(args):
+    from chat_gpt import ChatGPTAssistant, ProviderSettings
+    ai = ChatGPTAssistant()
+    settings = ProviderSettings(provider=args.provider) if args.provider else None
+    ai.start_stt_engine()
+    try:
+        return await run_batch(ai, args.file, settings=settings, stt_concurrency=args.stt_concurrency,
+                               answer_concurrency=args.answer_concurrency)
+    finally:
+        ai.stop_stt_engine()
+        await ai.aclose()
+
+
+def main():
+    from telemetry import configure_logging
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file", help="recorded session (WAV, WebM, Ogg, MP3, ... anything ffmpeg reads)")
+    parser.add_argument("--out", help="write the JSON report here (default: <file>.report.json)")
+    parser.add_argument("--provider", choices=["openai", "gemini", "ollama"], help="answer provider (default as configured)")
+    parser.add_argument("--stt-concurrency", type=int, help=f"transcriptions in flight (default {BATCH_STT_CONCURRENCY})")
+    parser.add_argument("--answer-concurrency", type=int, help=f"answers in flight (default {BATCH_ANSWER_CONCURRENCY})")
+    args = parser.parse_args()
+
+    report = asyncio.run(_main(args))
+    out = args.out or f"{args.file}.report.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"{report['audio_seconds']}s of audio in {report['processing_seconds']}s ({report['speedup']}x): "
+          f"{report['segments']} segments, {report['questions']} questions, {report['errors']} errors -> {out}")
+
+
+if __name__ == "__main__":
+    main()
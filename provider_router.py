@@ -0,0 +1,204 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from hedging import LatencyWindow
+from telemetry import metrics, fields
+
+log = logging.getLogger(__name__)
+circuit_opens = metrics.counter("circuit_opens_total", "Times a provider circuit opened", ("provider", "kind"))
+
+
+class ProviderError(Exception):
+    """A failed provider call. The message is what the user sees."""
+    kind = "error"
+
+    def __init__(self, provider, message):
+        super().__init__(message)
+        self.provider = provider
+
+    def as_answer(self):
+        return {"main_answer": str(self), "talking_points": [], "keywords": [], "interviewer_question": "",
+                "error": self.kind}
+
+
+class QuotaExceeded(ProviderError):
+    kind = "quota"
+
+
+class ProviderTimeout(ProviderError):
+    kind = "timeout"
+
+
+class ProviderUnavailable(ProviderError):
+    """The provider's circuit is open, so it was not called."""
+    kind = "unavailable"
+
+
+class ProviderHealth:
+    """Rolling health of one provider plus its circuit breaker.
+
+    closed: calls flow. open: calls are skipped until the cooldown ends.
+    half_open: exactly one probe call is let through; its outcome closes
+    or re-opens the circuit.
+    """
+
+    def __init__(self, name, window, window_seconds, error_rate, min_calls, failure_cooldown, quota_cooldown):
+        self.name = name
+        self.outcomes = deque(maxlen=window)
+        self.window_seconds = window_seconds
+        self.error_rate_limit = error_rate
+        self.min_calls = min_calls
+        self.failure_cooldown = failure_cooldown
+        self.quota_cooldown = quota_cooldown
+        self.latency = LatencyWindow()
+        self.state = "closed"
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.last_error = None
+        self.last_kind = None
+
+    def _prune(self, now):
+        while self.outcomes and now - self.outcomes[0][0] > self.window_seconds:
+            self.outcomes.popleft()
+
+    def rates(self, now=None):
+        now = now or time.monotonic()
+        self._prune(now)
+        total = len(self.outcomes)
+        if not total:
+            return {"calls": 0, "success": None, "error": None, "quota": None}
+        kinds = [kind for _, kind in self.outcomes]
+        return {
+            "calls": total,
+            "success": round(kinds.count("ok") / total, 3),
+            "error": round(sum(1 for k in kinds if k != "ok") / total, 3),
+            "quota": round(kinds.count("quota") / total, 3)
+        }
+
+    def available(self, now=None):
+        now = now or time.monotonic()
+        if self.state == "closed":
+            return True
+        return now >= self.open_until and not self.probe_in_flight
+
+    def acquire(self, now=None):
+        """True if a call may go to this provider now (takes the probe slot when half-open)."""
+        if not self.available(now):
+            return False
+        if self.state != "closed":
+            self.state = "half_open"
+            self.probe_in_flight = True
+        return True
+
+    def release(self):
+        """A probe ended without an outcome (e.g. it lost a hedged race): let another one through."""
+        if self.state == "half_open":
+            self.probe_in_flight = False
+
+    def record_success(self, seconds):
+        now = time.monotonic()
+        self.outcomes.append((now, "ok"))
+        self.latency.add(seconds)
+        self.probe_in_flight = False
+        if self.state != "closed":
+            log.info("circuit closed", extra=fields(provider=self.name))
+        self.state = "closed"
+
+    def record_failure(self, error):
+        now = time.monotonic()
+        self.outcomes.append((now, error.kind))
+        self.last_error = str(error)
+        self.last_kind = error.kind
+        self.probe_in_flight = False
+        rates = self.rates(now)
+        if error.kind == "quota":
+            self._open(now, self.quota_cooldown)
+        elif self.state == "half_open" or (rates["calls"] >= self.min_calls and rates["error"] >= self.error_rate_limit):
+            self._open(now, self.failure_cooldown)
+
+    def _open(self, now, cooldown):
+        self.state = "open"
+        self.open_until = now + cooldown
+        log.warning("circuit open", extra=fields(provider=self.name, cooldown_s=cooldown, error=self.last_error))
+        circuit_opens.inc(self.name, self.last_kind)
+
+    def stats(self):
+        now = time.monotonic()
+        p50 = self.latency.percentile(50, min_samples=1)
+        p95 = self.latency.percentile(95)
+        return {
+            "state": self.state,
+            "retry_in": round(max(0.0, self.open_until - now), 1) if self.state == "open" else 0,
+            "rates": self.rates(now),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "last_error": self.last_error
+        }
+
+
+class ProviderRouter:
+    """Picks which providers to try, and in what order, from their health.
+
+    Providers with an open circuit are skipped. The rest are ordered by their
+    median latency; with ROUTER_STRATEGY=preferred (default) the session's own
+    provider stays first while it is healthy, with ROUTER_STRATEGY=fastest the
+    fastest healthy provider always goes first.
+
+    A session that brings its own API key gets its own circuit for that
+    provider (keyed by a fingerprint of the key), so one bad or exhausted
+    key never cools the provider down for everyone else.
+    """
+
+    # Circuits kept for session-supplied keys; the least recently used go first
+    MAX_KEYED = 256
+
+    def __init__(self, providers=("openai", "gemini", "ollama")):
+        self.strategy = os.getenv("ROUTER_STRATEGY", "preferred")
+        self.health = {name: self._new_health(name) for name in providers}
+        self._keyed = OrderedDict()  # (provider, key fingerprint) -> ProviderHealth
+
+    def _new_health(self, name):
+        return ProviderHealth(
+            name,
+            window=int(os.getenv("ROUTER_WINDOW", 20)),
+            window_seconds=float(os.getenv("ROUTER_WINDOW_SECONDS", 120)),
+            error_rate=float(os.getenv("ROUTER_ERROR_RATE", 0.5)),
+            min_calls=int(os.getenv("ROUTER_MIN_CALLS", 3)),
+            failure_cooldown=float(os.getenv("ROUTER_FAILURE_COOLDOWN", 15)),
+            quota_cooldown=float(os.getenv("ROUTER_QUOTA_COOLDOWN", 60))
+        )
+
+    def health_for(self, name, key=None):
+        """The health record calls to name go through: the shared one, or the key's own with a session key."""
+        if not key:
+            return self.health[name]
+        scope = (name, hashlib.sha256(key.encode()).hexdigest()[:16])
+        health = self._keyed.get(scope)
+        if health is None:
+            health = self._keyed[scope] = self._new_health(name)
+            while len(self._keyed) > self.MAX_KEYED:
+                self._keyed.popitem(last=False)
+        self._keyed.move_to_end(scope)
+        return health
+
+    def route(self, preferred, candidates, keys=None):
+        """Returns the providers worth trying for one request, best first.
+        keys maps a provider to the session's own key for it, if any."""
+        keys = keys or {}
+        speed = lambda name: self._speed(self.health_for(name, keys.get(name)))
+        ordered = sorted(candidates, key=speed)
+        if self.strategy == "preferred" and preferred in ordered:
+            ordered.remove(preferred)
+            ordered.insert(0, preferred)
+        return [name for name in ordered if self.health_for(name, keys.get(name)).available()]
+
+    def _speed(self, health):
+        p50 = health.latency.percentile(50, min_samples=1)
+        # Untried providers sort after measured ones
+        return p50 if p50 is not None else float("inf")
+
+    def stats(self):
+        return {"strategy": self.strategy, "providers": {name: h.stats() for name, h in self.health.items()},
+                "session_keys": len(self._keyed)}
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import uuid
+from chat_gpt import ProviderSettings
+from telemetry import fields
+
+log = logging.getLogger(__name__)
+
+
+class Session:
+    """Everything that belongs to one /ws connection.
+
+    Each session has its own outbox (drained by its own sender task, so a slow
+    socket only delays itself), provider settings, audio buffers and the set
+    of tasks it started, which are cancelled together on disconnect.
+    """
+
+    def __init__(self, websocket):
+        self.id = uuid.uuid4().hex[:12]
+        self.websocket = websocket
+        self.outbox = asyncio.Queue()
+        self.settings = ProviderSettings()
+        self.tasks = set()
+        # Set by the endpoint: routes texts to answer calls (see dispatcher.py)
+        self.dispatcher = None
+        # Set by the endpoint: decides which spoken texts get answered (see intent_gate.py)
+        self.gate = None
+        # Rolling conversation context for answers (see conversation_memory.py)
+        self.memory = None
+        # Subscription to the backend SpeechProcessor's phrases (see websocket_endpoint)
+        self.subscription = None
+        # Audio ingestion state (see websocket_endpoint)
+        self.decoder = None
+        self.framer = None
+        self.segment_heard_at = None
+
+    def spawn(self, coro):
+        """Starts a task owned by this session."""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def send(self, data, request=None):
+        self.outbox.put_nowait((data, request))
+
+    async def send_loop(self):
+        """Sole writer of the socket: sends queued frames in order."""
+        while True:
+            data, request = await self.outbox.get()
+            if request is not None and request.cancelled:
+                # Queued before its request was superseded
+                continue
+            try:
+                await self.websocket.send_json(data)
+            except Exception as e:
+                log.warning("send failed", extra=fields(session=self.id, error=str(e)))
+                continue
+            if request is not None and request.trace and data.get("type") == "answer":
+                request.trace.mark("frame_sent")
+                request.trace.finish(request.id, source=request.source)
+
+    async def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+        if self.decoder is not None:
+            await self.decoder.close()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class SessionManager:
+    def __init__(self):
+        self.sessions = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def create(self, websocket):
+        session = Session(websocket)
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        return self.sessions.get(session_id)
+
+    async def remove(self, session):
+        self.sessions.pop(session.id, None)
+        await session.close()
+
+    def stats(self):
+        dispatchers = [s.dispatcher.stats() for s in self.sessions.values() if s.dispatcher]
+        return {
+            "sessions": len(self.sessions),
+            "tasks": sum(len(s.tasks) for s in self.sessions.values()),
+            "queued_frames": sum(s.outbox.qsize() for s in self.sessions.values()),
+            "answers_in_flight": sum(d["in_flight"] for d in dispatchers),
+            "coalesced": sum(d["coalesced"] for d in dispatchers),
+            "superseded": sum(d["superseded"] for d in dispatchers),
+            "max_memory_tokens": max((s.memory.stats()["context_tokens"] for s in self.sessions.values() if s.memory), default=0)
+        }
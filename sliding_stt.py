@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import re
+from telemetry import fields
+
+SLIDING_WINDOW_MS = int(os.getenv("SLIDING_WINDOW_MS", 6000))
+SLIDING_OVERLAP_MS = int(os.getenv("SLIDING_OVERLAP_MS", 1500))
+
+log = logging.getLogger(__name__)
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _same(a, b):
+    # A word cut by a window edge comes back as a prefix or suffix of the whole word
+    if a == b:
+        return bool(a)
+    short, full = sorted((a, b), key=len)
+    return len(short) >= 3 and (full.startswith(short) or full.endswith(short))
+
+
+def stitch(words, new_words, max_overlap=12, min_match=2):
+    """Appends a window's words to the transcript without repeating the overlap.
+
+    The longest common run of words between the transcript's tail and the
+    window's head (case and punctuation ignored) is where the two align: the
+    transcript is kept up to the end of that run and the window continues
+    from there. Inside the run, a word clipped by either window edge is
+    replaced by the copy heard in full.
+    """
+    tail = [_norm(w) for w in words[-max_overlap:]]
+    head = [_norm(w) for w in new_words[:max_overlap]]
+    best_len, best_tail_end, best_head_end = 0, 0, 0
+    previous = [0] * (len(head) + 1)
+    for i in range(1, len(tail) + 1):
+        current = [0] * (len(head) + 1)
+        for j in range(1, len(head) + 1):
+            if _same(tail[i - 1], head[j - 1]):
+                current[j] = previous[j - 1] + 1
+                if current[j] > best_len:
+                    best_len, best_tail_end, best_head_end = current[j], i, j
+        previous = current
+    # A single shared word only counts right at the seam (at most one clipped word either side)
+    at_seam = len(tail) - best_tail_end <= 1 and best_head_end - best_len <= 1
+    if best_len == 0 or (best_len < min_match and not at_seam):
+        return words + new_words
+    keep = len(words) - len(tail) + best_tail_end
+    merged = words[:keep] + new_words[best_head_end:]
+    for k in range(best_len):
+        old, new = keep - 1 - k, best_head_end - 1 - k
+        if len(_norm(new_words[new])) > len(_norm(merged[old])):
+            merged[old] = new_words[new]
+    return merged
+
+
+class SlidingWindowTranscriber:
+    """Transcribes one utterance in overlapping windows while it is still being spoken.
+
+    `transcribe(start, end)` returns a coroutine for the text of a byte range;
+    windows run concurrently but are stitched strictly in order, each one
+    reporting `on_update(stable, tentative)`. The tentative part is the tail
+    the next window may still revise. `finish(end)` covers the remaining audio
+    and returns the final text.
+    """
+
+    def __init__(self, start, transcribe, spawn=asyncio.create_task, on_update=None,
+                 window_bytes=None, overlap_bytes=None, bytes_per_ms=32):
+        self.start = start
+        self.transcribe = transcribe
+        self.spawn = spawn
+        self.on_update = on_update
+        self.window_bytes = window_bytes or SLIDING_WINDOW_MS * bytes_per_ms
+        self.overlap_bytes = min(overlap_bytes or SLIDING_OVERLAP_MS * bytes_per_ms, self.window_bytes // 2)
+        self.next_start = start
+        self.covered_to = start
+        self.words = []
+        self._tasks = []
+
+    def _schedule(self, start, end):
+        pending = self.transcribe(start, end)
+        previous = self._tasks[-1] if self._tasks else None
+        self._tasks.append(self.spawn(self._window(pending, previous, end - start)))
+        self.covered_to = end
+        self.next_start = end - self.overlap_bytes
+
+    async def _window(self, pending, previous, length):
+        try:
+            text = await pending
+        except Exception as e:
+            log.warning("window transcription failed", extra=fields(error=str(e)))
+            text = None
+        if previous is not None:
+            await previous
+        new_words = (text or "").split()
+        self.words = stitch(self.words, new_words)
+        if self.on_update:
+            tentative = min(len(self.words), round(len(new_words) * self.overlap_bytes / length) + 1) if new_words else 0
+            self.on_update(" ".join(self.words[:len(self.words) - tentative]), " ".join(self.words[len(self.words) - tentative:]))
+
+    def advance(self, position):
+        """Starts every full window the stream has reached."""
+        while position - self.next_start >= self.window_bytes:
+            self._schedule(self.next_start, self.next_start + self.window_bytes)
+
+    async def finish(self, end):
+        if end > self.covered_to:
+            self._schedule(self.next_start, end)
+        if self._tasks:
+            await self._tasks[-1]
+        return " ".join(self.words)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
@@ -1,23 +1,150 @@
-import speech_recognition as sr
 import threading
 import queue
-import sounddevice as sd
 import numpy as np
 import io
+import os
 import wave
 import time
+import logging
+from audio_buffer import AudioRingBuffer
+from audio_segmenter import VADSegmenter
+from telemetry import metrics, fields
+
+log = logging.getLogger(__name__)
+
+# Capture tuning: callback block size, seconds of unread audio held, recognition workers and backlog
+CAPTURE_BLOCK_MS = int(os.getenv("CAPTURE_BLOCK_MS", 30))
+CAPTURE_RING_SECONDS = float(os.getenv("CAPTURE_RING_SECONDS", 10))
+SPEECH_WORKERS = int(os.getenv("SPEECH_WORKERS", 2))
+SPEECH_QUEUE_MAX = int(os.getenv("SPEECH_QUEUE_MAX", 8))
+# Phrases kept for get_latest_text() while nobody is subscribed; past this the oldest go
+SPEECH_RESULTS_MAX = int(os.getenv("SPEECH_RESULTS_MAX", 100))
+
+dropped_frames = metrics.counter("speech_capture_dropped_frames_total", "Captured frames lost because the capture ring was full")
+capture_overflows = metrics.counter("speech_capture_overflows_total", "Blocks PortAudio reported input overflow for")
+dropped_results = metrics.counter("speech_results_dropped_total", "Phrases dropped unread because nobody took them")
+dropped_segments = metrics.counter("speech_segments_dropped_total", "Segments given up because the recognition queue was full")
+recognize_seconds = metrics.histogram("speech_recognize_seconds", "Backend recognition of one segment")
+
+
+class CaptureRing:
+    """Preallocated ring of mono float32 samples between the audio callback and the segmenter.
+
+    One writer (the callback) and one reader (the segmenter thread), each moving
+    only its own position, so neither side takes a lock. A block that does not
+    fit is dropped and counted rather than written over unread audio.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.dropped = 0
+        self.overflows = 0
+
+    def write(self, block):
+        """Down-mixes a (frames, channels) block into the ring; False if it was dropped."""
+        n = len(block)
+        if self.write_pos + n - self.read_pos > self.capacity:
+            self.dropped += n
+            return False
+        pos = self.write_pos % self.capacity
+        first = min(n, self.capacity - pos)
+        np.mean(block[:first], axis=1, out=self._buf[pos:pos + first])
+        if n > first:
+            np.mean(block[first:], axis=1, out=self._buf[:n - first])
+        self.write_pos += n
+        return True
+
+    def read(self):
+        """Everything written since the last read, as a new array."""
+        start, end = self.read_pos, self.write_pos
+        pos = start % self.capacity
+        if pos + (end - start) <= self.capacity:
+            samples = self._buf[pos:pos + (end - start)].copy()
+        else:
+            samples = np.concatenate((self._buf[pos:], self._buf[:end % self.capacity]))
+        self.read_pos = end
+        return samples
+
+
+class LinearResampler:
+    """Streaming linear-interpolation resampler; keeps its phase across blocks."""
+
+    def __init__(self, source_rate, target_rate):
+        self.step = source_rate / target_rate
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._phase = 0.0
+
+    def __call__(self, samples):
+        if self.step == 1.0:
+            return samples
+        buf = np.concatenate((self._tail, samples))
+        if len(buf) - 1 < self._phase:
+            self._tail = buf
+            return buf[:0]
+        count = int((len(buf) - 1 - self._phase) // self.step) + 1
+        positions = self._phase + self.step * np.arange(count)
+        out = np.interp(positions, np.arange(len(buf)), buf).astype(np.float32)
+        next_position = self._phase + self.step * count
+        keep = int(next_position)
+        self._tail = buf[keep:]
+        self._phase = next_position - keep
+        return out
+
 
 class SpeechProcessor:
+    """Backend capture and recognition.
+
+    A sounddevice InputStream callback copies each block into a CaptureRing; a
+    segmenter thread drains it, runs the VAD and queues closed segments for a
+    pool of recognition workers, so capture never waits on recognition.
+    Phrases are published in the order they were spoken. speech_recognition
+    and sounddevice are imported, and devices probed, by warm_up() or first
+    use, not by the constructor.
+    """
+
     def __init__(self, device_index=None):
-        self.recognizer = sr.Recognizer()
+        self._recognizer = None
         self.is_listening = False
-        self.result_queue = queue.Queue()
-        # If no device provided, try to find loopback, else fallback to None (default)
-        self.device_index = device_index if device_index is not None else self._find_loopback_device()
+        self.result_queue = queue.Queue(maxsize=SPEECH_RESULTS_MAX)
+        # (loop, asyncio.Queue) pairs and plain callbacks that receive results as they are recognized
+        self._subscribers = []
+        self._owner = None
+        self._listeners = []
+        self._subscribers_lock = threading.Lock()
+        # If no device provided, warm_up() looks for a loopback one, else None (default)
+        self.device_index = device_index
+        self._device_probed = device_index is not None
         self.sample_rate = 16000
+        # (stream, ring, capture rate, stopped event) while capturing
+        self._capture = None
+        # Closed segments waiting for a recognition worker, as (sequence number, PCM)
+        self._segments = queue.Queue(maxsize=SPEECH_QUEUE_MAX)
+        self._workers = []
+        self._order_lock = threading.Lock()
+        self._next_seq = 0
+        self._published_seq = 0
+        self._finished = {}
+
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            import speech_recognition as sr
+            self._recognizer = sr.Recognizer()
+        return self._recognizer
+
+    def warm_up(self):
+        """Probes the audio devices once (slow with some drivers) and loads the recognizer."""
+        if not self._device_probed:
+            self.device_index = self._find_loopback_device()
+            self._device_probed = True
+        return self.recognizer
 
     def _find_loopback_device(self):
         try:
+            import sounddevice as sd
             devices = sd.query_devices()
             keywords = ["loopback", "stereo mix", "what u hear", "wave out", "mixed capture"]
             
@@ -25,25 +152,113 @@ class SpeechProcessor:
             for kw in keywords:
                 for i, d in enumerate(devices):
                     if d['max_input_channels'] > 0 and kw in d['name'].lower():
-                        print(f"!!! Auto-Detected System Audio Source: {d['name']} at index {i}")
+                        log.info("auto-detected system audio source", extra=fields(device=d['name'], index=i))
                         return i
             
-            print("??? No system audio source (Stereo Mix/Loopback) found automatically.")
+            log.warning("no system audio source (Stereo Mix/Loopback) found automatically")
         except Exception as e:
-            print(f"Error finding loopback device: {e}")
+            log.error("finding loopback device failed", extra=fields(error=str(e)))
         return None
 
     def start_listening(self):
         if self.is_listening:
             return
+        self.warm_up()
+        stopped = threading.Event()
+        try:
+            stream, ring, rate = self._open_stream()
+            stream.start()
+        except Exception as e:
+            log.error("opening the capture stream failed", extra=fields(device=self.device_index, error=str(e)))
+            return
+        log.info("capture started", extra=fields(device=self.device_index, rate=rate, workers=SPEECH_WORKERS))
+        self._ensure_workers()
+        self._capture = (stream, ring, rate, stopped)
         self.is_listening = True
-        self.thread = threading.Thread(target=self._listen_loop, daemon=True)
+        self.thread = threading.Thread(target=self._segment_loop, args=(ring, rate, stopped), daemon=True)
         self.thread.start()
 
     def stop_listening(self):
         self.is_listening = False
+        capture, self._capture = self._capture, None
+        if capture is None:
+            return
+        stream, _, _, stopped = capture
+        try:
+            stream.stop()
+            stream.close()
+        except Exception as e:
+            log.warning("closing the capture stream failed", extra=fields(error=str(e)))
+        # The segmenter drains what was captured and flushes the open segment before it exits
+        stopped.set()
+
+    def subscribe(self, loop, results):
+        """Delivers recognized phrases to an asyncio.Queue on the given loop. Each phrase goes to one
+        subscriber only (one question, one answer): the owner set by set_owner(), else the newest."""
+        subscriber = (loop, results)
+        with self._subscribers_lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._subscribers_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            if self._owner == subscriber:
+                self._owner = None
+
+    def set_owner(self, subscriber):
+        """Sends phrases to this subscriber (the session that started capture); None for the newest."""
+        with self._subscribers_lock:
+            self._owner = subscriber
+
+    def add_listener(self, callback):
+        """Calls callback(text) for every recognized phrase, on the recognition thread (e.g. a Qt signal's emit)."""
+        with self._subscribers_lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._subscribers_lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _publish(self, text):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+            target = self._owner if self._owner in subscribers else (subscribers[-1] if subscribers else None)
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(text)
+            except Exception as e:
+                log.warning("speech listener failed", extra=fields(error=str(e)))
+        if target is None:
+            if not listeners:
+                # Nobody is pushed to, keep it for get_latest_text()
+                self._keep(text)
+            return
+        loop, results = target
+        try:
+            loop.call_soon_threadsafe(results.put_nowait, text)
+        except RuntimeError:
+            # Loop already closed; the subscriber is gone
+            self.unsubscribe(target)
+            self._keep(text)
+
+    def _keep(self, text):
+        while True:
+            try:
+                self.result_queue.put_nowait(text)
+                return
+            except queue.Full:
+                try:
+                    self.result_queue.get_nowait()
+                    dropped_results.inc()
+                except queue.Empty:
+                    pass
 
     def list_devices(self):
+        import sounddevice as sd
         devices = sd.query_devices()
         input_devices = []
         for i, d in enumerate(devices):
@@ -53,48 +268,147 @@ class SpeechProcessor:
 
     def set_device(self, index):
         self.device_index = int(index)
-        print(f"System: Switched to device index {self.device_index}")
+        self._device_probed = True
+        log.info("switched input device", extra=fields(index=self.device_index))
         if self.is_listening:
             self.stop_listening()
             # Small delay to let thread close
             time.sleep(0.5)
             self.start_listening()
 
-    def _listen_loop(self):
-        print(f"Starting listening loop on device {self.device_index}...")
-        
-        # Use speech_recognition source if possible, but it often fails with loopback devices
-        # that don't look like standard microphones to PyAudio.
-        # Fallback: Capture raw audio with sounddevice and pass to recognizer.
-        
+    def _open_stream(self):
+        """Opens the sounddevice InputStream; returns (stream, ring, capture rate)."""
+        import sounddevice as sd
+        info = sd.query_devices(self.device_index, "input")
+        channels = max(1, min(2, int(info["max_input_channels"])))
+        # Ask for 16 kHz so nothing needs resampling; loopback devices often only run at their native rate
         try:
-            source = sr.Microphone(device_index=self.device_index)
-            with source as s:
-                self.recognizer.adjust_for_ambient_noise(s, duration=1)
-                while self.is_listening:
-                    try:
-                        print("Listening...")
-                        audio = self.recognizer.listen(s, timeout=5, phrase_time_limit=15)
-                        # Use recognize_google (standard) or whisper if available
-                        text = self.recognizer.recognize_google(audio)
-                        if text:
-                            print(f"Detected: {text}")
-                            self.result_queue.put(text)
-                    except sr.WaitTimeoutError:
-                        continue
-                    except sr.UnknownValueError:
-                        continue
-                    except Exception as e:
-                        print(f"Loop Error: {e}")
-                        time.sleep(1)
-        except Exception as pilot_e:
-            print(f"Standard Microphone init failed: {pilot_e}. Attempting sounddevice capture...")
-            # If PyAudio/Microphone fails, we'd need a sounddevice callback implementation
-            # For now, let's stick to the Microphone approach but make it more robust.
-            pass
+            sd.check_input_settings(device=self.device_index, channels=channels, dtype="float32", samplerate=self.sample_rate)
+            rate = self.sample_rate
+        except Exception:
+            rate = int(info["default_samplerate"])
+        ring = CaptureRing(int(rate * CAPTURE_RING_SECONDS))
+
+        def on_audio(indata, frames, time_info, status):
+            # PortAudio's thread: copy the block in and return, nothing here may block
+            if status.input_overflow:
+                ring.overflows += 1
+            ring.write(indata)
+
+        stream = sd.InputStream(device=self.device_index, channels=channels, samplerate=rate, dtype="float32",
+                                blocksize=int(rate * CAPTURE_BLOCK_MS / 1000), callback=on_audio)
+        return stream, ring, rate
+
+    def _segment_loop(self, ring, rate, stopped):
+        """Drains the capture ring every block, runs the VAD and queues closed segments for recognition."""
+        segmenter = VADSegmenter(sample_rate=self.sample_rate)
+        pcm_ring = AudioRingBuffer.for_pcm(self.sample_rate)
+        resample = LinearResampler(rate, self.sample_rate)
+        reported_dropped = reported_overflows = 0
+        while True:
+            stopping = stopped.wait(CAPTURE_BLOCK_MS / 1000)
+            samples = ring.read()
+            if len(samples):
+                pcm = (np.clip(resample(samples), -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+                pcm_ring.write(pcm)
+                for start, end in segmenter.feed(pcm):
+                    self._enqueue_segment(pcm_ring, start, end)
+            # The callback only bumps plain ints; the (locked) counters are updated from here
+            if ring.dropped > reported_dropped:
+                dropped_frames.inc(amount=ring.dropped - reported_dropped)
+                reported_dropped = ring.dropped
+            if ring.overflows > reported_overflows:
+                capture_overflows.inc(amount=ring.overflows - reported_overflows)
+                reported_overflows = ring.overflows
+            if stopping:
+                segment = segmenter.flush()
+                if segment:
+                    self._enqueue_segment(pcm_ring, *segment)
+                log.info("capture stopped", extra=fields(frames=ring.write_pos, dropped_frames=ring.dropped,
+                                                         vad_dropped=segmenter.dropped_segments))
+                return
+
+    def _enqueue_segment(self, pcm_ring, start, end):
+        audio = pcm_ring.slice(start, end)
+        pcm = audio.tobytes()
+        audio.release()
+        with self._order_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+        while True:
+            try:
+                self._segments.put_nowait((seq, pcm))
+                break
+            except queue.Full:
+                # Recognition is behind: give up the oldest waiting segment, the newest speech matters most
+                try:
+                    stale, _ = self._segments.get_nowait()
+                except queue.Empty:
+                    continue
+                dropped_segments.inc()
+                log.warning("recognition queue full, dropping oldest segment", extra=fields(queued=self._segments.qsize()))
+                self._finish_segment(stale, None)
+
+    def _ensure_workers(self):
+        with self._order_lock:
+            if self._workers:
+                return
+            for i in range(SPEECH_WORKERS):
+                worker = threading.Thread(target=self._recognition_loop, name=f"speech-recognizer-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _recognition_loop(self):
+        import speech_recognition as sr
+        while True:
+            seq, pcm = self._segments.get()
+            text = None
+            started = time.monotonic()
+            try:
+                text = self.recognize(pcm)
+            except sr.UnknownValueError:
+                pass
+            except Exception as e:
+                log.warning("recognition failed", extra=fields(error=str(e)))
+            recognize_seconds.observe(time.monotonic() - started)
+            self._finish_segment(seq, text)
+
+    def recognize(self, pcm):
+        """Blocking recognition of one 16 kHz mono PCM segment."""
+        import speech_recognition as sr
+        return self.recognizer.recognize_google(sr.AudioData(pcm, self.sample_rate, 2))
+
+    def _finish_segment(self, seq, text):
+        # Workers finish out of order; phrases are published in the order they were spoken
+        with self._order_lock:
+            self._finished[seq] = text
+            while self._published_seq in self._finished:
+                text = self._finished.pop(self._published_seq)
+                self._published_seq += 1
+                if text:
+                    log.info("detected speech", extra=fields(text=text))
+                    self._publish(text)
+
+    def queue_depth(self):
+        return self._segments.qsize()
+
+    def capture_stats(self):
+        capture = self._capture
+        ring = capture[1] if capture else None
+        return {
+            "listening": self.is_listening,
+            "device": self.device_index,
+            "capture_rate": capture[2] if capture else None,
+            "frames_captured": ring.write_pos + ring.dropped if ring else 0,
+            "dropped_frames": ring.dropped if ring else 0,
+            "overflows": ring.overflows if ring else 0,
+            "queue_depth": self.queue_depth(),
+            "workers": len(self._workers)
+        }
 
     def transcribe_audio_chunk(self, audio_bytes):
         """Transcribes raw audio bytes received from the frontend."""
+        import speech_recognition as sr
         try:
             # The frontend sends a WebM/Opus or WAV blob. 
             # speech_recognition needs a file-like object.
@@ -104,7 +418,7 @@ class SpeechProcessor:
                     audio = self.recognizer.record(source)
                     text = self.recognizer.recognize_google(audio)
                     if text:
-                        print(f"Direct Capture Detected: {text}")
+                        log.info("direct capture detected speech", extra=fields(text=text))
                         return text
         except Exception as e:
             # Often fails if the chunk is too small or silence
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Latency buckets (seconds) shared by every histogram: sub-frame sends up to slow local models
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def fields(**values):
+    """Structured fields for a log call: log.info("msg", extra=fields(session=...))."""
+    return {"fields": values}
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    pairs = ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        # Snapshot under the lock: other threads add label sets while /metrics is scraped
+        with self._lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Read when scraped: `read()` returns a number, or a {label values: number} dict."""
+
+    def __init__(self, name, help, read, labels=()):
+        self.name, self.help, self.read, self.label_names = name, help, read, tuple(labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.read()
+        except Exception as e:
+            log.warning("gauge read failed", extra=fields(gauge=self.name, error=str(e)))
+            return lines
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, v in items:
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help, tuple(labels), buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts, total = self.series.get(labels, ([0] * len(self.buckets), [0, 0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += 1
+            total[1] += value
+            self.series[labels] = (counts, total)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        # Copied under the lock, so a series' buckets, count and sum come from the same moment
+        with self._lock:
+            items = sorted((k, (list(c), tuple(t))) for k, (c, t) in self.series.items())
+        for labels, (counts, (count, total)) in items:
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {n}")
+            lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _add(self, metric):
+        # Re-registering a name returns the existing metric (module reloads, several assistants)
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=()):
+        return self._add(Histogram(name, help, labels))
+
+    def gauge(self, name, help, read, labels=()):
+        # Gauges read live objects: the latest registration wins
+        self.metrics[name] = Gauge(name, help, read, labels)
+        return self.metrics[name]
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram("answer_stage_seconds", "Time from the previous pipeline stage to this one", ("stage",))
+request_seconds = metrics.histogram("answer_request_seconds", "Time from first input to the answer frame being sent", ("input",))
+
+
+class RequestTrace:
+    """Per-request stage timestamps, from audio arrival to the answer frame leaving the socket.
+
+    Stages are marked as they happen (a stage marked twice keeps its first
+    time). `finish()` records each stage's gap to the previous one and logs
+    the whole timeline as one structured line.
+    """
+
+    def __init__(self, session_id, first_stage="audio_received", at=None):
+        self.session_id = session_id
+        self.input = "audio" if first_stage == "audio_received" else "text"
+        self.marks = {first_stage: at or time.monotonic()}
+        self.finished = False
+
+    def mark(self, stage, at=None):
+        self.marks.setdefault(stage, at or time.monotonic())
+
+    def finish(self, request_id=None, **extra):
+        if self.finished:
+            return
+        self.finished = True
+        ordered = sorted(self.marks.items(), key=lambda item: item[1])
+        start = ordered[0][1]
+        for (_, previous), (stage, at) in zip(ordered, ordered[1:]):
+            stage_seconds.observe(at - previous, stage)
+        total = ordered[-1][1] - start
+        request_seconds.observe(total, self.input)
+        timeline = {stage: round((at - start) * 1000, 1) for stage, at in ordered}
+        log.info("request timeline", extra=fields(
+            session=self.session_id, request=request_id, input=self.input,
+            total_ms=round(total * 1000, 1), stages_ms=timeline, **extra))
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: JSON (LOG_FORMAT=json) or `time level logger message key=value ...`."""
+
+    def __init__(self, as_json=False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record):
+        values = getattr(record, "fields", {})
+        if record.exc_info:
+            values = dict(values, exc=self.formatException(record.exc_info))
+        if self.as_json:
+            return json.dumps({"ts": round(record.created, 3), "level": record.levelname.lower(),
+                               "logger": record.name, "msg": record.getMessage(), **values}, default=str)
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        extra = " ".join(f"{k}={json.dumps(v, default=str) if not isinstance(v, (int, float)) else v}" for k, v in values.items())
+        return f"{stamp} {record.levelname:<7} {record.name}: {record.getMessage()}" + (f" {extra}" if extra else "")
+
+
+def configure_logging():
+    """Installs the structured handler on the root logger; LOG_LEVEL and LOG_FORMAT choose level and format."""
+    root = logging.getLogger()
+    if any(isinstance(h.formatter, StructuredFormatter) for h in root.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(as_json=os.getenv("LOG_FORMAT", "text") == "json"))
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    # Per-request HTTP client chatter drowns out the pipeline at INFO
+    for noisy in ("httpx", "httpcore"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
@@ -0,0 +1,64 @@
+"""
+Answer cache check.
+
+Two conversations against a stand-in provider. A self-contained question
+answered in one is served from the cache in the other, even in the middle
+of that conversation; a follow-up that only makes sense in its own
+conversation ("Why?") always goes to the provider. Questions that differ
+only in tense or intent ("how would you" vs "how did you") never share an
+answer.
+Run with: python test_answer_cache.py
+"""
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("ANSWER_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="answer-cache-"), "cache.json"))
+from answer_cache import SemanticAnswerCache
+from chat_gpt import ChatGPTAssistant
+from conversation_memory import ConversationMemory
+
+asked = []
+
+
+async def fake_provider_answer(question, source, on_delta=None, settings=None, context="", tier=None, provider=None):
+    asked.append(question)
+    return {"main_answer": f"Answer to {question}", "talking_points": [], "keywords": [], "interviewer_question": ""}
+
+
+async def conversation(ai, questions):
+    memory = ConversationMemory()
+    answers = []
+    for question in questions:
+        assert bool(memory.context()) == bool(answers), "the conversation carries no context"
+        answers.append(await ai.aget_answer(question, memory=memory))
+    await asyncio.sleep(0.2)  # cache stores run in the background
+    return answers
+
+
+def check_tense_and_intent():
+    cache = SemanticAnswerCache(path=os.path.join(tempfile.mkdtemp(prefix="answer-cache-"), "cache.json"))
+    cache.put("How would you design a rate limiter?", "mic", {"main_answer": "hypothetical"})
+    cache.put("Do you use Kubernetes?", "mic", {"main_answer": "present"})
+    assert cache.lookup("How did you design a rate limiter?", "mic") is None, "past tense hit the hypothetical answer"
+    assert cache.lookup("Did you use Kubernetes?", "mic") is None, "past tense hit the present-tense answer"
+    assert cache.lookup("how would you design a rate limiter", "mic")["main_answer"] == "hypothetical"
+
+
+def run():
+    check_tense_and_intent()
+    ai = ChatGPTAssistant()
+    ai._get_provider_answer = fake_provider_answer
+
+    asyncio.run(conversation(ai, ["Tell me about yourself.", "How would you design a rate limiter?", "Why?"]))
+    assert len(asked) == 3
+    answers = asyncio.run(conversation(ai, ["What is your greatest strength?", "How would you design a rate limiter?",
+                                            "Why?"]))
+    print(f"provider calls: {asked}")
+    assert asked[3:] == ["What is your greatest strength?", "Why?"], "the mid-conversation question was not cached"
+    assert answers[1]["main_answer"] == "Answer to How would you design a rate limiter?"
+
+
+if __name__ == "__main__":
+    run()
+    print("SUCCESS: self-contained questions are served from the cache, follow-ups never are")
@@ -0,0 +1,151 @@
+"""
+Offline batch check.
+
+Synthesizes a ten-minute recording of tone "phrases" separated by pauses and
+runs it through offline_batch.run_batch with a stand-in STT and answerer that
+are slow per call. The recording must be processed in a small fraction of its
+length, with STT and answers each within their concurrency limits, every
+segment in the timeline in spoken order, filler dropped, a question
+completed by the next segment answered in its merged form (replacing the
+answer to its first half), and a fragment held as context for the question
+after it merged into that question without replacing anything.
+Run with: python test_batch.py
+"""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+import numpy as np
+import offline_batch
+from audio_segmenter import SAMPLE_RATE
+
+AUDIO_SECONDS = 600
+PHRASE_SECONDS = 2.0
+PAUSE_SECONDS = 1.5
+STT_DELAY = 0.5
+ANSWER_DELAY = 1.0
+STT_CONCURRENCY = 8
+ANSWER_CONCURRENCY = 4
+TOPICS = ["the payments service", "a chat backend", "search indexing", "the billing pipeline", "video uploads",
+          "the mobile API", "log ingestion", "the recommendation engine", "user onboarding", "fraud detection"]
+
+
+CYCLE = 7
+
+
+def phrase_text(i):
+    topic = TOPICS[(i // CYCLE) % len(TOPICS)]
+    cycle = i // CYCLE
+    return [
+        f"Tell me about a project on {topic} you are proud of, round {cycle}.",
+        "Okay.",
+        f"What went wrong the first time you shipped {topic} in round {cycle}?",
+        f"How would you scale {topic} for round {cycle}",
+        "and what would you monitor first?",
+        f"So about the outage in round {cycle}",
+        f"what was the root cause of it in round {cycle}?",
+    ][i % CYCLE]
+
+
+def frequency(i):
+    return 200 + 20 * i
+
+
+def build_recording(path):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * PHRASE_SECONDS)) / SAMPLE_RATE
+    parts, count = [], int(AUDIO_SECONDS // (PHRASE_SECONDS + PAUSE_SECONDS))
+    for i in range(count):
+        parts.append(6000 * np.sin(2 * np.pi * frequency(i) * t))
+        parts.append(rng.normal(0, 40, int(SAMPLE_RATE * PAUSE_SECONDS)))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.concatenate(parts).astype(np.int16).tobytes())
+    return count
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.active = {"stt": 0, "answer": 0}
+        self.peak = {"stt": 0, "answer": 0}
+
+    def _enter(self, kind):
+        self.active[kind] += 1
+        self.peak[kind] = max(self.peak[kind], self.active[kind])
+
+    async def atranscribe_audio(self, audio, mime_type="audio/webm", settings=None):
+        self._enter("stt")
+        try:
+            await asyncio.sleep(STT_DELAY)
+            samples = np.frombuffer(audio.tobytes()[44:], dtype=np.int16).astype(np.float32)
+            peak = np.argmax(np.abs(np.fft.rfft(samples))) * SAMPLE_RATE / len(samples)
+            return phrase_text(int(round((peak - 200) / 20)))
+        finally:
+            self.active["stt"] -= 1
+
+    async def aget_answer(self, question, source="Interviewer", on_delta=None, settings=None, memory=None):
+        self._enter("answer")
+        try:
+            await asyncio.sleep(ANSWER_DELAY)
+            return {"main_answer": f"Answer to: {question}", "context_chars": len(memory.context())}
+        finally:
+            self.active["answer"] -= 1
+
+
+def run():
+    workdir = tempfile.mkdtemp(prefix="batch-")
+    path = os.path.join(workdir, "session.wav")
+    phrases = build_recording(path)
+    ai = FakeAssistant()
+    recorded = []
+    started = time.perf_counter()
+    report = asyncio.run(offline_batch.run_batch(
+        ai, path, record=lambda kind, text, **details: recorded.append(kind),
+        stt_concurrency=STT_CONCURRENCY, answer_concurrency=ANSWER_CONCURRENCY))
+    elapsed = time.perf_counter() - started
+    json.dumps(report)
+
+    serial = phrases * STT_DELAY + report["questions"] * ANSWER_DELAY
+    print(f"{report['audio_seconds']}s of audio, {report['segments']} segments: {elapsed:.1f}s "
+          f"(serial STT+answers ~{serial:.0f}s), {report['questions']} questions, {report['answered']} answered, "
+          f"{report['superseded']} superseded, peak concurrency {ai.peak}")
+    timeline = report["timeline"]
+    assert report["segments"] == phrases, "segmentation does not match the recording"
+    assert [item["text"] for item in timeline] == [phrase_text(i) for i in range(phrases)], "timeline out of order"
+    assert all(item["decision"] == "drop" for item in timeline[1::CYCLE]), "filler was answered"
+    assert ai.peak["stt"] <= STT_CONCURRENCY and ai.peak["answer"] <= ANSWER_CONCURRENCY, "concurrency limit exceeded"
+    assert ai.peak["stt"] == STT_CONCURRENCY, "segments were not transcribed in parallel"
+
+    merged = [q for q in report["answers"] if q["question"].endswith("what would you monitor first?")]
+    assert len(merged) == sum(i % CYCLE == 4 for i in range(phrases))
+    assert all(q["question"].startswith("How would you scale") for q in merged)
+    assert all("superseded_by" not in q for q in merged), "a question merged with context replaced the one before it"
+    assert report["superseded"] == len(merged), "a merged question did not replace the one it completes"
+    with_context = [q for q in report["answers"] if q["question"].startswith("So about the outage")]
+    assert len(with_context) == sum(i % CYCLE == 6 for i in range(phrases))
+    assert all("root cause" in q["question"] and "superseded_by" not in q for q in with_context)
+    final = [q for q in report["answers"] if "superseded_by" not in q]
+    assert all(q["answer"]["main_answer"] == f"Answer to: {q['question']}" for q in final), "answers are missing"
+    assert all(q["answer"]["context_chars"] > 0 for q in final[1:]), "answers got no preceding context"
+    assert recorded.count("question") == report["questions"] and recorded.count("answer") >= report["answered"]
+    assert elapsed < AUDIO_SECONDS / 10, "batch processing is not much faster than real time"
+
+    if shutil.which("ffmpeg"):
+        webm = os.path.join(workdir, "session.webm")
+        subprocess.run(["ffmpeg", "-loglevel", "error", "-i", path, "-t", "30", "-c:a", "libopus", webm], check=True)
+        pcm = asyncio.run(offline_batch.decode_file(webm))
+        assert abs(len(pcm) / (2 * SAMPLE_RATE) - 30) < 0.5, "WebM was not decoded to 16 kHz mono"
+    else:
+        print("ffmpeg not found: WebM decoding not checked")
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    run()
+    print("SUCCESS: a recorded session is processed end to end in a fraction of its length")
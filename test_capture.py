@@ -0,0 +1,88 @@
+"""
+Capture pipeline check.
+
+Plays tone "phrases" at 48 kHz stereo into the capture ring the way the
+sounddevice callback would, while a stand-in recognizer takes longer per
+segment than the speech itself. Capture must not drop a frame, every phrase
+must be recognized and published in the order it was spoken, and the whole
+run must take about the audio's length, not audio plus recognition time.
+Needs no audio device. Run with: python test_capture.py
+"""
+import random
+import threading
+import time
+import numpy as np
+from speech_processor import SpeechProcessor, CaptureRing, CAPTURE_BLOCK_MS
+
+RATE = 48000
+PHRASES = 8
+PHRASE_SECONDS = 0.9
+PAUSE_SECONDS = 1.0
+SPEED = 2.0           # times faster than real time
+RECOGNIZE_DELAY = (0.6, 1.4)
+
+
+def phrase_frequency(i):
+    return 300 + 100 * i
+
+
+def build_audio():
+    t = np.arange(int(RATE * PHRASE_SECONDS)) / RATE
+    rng = np.random.default_rng(1)
+    parts = []
+    for i in range(PHRASES):
+        parts.append(0.3 * np.sin(2 * np.pi * phrase_frequency(i) * t))
+        parts.append(0.002 * rng.standard_normal(int(RATE * PAUSE_SECONDS)))
+    mono = np.concatenate(parts).astype(np.float32)
+    return np.stack((mono, mono), axis=1)
+
+
+def fake_recognize(pcm):
+    """Names the phrase by its tone, slowly and with a random delay so workers finish out of order."""
+    time.sleep(random.uniform(*RECOGNIZE_DELAY) / SPEED)
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    peak = np.argmax(np.abs(np.fft.rfft(samples))) * 16000 / len(samples)
+    return f"phrase {int(round((peak - 300) / 100))}"
+
+
+def run():
+    processor = SpeechProcessor(device_index=0)
+    processor.recognize = fake_recognize
+    published = []
+    processor._publish = published.append
+    processor._ensure_workers()
+
+    audio = build_audio()
+    ring = CaptureRing(int(RATE * 2))
+    stopped = threading.Event()
+    segmenter = threading.Thread(target=processor._segment_loop, args=(ring, RATE, stopped))
+    segmenter.start()
+
+    block = int(RATE * CAPTURE_BLOCK_MS / 1000)
+    started = time.perf_counter()
+    for i, offset in enumerate(range(0, len(audio), block)):
+        ring.write(audio[offset:offset + block])
+        # Paced like a real callback: block i is due at i * block duration
+        delay = started + (i + 1) * CAPTURE_BLOCK_MS / 1000 / SPEED - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    stopped.set()
+    segmenter.join()
+    deadline = time.monotonic() + 10
+    while len(published) < PHRASES and time.monotonic() < deadline:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    audio_seconds = len(audio) / RATE / SPEED
+    serial_seconds = audio_seconds + PHRASES * sum(RECOGNIZE_DELAY) / 2 / SPEED
+    print(f"{PHRASES} phrases, {audio_seconds:.1f}s of audio: done after {elapsed:.1f}s "
+          f"(serial capture+recognition ~{serial_seconds:.1f}s), dropped frames {ring.dropped}")
+    print(f"published: {published}")
+    assert ring.dropped == 0, "capture dropped frames while recognition was busy"
+    assert published == [f"phrase {i}" for i in range(PHRASES)], "phrases missing or out of order"
+    assert elapsed < serial_seconds * 0.8, "capture waited on recognition"
+
+
+if __name__ == "__main__":
+    run()
+    print("SUCCESS: capture keeps running while segments are recognized, in order")
@@ -0,0 +1,93 @@
+"""
+Desktop responsiveness check.
+
+Runs the Qt window offscreen against a stand-in provider that streams a long
+answer as hundreds of small deltas. A second question arrives while the first
+is still streaming. The event loop must keep ticking at frame rate
+throughout, repaints must be coalesced to about one per frame, the first
+answer must be cancelled and never shown, and the second must be rendered in
+full. Run with: python test_desktop.py (DESKTOP_MAX_FRAME_GAP_MS overrides
+the 50 ms frame gap budget).
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+import main
+from intent_gate import IntentGate
+
+DELTAS = 400
+DELTA_DELAY = 0.005
+SECOND_QUESTION_AFTER = 0.5
+MAX_FRAME_GAP = float(os.getenv("DESKTOP_MAX_FRAME_GAP_MS", 50)) / 1000
+
+cancelled = []
+
+
+async def fake_aget_answer(question, source="Interviewer", on_delta=None, settings=None, memory=None):
+    text = f"Answer to {question}: " + "word " * DELTAS
+    try:
+        for i in range(0, len(text), 5):
+            await asyncio.sleep(DELTA_DELAY)
+            on_delta({"field": "main_answer", "delta": text[i:i + 5]})
+    except asyncio.CancelledError:
+        cancelled.append(question)
+        raise
+    return {"main_answer": text, "talking_points": ["point"], "keywords": ["word"], "interviewer_question": ""}
+
+
+def run():
+    app = QApplication(sys.argv)
+    window = main.InterviewAssistantUI()
+    window.ai.aget_answer = fake_aget_answer
+    # Placeholder phrases, not real questions: this checks rendering, not the intent gate
+    window.gate = IntentGate(enabled=False)
+    window.show()
+
+    renders = []
+    original_render = window.render_partial
+
+    def counted_render():
+        renders.append(time.perf_counter())
+        original_render()
+    window.render_timer.timeout.disconnect()
+    window.render_timer.timeout.connect(counted_render)
+
+    ticks = []
+    ticker = QTimer()
+    ticker.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    ticker.start(main.FRAME_MS)
+
+    started = time.perf_counter()
+    window.phrase_detected.emit("first question")
+    QTimer.singleShot(int(SECOND_QUESTION_AFTER * 1000), lambda: window.processor._publish("second question"))
+
+    def finish():
+        if window.answer_future is None and window.generation == 2:
+            app.quit()
+    poll = QTimer()
+    poll.timeout.connect(finish)
+    poll.start(50)
+    QTimer.singleShot(30000, app.quit)
+    app.exec()
+    elapsed = time.perf_counter() - started
+    window.close()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    shown = window.answer_box.toPlainText()
+    print(f"{elapsed:.1f}s, {len(ticks)} frame ticks, max gap {max(gaps) * 1000:.0f} ms, "
+          f"{len(renders)} repaints for {2 * DELTAS} deltas, cancelled {cancelled}")
+    assert max(gaps) < MAX_FRAME_GAP, f"the GUI thread stalled while answers streamed (budget {MAX_FRAME_GAP * 1000:.0f} ms)"
+    assert len(renders) <= elapsed * 1000 / main.FRAME_MS + 5, "repaints are not coalesced per frame"
+    assert cancelled == ["first question"], "the superseded answer kept streaming"
+    assert shown.startswith("Answer to second question") and "Keywords: word" in shown, f"unexpected answer: {shown[:60]}"
+
+
+if __name__ == "__main__":
+    run()
+    print("SUCCESS: the window stays responsive and only shows the latest answer")
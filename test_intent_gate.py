@@ -0,0 +1,94 @@
+"""
+Intent gate check.
+
+Replays a scripted stretch of interview speech through one IntentGate, the
+way the STT pipeline delivers it: questions, prompts without a question mark,
+backchannel, a question split across two segments, context before a question
+and a repeated segment. Only the questions may be answered, each exactly
+once and in full, however short; a prompt that trails off is answered once
+nothing follows it. Classifying must stay far below an STT round trip.
+Run with: python test_intent_gate.py
+"""
+import time
+from intent_gate import IntentGate, question_scores
+
+GAP = 1.5  # seconds between segments
+
+# (utterance, expected action, expected text when answered)
+SCRIPT = [
+    ("Okay.", "drop", None),
+    ("Mm-hmm, yeah.", "drop", None),
+    ("Tell me about yourself.", "answer", "Tell me about yourself."),
+    ("Right, right.", "drop", None),
+    ("What is the difference between a process and a thread?", "answer", None),
+    ("and when would you pick one over the other?", "merge",
+     "What is the difference between a process and a thread? and when would you pick one over the other?"),
+    ("Sounds good to me.", "drop", None),
+    ("So about the payments project you led", "hold", None),
+    ("last year", "hold", "So about the payments project you led last year"),
+    ("what was the hardest part?", "merge", "So about the payments project you led last year what was the hardest part?"),
+    ("Walk me through how you would design a rate limiter", "answer", None),
+    ("Walk me through how you would design a rate limiter.", "drop", None),
+    ("Interesting.", "drop", None),
+    ("Let's move on.", "hold", None),
+    ("Our team runs about forty services on Kubernetes and deploys them several times a day.", "answer", None),
+    ("Why?", "answer", None),
+    ("I'd like to hear about your experience with Kafka", "answer", None),
+]
+
+
+def run():
+    gate = IntentGate(enabled=True)
+    now = 0.0
+    for utterance, action, text in SCRIPT:
+        now += GAP
+        decision = gate.classify(utterance, "Interviewer", now=now)
+        print(f"{decision.action:6} {decision.reason:12} {utterance!r}")
+        assert decision.action == action, f"{utterance!r}: expected {action}, got {decision.action} ({decision.reason})"
+        if text:
+            assert decision.text == text, f"{utterance!r}: answered {decision.text!r}"
+
+    # A held fragment expires instead of being glued to something said much later
+    gate.classify("So about your team", "Interviewer", now=now + GAP)
+    late = gate.classify("how big is it?", "Interviewer", now=now + 60)
+    assert late.action == "answer" and late.text == "how big is it?", late.text
+
+    # Sources are independent: the candidate's speech never completes the interviewer's
+    gate.classify("So about the migration", "Interviewer", now=1000.0)
+    other = gate.classify("and it went well", "Candidate", now=1001.0)
+    assert other.action != "merge", "merged across sources"
+
+    # Short questions made of backchannel words are still questions
+    for offset, utterance in enumerate(("And you?", "Is that true?", "Is that it?", "No?")):
+        decision = gate.classify(utterance, "Interviewer", now=2000.0 + 10 * offset)
+        assert decision.action == "answer", f"{utterance!r}: {decision.action} ({decision.reason})"
+
+    # Recognizers that return no punctuation: questions and prompts are still answered at once
+    for offset, utterance in enumerate(("can you write a function that reverses a string", "Have you used Docker",
+                                        "are you familiar with microservices",
+                                        "is there anything you would do differently", "design a url shortener",
+                                        "Implement LRU cache")):
+        decision = gate.classify(utterance, "Interviewer", now=2500.0 + 10 * offset)
+        assert decision.action == "answer", f"{utterance!r}: {decision.action} ({decision.reason})"
+
+    # Once its window passes without a follow-up, a held prompt is answered and a held remark dropped
+    held = gate.classify("Your experience with Kafka in production", "Interviewer", now=3000.0)
+    assert held.action == "hold", held.action
+    assert gate.expire("Interviewer", now=3002.0) is None, "settled before its window passed"
+    settled = gate.expire("Interviewer", now=3005.0)
+    assert settled.action == "answer" and settled.text == "Your experience with Kafka in production", settled.action
+    assert gate.expire("Interviewer", now=3010.0) is None, "settled twice"
+    gate.classify("Let's move on.", "Interviewer", now=3020.0)
+    assert gate.expire("Interviewer", now=3025.0).action == "drop"
+
+    texts = [utterance for utterance, _, _ in SCRIPT] * 20
+    started = time.perf_counter()
+    question_scores(texts)
+    per_text = (time.perf_counter() - started) / len(texts)
+    print(f"scoring: {per_text * 1e6:.0f} us per utterance")
+    assert per_text < 0.002, "scoring is not cheap enough to run on every segment"
+
+
+if __name__ == "__main__":
+    run()
+    print("SUCCESS: only questions and prompts reach the provider, merged with their fragments")
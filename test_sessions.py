@@ -0,0 +1,75 @@
+"""
+Concurrency check for per-session state.
+
+Opens N /ws sessions at once against a stand-in provider. Every answer should
+arrive in about one provider latency (not N of them), and a client whose socket
+is very slow must not delay anyone else. Run with: python test_sessions.py
+"""
+import asyncio
+import json
+import os
+import time
+
+# Sessions of this check must not end up in the real transcript database
+os.environ.setdefault("TRANSCRIPT_DB", "off")
+import app
+
+SESSIONS = 50
+PROVIDER_DELAY = 0.5
+SLOW_SEND_DELAY = 2.0
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay=0.0):
+        self.incoming = asyncio.Queue()
+        self.answered = asyncio.Event()
+        self.answered_at = None
+        self.send_delay = send_delay
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_json(self, data):
+        await asyncio.sleep(self.send_delay)
+        self.frames.append(data)
+        if data["type"] == "answer":
+            self.answered_at = time.perf_counter()
+            self.answered.set()
+
+
+async def fake_aget_answer(question, source="Interviewer", on_delta=None, settings=None, memory=None):
+    await asyncio.sleep(PROVIDER_DELAY)
+    return {"main_answer": f"Answer to {question}", "talking_points": [], "keywords": [], "interviewer_question": ""}
+
+
+async def run():
+    app.ai.aget_answer = fake_aget_answer
+    slow = FakeWebSocket(send_delay=SLOW_SEND_DELAY)
+    clients = [slow] + [FakeWebSocket() for _ in range(SESSIONS - 1)]
+    endpoints = [asyncio.create_task(app.websocket_endpoint(ws)) for ws in clients]
+    await asyncio.sleep(0)
+    assert len(app.sessions) == SESSIONS, f"expected {SESSIONS} sessions, got {len(app.sessions)}"
+
+    start = time.perf_counter()
+    for i, ws in enumerate(clients):
+        ws.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps({"type": "transcription", "content": f"Question number {i}"})})
+    await asyncio.wait_for(asyncio.gather(*(ws.answered.wait() for ws in clients[1:])), timeout=PROVIDER_DELAY * SESSIONS)
+
+    latencies = [ws.answered_at - start for ws in clients[1:]]
+    print(f"{SESSIONS} sessions, provider {PROVIDER_DELAY}s: answers after {min(latencies):.2f}-{max(latencies):.2f}s")
+    assert max(latencies) < PROVIDER_DELAY * 1.5, "sessions are being served one after another"
+    assert not slow.answered.is_set(), "the slow socket should still be catching up"
+
+    for ws in clients:
+        ws.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await asyncio.gather(*endpoints)
+    assert len(app.sessions) == 0, "sessions were not cleaned up on disconnect"
+    print("SUCCESS: sessions do not block each other and are cleaned up")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
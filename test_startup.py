@@ -0,0 +1,85 @@
+"""
+Startup budget check.
+
+Importing app must stay cheap and must not pull in the provider or audio
+SDKs, and a server whose Gemini model discovery cannot reach the network
+must still open its port within the startup budget and report the warm-up
+on /ready. Budgets (seconds) can be overridden with IMPORT_BUDGET and
+STARTUP_BUDGET. Run with: python test_startup.py
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_BUDGET = float(os.getenv("IMPORT_BUDGET", 1.0))
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", 3.0))
+LAZY_MODULES = ["openai", "ollama", "google.generativeai", "speech_recognition", "sounddevice", "whisper", "torch"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                  "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def check_import():
+    env = dict(os.environ, GEMINI_API_KEY="", LOG_LEVEL="ERROR", TRANSCRIPT_DB="off")
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(f"import app: {result['seconds']:.2f}s (budget {IMPORT_BUDGET}s)")
+    assert not result["loaded"], f"imported eagerly: {result['loaded']}"
+    assert result["seconds"] < IMPORT_BUDGET, "import app is over budget"
+
+
+def check_startup():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    # A key with no reachable API behind it: discovery hangs or fails, the port must not wait for it
+    env = dict(os.environ, GEMINI_API_KEY="startup-check", LOG_LEVEL="ERROR", TRANSCRIPT_DB="off")
+    started = time.monotonic()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=HERE, env=env)
+    try:
+        while True:
+            assert server.poll() is None, f"server exited with {server.returncode}"
+            try:
+                status, _ = get(f"http://127.0.0.1:{port}/status")
+                if status == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            assert time.monotonic() - started < STARTUP_BUDGET, "port did not open within the startup budget"
+            time.sleep(0.05)
+        serving = time.monotonic() - started
+        print(f"serving after {serving:.2f}s (budget {STARTUP_BUDGET}s)")
+
+        status, readiness = get(f"http://127.0.0.1:{port}/ready")
+        assert status in (200, 503) and "components" in readiness, f"unexpected /ready: {status} {readiness}"
+        print(f"/ready {status}: import {readiness['import_s']}s, components {readiness['components']}")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    check_import()
+    check_startup()
+    print("SUCCESS: startup stays within budget and does not wait on the network")
@@ -0,0 +1,111 @@
+"""
+Transcript store check.
+
+Many producer threads record turns (utterance, question, answer) while a
+reader keeps searching the same database. Recording must stay cheap for the
+caller, nothing may be lost, searches must work while the writer appends,
+and an export must return a session's events in the order they happened.
+Over HTTP, /transcripts only answers local clients, or callers with the
+TRANSCRIPT_TOKEN. Run with: python test_transcripts.py
+"""
+import os
+import tempfile
+import threading
+import time
+from transcript_store import TranscriptStore, answer_text
+
+PRODUCERS = 20
+TURNS = 300
+MAX_RECORD_P99 = 0.001
+
+
+def run():
+    path = os.path.join(tempfile.mkdtemp(prefix="transcripts-"), "transcripts.db")
+    store = TranscriptStore(path, flush_ms=50)
+    store.start()
+    spent = []
+    lock = threading.Lock()
+
+    def produce(index):
+        times = []
+        for turn in range(TURNS):
+            answer = {"main_answer": f"Use a token bucket per client {index}", "talking_points": [f"turn {turn}"]}
+            for kind, text, data in (("utterance", f"how would you limit client {index} turn {turn}", None),
+                                     ("question", f"How would you rate limit client {index}? turn {turn}", None),
+                                     ("answer", answer_text(answer), answer)):
+                before = time.perf_counter()
+                store.record(f"session-{index}", kind, text, "Interviewer", f"r{turn}", data=data)
+                times.append(time.perf_counter() - before)
+        with lock:
+            spent.extend(times)
+
+    searches, errors = [0], []
+    writing = threading.Event()
+
+    def search_while_writing():
+        while writing.is_set():
+            try:
+                store.search("token bucket", limit=5)
+                searches[0] += 1
+            except Exception as e:
+                errors.append(e)
+            time.sleep(0.01)
+
+    writing.set()
+    reader = threading.Thread(target=search_while_writing)
+    reader.start()
+    producers = [threading.Thread(target=produce, args=(i,)) for i in range(PRODUCERS)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    assert store.flush(timeout=30), "writer did not catch up"
+    writing.clear()
+    reader.join()
+
+    spent.sort()
+    p99 = spent[int(len(spent) * 0.99)]
+    expected = PRODUCERS * TURNS * 3
+    print(f"{expected} events from {PRODUCERS} threads: written {store.written}, dropped {store.dropped}, "
+          f"record() p99 {p99 * 1e6:.0f} us, {searches[0]} searches during writes")
+    assert store.written == expected and store.dropped == 0, "events were lost"
+    assert not errors, f"search failed while writing: {errors[0]}"
+    assert p99 < MAX_RECORD_P99, "record() is not cheap enough for the answer path"
+
+    hits = store.search("rate limit client 7", session="session-7", kinds=["question"])
+    assert hits and all(h["session"] == "session-7" and h["kind"] == "question" for h in hits), hits[:2]
+    assert "[" in hits[0]["snippet"], "search results carry no highlighted snippet"
+    assert store.search('bucket" OR "x') is not None, "user text must not be parsed as FTS syntax"
+
+    events = store.export("session-3")
+    assert len(events) == TURNS * 3
+    assert [e["kind"] for e in events[:3]] == ["utterance", "question", "answer"]
+    assert [e["request"] for e in events[::3]] == [f"r{turn}" for turn in range(TURNS)], "export is out of order"
+    assert events[2]["data"]["main_answer"] == "Use a token bucket per client 3"
+
+    sessions = store.sessions(limit=100)
+    assert len(sessions) == PRODUCERS and all(s["questions"] == TURNS for s in sessions)
+    store.close()
+
+
+def check_access():
+    import app
+    from fastapi.testclient import TestClient
+    app.transcripts = TranscriptStore(os.path.join(tempfile.mkdtemp(prefix="transcripts-"), "transcripts.db"))
+    app.transcripts.start()
+    remote = TestClient(app.app)
+    local = TestClient(app.app, client=("127.0.0.1", 50000))
+    assert remote.get("/transcripts").status_code == 403, "a remote client read the transcripts"
+    assert remote.get("/transcripts/session-1").status_code == 403
+    assert local.get("/transcripts").status_code == 200
+    app.TRANSCRIPT_TOKEN = "secret"
+    assert local.get("/transcripts").status_code == 403, "the token is not required once set"
+    assert remote.get("/transcripts", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert remote.get("/transcripts", headers={"Authorization": "Bearer secret"}).status_code == 200
+    app.transcripts.close()
+
+
+if __name__ == "__main__":
+    run()
+    check_access()
+    print("SUCCESS: transcripts are kept in full without slowing down the callers, and only shown to allowed clients")
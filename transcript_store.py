@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from telemetry import metrics, fields
+
+# SQLite file with every session's utterances, questions and answers. Opt-in: unset or "off" keeps nothing
+TRANSCRIPT_DB = os.getenv("TRANSCRIPT_DB", "off")
+TRANSCRIPT_BATCH = int(os.getenv("TRANSCRIPT_BATCH", 500))
+# How long the writer waits for more events before committing a partial batch
+TRANSCRIPT_FLUSH_MS = float(os.getenv("TRANSCRIPT_FLUSH_MS", 200))
+TRANSCRIPT_QUEUE_MAX = int(os.getenv("TRANSCRIPT_QUEUE_MAX", 50000))
+
+log = logging.getLogger(__name__)
+events_written = metrics.counter("transcript_events_written_total", "Transcript events committed to the store", ("kind",))
+events_dropped = metrics.counter("transcript_events_dropped_total", "Transcript events dropped because the writer fell behind")
+flush_seconds = metrics.histogram("transcript_flush_seconds", "Committing one batch of transcript events")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT,
+    request TEXT,
+    text TEXT NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (session, at);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5 (text, content='events', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS events_index AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS events_unindex AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def answer_text(answer):
+    """The searchable text of a structured answer: every string field and list item, in order."""
+    parts = []
+    for value in answer.values():
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            parts.extend(str(item) for item in value)
+    return "\n".join(parts)
+
+
+def fts_query(text):
+    """A user's search text as an FTS5 query: every word must match, as a prefix, with no operator syntax."""
+    words = ["".join(c for c in word if c.isalnum()) for word in text.split()]
+    return " ".join(f'"{word}"*' for word in words if word)
+
+
+class TranscriptStore:
+    """Append-only record of what was said and answered, per session, in SQLite.
+
+    record() only puts the event on a queue, so it never blocks the caller
+    (the event loop, a capture thread). One writer thread takes what has
+    queued up, up to `batch` events or `flush_ms` after the first, and commits
+    it as one transaction; under sustained load batches grow instead of
+    commits piling up. If the writer falls behind by more than `queue_max`
+    events, new ones are dropped and counted rather than held in memory.
+
+    The database runs in WAL mode, so searches and exports (run on their own
+    connections, off the event loop) read while the writer appends. An FTS5
+    index over event text, kept in step by triggers, serves search().
+    """
+
+    def __init__(self, path=None, batch=None, flush_ms=None, queue_max=None):
+        self.path = path or TRANSCRIPT_DB
+        self.batch = batch or TRANSCRIPT_BATCH
+        self.flush_seconds = (flush_ms if flush_ms is not None else TRANSCRIPT_FLUSH_MS) / 1000
+        self._queue = queue.Queue(maxsize=queue_max or TRANSCRIPT_QUEUE_MAX)
+        self._writer = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints; a crash can lose the last batches, never corrupt the file
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def start(self):
+        """Creates the schema and starts the writer thread (also done by the first record())."""
+        with self._lock:
+            if self._writer is not None:
+                return
+            db = self._connect()
+            db.executescript(SCHEMA)
+            self._writer = threading.Thread(target=self._write_loop, args=(db,), name="transcript-writer", daemon=True)
+            self._writer.start()
+
+    def close(self, timeout=5):
+        """Writes what is queued and stops the writer."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join(timeout)
+
+    def record(self, session, kind, text, source=None, request=None, data=None):
+        """Queues one event; returns at once."""
+        if self._writer is None:
+            self.start()
+        try:
+            self._queue.put_nowait((session, time.time(), kind, source, request, text,
+                                    None if data is None else json.dumps(data, ensure_ascii=False)))
+        except queue.Full:
+            self.dropped += 1
+            events_dropped.inc()
+
+    def flush(self, timeout=10):
+        """Blocks until every event queued before this call is committed."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _write_loop(self, db):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                db.close()
+                return
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_seconds
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Stop after this batch
+                    self._queue.put(None)
+                    break
+            self._commit(db, batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _commit(self, db, batch):
+        if not batch:
+            return
+        started = time.monotonic()
+        try:
+            with db:
+                db.executemany("INSERT INTO events (session, at, kind, source, request, text, data) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        except sqlite3.Error as e:
+            log.warning("transcript batch lost", extra=fields(events=len(batch), error=str(e)))
+            return
+        flush_seconds.observe(time.monotonic() - started)
+        self.written += len(batch)
+        kinds = {}
+        for event in batch:
+            kinds[event[2]] = kinds.get(event[2], 0) + 1
+        for kind, count in kinds.items():
+            events_written.inc(kind, amount=count)
+
+    # Reads: blocking, each on its own connection (call them from a thread)
+
+    def _read(self, sql, args=()):
+        if not os.path.exists(self.path):
+            return []
+        db = self._connect()
+        db.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in db.execute(sql, args)]
+        finally:
+            db.close()
+
+    def sessions(self, limit=50):
+        """Most recent sessions first, with when they ran and how much they hold."""
+        return self._read("SELECT session, MIN(at) AS started, MAX(at) AS ended, COUNT(*) AS events, "
+                          "SUM(kind = 'question') AS questions FROM events GROUP BY session "
+                          "ORDER BY ended DESC LIMIT ?", (limit,))
+
+    def search(self, text, session=None, kinds=None, limit=50):
+        """Best-matching events for text across sessions (or within one), with a highlighted snippet."""
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = ("SELECT e.id, e.session, e.at, e.kind, e.source, e.request, "
+               "snippet(events_fts, 0, '[', ']', '...', 12) AS snippet "
+               "FROM events_fts JOIN events e ON e.id = events_fts.rowid WHERE events_fts MATCH ?")
+        args = [query]
+        if session:
+            sql += " AND e.session = ?"
+            args.append(session)
+        if kinds:
+            sql += f" AND e.kind IN ({','.join('?' * len(kinds))})"
+            args.extend(kinds)
+        sql += " ORDER BY bm25(events_fts) LIMIT ?"
+        args.append(limit)
+        return self._read(sql, args)
+
+    def export(self, session):
+        """Every event of a session in the order it happened, answers with their structured fields."""
+        events = self._read("SELECT at, kind, source, request, text, data FROM events WHERE session = ? ORDER BY id",
+                            (session,))
+        for event in events:
+            data = event.pop("data")
+            if data is not None:
+                event["data"] = json.loads(data)
+        return events
+
+    def stats(self):
+        return {"path": self.path, "written": self.written, "dropped": self.dropped,
+                "queued": self.queue_depth(), "batch": self.batch}